@@ -5,23 +5,34 @@ Inicializa a estrutura e fornece conexão.
 DECISÕES TÉCNICAS:
 - SQLite como banco local
 - Estrutura simples para MVP
-- Criação automática de tabelas no startup
+- Criação automática de tabelas no startup (ou adiada para o aquecimento
+  da API com inicializar=False)
 """
 
 from pathlib import Path
+from typing import Optional
+
 from services.storage import Storage
 
 
-def init_database(db_path: str = "./data/results.db") -> Storage:
+def init_database(
+    db_path: str = "./data/results.db",
+    inicializar: bool = True,
+    arquivo_dir: Optional[str] = None
+) -> Storage:
     """
     Inicializa o banco de dados e retorna uma instância do Storage.
     
     Args:
         db_path: Caminho para o arquivo do banco SQLite
+        inicializar: False adia a criação/migração das tabelas para
+            storage.verificar_esquema() ou a primeira conexão
+        arquivo_dir: Diretório das partições de arquivo (padrão: <pasta do banco>/archive)
     
     Returns:
         Instância do Storage
     """
-    storage = Storage(db_path)
-    print(f"Banco de dados inicializado: {db_path}")
+    storage = Storage(db_path, inicializar, arquivo_dir)
+    if inicializar:
+        print(f"Banco de dados inicializado: {db_path}")
     return storage
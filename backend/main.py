@@ -14,13 +14,17 @@ DECISÕES TÉCNICAS:
 - FastAPI para API moderna e rápida
 - CORS habilitado para desenvolvimento local
 - Validação automática via Pydantic
-- Context manager para garantir fechamento do Excel
+- Sessões do Excel reaproveitadas (pool) e abertas no aquecimento em segundo
+  plano: o processo sobe rápido e /readyz indica quando está pronto
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from contextlib import asynccontextmanager
 from pydantic import BaseModel, Field
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Tuple
 from datetime import datetime
 from pathlib import Path
 import os
@@ -30,9 +34,29 @@ import sys
 sys.path.insert(0, str(Path(__file__).parent))
 
 from database import init_database
-from services.excel_runner import ExcelRunner
+from services.engine import criar_engine
 from services.selic_api import SelicAPI
 from services.selic_updater import SelicUpdater
+from services.scenario_sweep import ScenarioSweep, gerar_combinacoes
+from services.metrics import Metrics
+from services.single_flight import SingleFlight
+from services.write_behind import WriteBehindStorage
+from services.serialization import dumps, juntar_campos
+from services.http_cache import CACHE_CONTROL_IMUTAVEL, comprimir, etag_corresponde
+from services.result_codec import MEDIA_TYPE_COMPACTO, codificar_output, quer_formato_compacto
+from services.profiling import ProfilingError, RequestProfiler
+from services.warmup import Warmup
+from services.workbook_watcher import WorkbookWatcher
+from services.excel_watchdog import PRAZOS_PADRAO
+from services.job_queue import STATUS_ERRO, criar_fila
+from services.storage import LINHA_TOTAL
+from services.export import FORMATOS as FORMATOS_EXPORTACAO, exportar, formato_disponivel
+from services.precompute import AgendadorDiario, ConsultasCache, Precomputador, carregar_plano, gerar_casos
+from services.maintenance import Manutencao
+from services.recorrecao import Recorretor
+from services.scheduler import (
+    CLASSE_INTERATIVA, CLASSE_LOTE, CLASSE_PRECALCULO, Escalonador, interpretar_pesos, validar_classe
+)
 
 
 # Configuração de caminhos
@@ -40,7 +64,52 @@ BASE_DIR = Path(__file__).parent.parent
 EXCEL_PATH = os.getenv("EXCEL_FILE_PATH", str(BASE_DIR / "data" / "planilhamae.xlsx"))
 MAPA_CELULAS_PATH = str(BASE_DIR / "data" / "mapa_celulas.json")
 DATABASE_PATH = os.getenv("DATABASE_URL", str(BASE_DIR / "data" / "results.db")).replace("sqlite:///", "")
-SELIC_CACHE_PATH = str(BASE_DIR / "data" / "selic_cache.json")
+SELIC_CACHE_PATH = os.getenv("SELIC_CACHE_PATH", str(BASE_DIR / "data" / "selic_cache.json"))
+SELIC_MAPPING_PATH = str(BASE_DIR / "data" / "selic_mapping.json")
+SELIC_PRECISAO = os.getenv("SELIC_PRECISAO", "mensal")
+SELIC_DIARIA_OFFLINE_PATH = os.getenv("SELIC_DIARIA_OFFLINE_PATH")
+CALC_ENGINE = os.getenv("CALC_ENGINE", "excel")
+EXCEL_POOL_SIZE = int(os.getenv("EXCEL_POOL_SIZE", "1"))
+EXCEL_WORKDIR = os.getenv("EXCEL_WORKDIR")  # Cópias privadas da planilha (padrão: <tmp>/servfaz-excel)
+# Watchdog: prazo por etapa (EXCEL_PRAZO_ABERTURA_S, _ESCRITA_S, _CALCULO_S, _LEITURA_S)
+EXCEL_PRAZOS = {
+    etapa: float(os.getenv(f"EXCEL_PRAZO_{etapa.upper()}_S", str(padrao)))
+    for etapa, padrao in PRAZOS_PADRAO.items()
+}
+EXCEL_MAX_RSS_MB = float(os.getenv("EXCEL_MAX_RSS_MB", "0"))
+EXCEL_WATCH_INTERVAL_SECONDS = float(os.getenv("EXCEL_WATCH_INTERVAL_SECONDS", "5"))
+ENGINE_GRAVACOES_DIR = os.getenv("ENGINE_GRAVACOES_DIR")
+FAKE_ENGINE_LATENCIA_MS = float(os.getenv("FAKE_ENGINE_LATENCIA_MS", "0"))
+FAKE_ENGINE_JITTER_MS = float(os.getenv("FAKE_ENGINE_JITTER_MS", "0"))
+SWEEP_MAX_COMBINACOES = int(os.getenv("SWEEP_MAX_COMBINACOES", "200"))
+# Despacho dos cálculos: local (neste processo) ou fila (workers via tabela de jobs)
+CALC_DISPATCH = os.getenv("CALC_DISPATCH", "local")
+JOBS_DATABASE_URL = os.getenv("JOBS_DATABASE_URL", DATABASE_PATH)
+JOB_MAX_TENTATIVAS = int(os.getenv("JOB_MAX_TENTATIVAS", "3"))
+JOB_TIMEOUT_SECONDS = float(os.getenv("JOB_TIMEOUT_SECONDS", "300"))
+# Escalonamento por prioridade (interativo / lote / precalculo); capacidade 0 desliga.
+# Padrão: as sessões do Excel; o motor fake (sem limite real de sessões) fica sem escalonamento
+SCHED_CAPACIDADE = int(os.getenv("SCHED_CAPACIDADE", str(EXCEL_POOL_SIZE if CALC_ENGINE == "excel" else 0)))
+SCHED_PESOS = interpretar_pesos(os.getenv("SCHED_PESOS"))  # ex.: "interativo=8,lote=2,precalculo=1"
+SCHED_RESERVA_INTERATIVA = int(os.getenv("SCHED_RESERVA_INTERATIVA", "0"))
+SCHED_MAX_POR_CLIENTE = int(os.getenv("SCHED_MAX_POR_CLIENTE", "0"))  # 0 = sem limite
+PRECOMPUTE_PLANO = os.getenv("PRECOMPUTE_PLANO")  # JSON com municípios × presets (ver data/precompute.example.json)
+# Consulta ao cache de resultados no /calculate: padrão ligada só com um plano de pré-cálculo
+RESULT_CACHE = os.getenv("RESULT_CACHE", "1" if PRECOMPUTE_PLANO else "0") == "1"
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", str(24 * 3600)))
+PRECOMPUTE_HORARIO = os.getenv("PRECOMPUTE_HORARIO")  # "HH:MM": pré-cálculo diário dentro da API
+PRECOMPUTE_PARALELO = int(os.getenv("PRECOMPUTE_PARALELO", "1"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR")  # partições de arquivo (padrão: <pasta do banco>/archive)
+RETENTION_ARCHIVE_DAYS = int(os.getenv("RETENTION_ARCHIVE_DAYS", "0"))  # 0 = não arquivar
+MAINTENANCE_HORARIO = os.getenv("MAINTENANCE_HORARIO")  # "HH:MM": manutenção diária dentro da API
+VACUUM_MAX_PAGINAS = int(os.getenv("VACUUM_MAX_PAGINAS", "0"))  # 0 = todas as páginas livres
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+STORAGE_WRITE_BEHIND = os.getenv("STORAGE_WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_MAX_FILA = int(os.getenv("WRITE_BEHIND_MAX_FILA", "1000"))
+WRITE_BEHIND_LOTE = int(os.getenv("WRITE_BEHIND_LOTE", "50"))
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILING_DIR = os.getenv("PROFILING_DIR", str(BASE_DIR / "data" / "profiles"))
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN")
 
 
 # Modelos Pydantic (baseados nos schemas)
@@ -67,16 +136,95 @@ class TableBlock(BaseModel):
 class CalculateResult(BaseModel):
     id: str
     created_at: str
+    workbook_version: Optional[str] = None  # Hash da planilha que produziu o resultado
     correcao_ate: str
     results_base: List[TableBlock]  # Resultados fixos da planilha (01/01/2025)
     results_atualizados: Optional[List[TableBlock]] = None  # Resultados com SELIC aplicada (se data > 01/01/2025)
 
 
+class SweepGrid(BaseModel):
+    honorários_s_valor_da_condenação: Optional[List[float]] = None
+    honorários_em_valor_fixo: Optional[List[float]] = None
+    deságio_a_aplicar_sobre_o_principal: Optional[List[float]] = None
+    deságio_em_a_aplicar_em_honorários: Optional[List[float]] = None
+
+
+class SweepInput(BaseModel):
+    base: CalculateInput
+    grade: SweepGrid
+    titulos: List[str] = Field(
+        default=["TOTAL DO VALOR PROPOSTO PARA ACORDO"],
+        description="Títulos (ou prefixos) das tabelas cujos totais serão retornados"
+    )
+
+
+class SweepResult(BaseModel):
+    correcao_ate: str
+    campos: List[str]  # Campos variados, na ordem das combinações
+    combinacoes: List[List[float]]
+    titulos: List[str]
+    header: List[str]
+    valores: List[List[List[Any]]]  # [combinação][título] → linha de total
+    valores_atualizados: Optional[List[List[List[Any]]]] = None
+
+
+class RecorrecaoInput(BaseModel):
+    correção_até: str = Field(..., description="Nova data de correção (posterior a 01/01/2025)")
+    ids: Optional[List[str]] = Field(default=None, description="Resultados a recorrigir")
+    desde: Optional[str] = Field(default=None, description="Criados a partir de (YYYY-MM-DD)")
+    ate: Optional[str] = Field(default=None, description="Criados até (YYYY-MM-DD)")
+    municipio: Optional[str] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida da API: no startup dispara o aquecimento em segundo plano e
+    a observação da planilha; no desligamento, drena a fila de gravação
+    (write-behind) e fecha o Excel.
+    """
+    warmup.iniciar()
+    if engine.nome == "excel":
+        watcher.iniciar()
+    if agendador_precompute is not None:
+        agendador_precompute.iniciar()
+    if agendador_manutencao is not None:
+        agendador_manutencao.iniciar()
+    yield
+    if agendador_precompute is not None:
+        agendador_precompute.parar()
+    if agendador_manutencao is not None:
+        agendador_manutencao.parar()
+    watcher.parar()
+    consultas_cache.gravar()
+    if isinstance(storage, WriteBehindStorage):
+        print("💾 Gravando resultados pendentes antes de encerrar...")
+        storage.close()
+    engine.encerrar()
+
+
+class JSONBytesResponse(Response):
+    """
+    Resposta JSON que aceita bytes já serializados (enviados como estão) ou
+    objetos Python (serializados via services.serialization).
+    
+    Retornar uma Response diretamente faz o FastAPI pular a revalidação pelo
+    response_model, que continua declarado apenas para a documentação.
+    """
+    media_type = "application/json"
+    
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
 # Inicialização do FastAPI
 app = FastAPI(
     title="ServFaz MVP - Excel Calculator API",
     description="API que usa Excel como motor de cálculo para processos jurídicos",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS (permitir requisições do frontend)
@@ -88,10 +236,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Inicializar banco de dados
-storage = init_database(DATABASE_PATH)
-selic_api = SelicAPI(SELIC_CACHE_PATH)
-selic_updater = SelicUpdater(SELIC_CACHE_PATH)
+# Compressão gzip para respostas grandes (ex.: /calculate). Respostas que já
+# definem Content-Encoding (GET /results/{id}) passam sem recompressão.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=6)
+
+# Objetos baratos no import; o trabalho caro fica para o aquecimento (abaixo)
+metrics = Metrics()
+storage = init_database(DATABASE_PATH, inicializar=False, arquivo_dir=ARCHIVE_DIR)
+if STORAGE_WRITE_BEHIND:
+    # Gravação fora do caminho da resposta (ver garantia de durabilidade em write_behind.py)
+    storage = WriteBehindStorage(storage, WRITE_BEHIND_MAX_FILA, WRITE_BEHIND_LOTE, metrics)
+selic_updater = SelicUpdater(SELIC_CACHE_PATH, SELIC_PRECISAO)
+selic_api: SelicAPI = selic_updater.selic_api
+engine = criar_engine(
+    CALC_ENGINE,
+    EXCEL_PATH,
+    MAPA_CELULAS_PATH,
+    SELIC_MAPPING_PATH,
+    ENGINE_GRAVACOES_DIR,
+    FAKE_ENGINE_LATENCIA_MS,
+    FAKE_ENGINE_JITTER_MS,
+    EXCEL_POOL_SIZE,
+    metrics,
+    EXCEL_WORKDIR,
+    EXCEL_PRAZOS,
+    EXCEL_MAX_RSS_MB
+)
+single_flight = SingleFlight(metrics)
+escalonador = Escalonador(SCHED_CAPACIDADE, SCHED_PESOS, SCHED_RESERVA_INTERATIVA, SCHED_MAX_POR_CLIENTE, metrics)
+fila_jobs = (
+    criar_fila(JOBS_DATABASE_URL, JOB_MAX_TENTATIVAS, SCHED_PESOS, SCHED_MAX_POR_CLIENTE)
+    if CALC_DISPATCH == "fila" else None
+)
+profiler = RequestProfiler(PROFILING_ENABLED, PROFILING_DIR, PROFILING_ADMIN_TOKEN)
+
+
+def _aquecer_selic() -> None:
+    """
+    Abre os índices SELIC (convertendo um selic_cache.json antigo para .bin, se
+    preciso) e importa a série diária offline, se configurada.
+    """
+    selic_api.cache.recarregar_se_mudou()
+    selic_api.cache_diario.recarregar_se_mudou()
+    if SELIC_DIARIA_OFFLINE_PATH and not selic_api.cache_diario.n_periodos:
+        # Série diária offline (ambientes sem acesso à API do BCB)
+        dias = selic_api.importar_selic_diaria(SELIC_DIARIA_OFFLINE_PATH, SelicUpdater.DATA_BASE.date())
+        print(f"📦 SELIC diária offline importada: {dias} dias")
+
+
+# Nova versão da planilha em EXCEL_PATH → sessões novas, antigas drenam
+watcher = WorkbookWatcher(EXCEL_PATH, EXCEL_WATCH_INTERVAL_SECONDS, engine.recarregar)
+
+warmup = Warmup()
+warmup.fase("banco", storage.verificar_esquema)
+warmup.fase("selic", _aquecer_selic)
+warmup.fase("motor", engine.aquecer)
 
 
 @app.get("/")
@@ -101,12 +300,363 @@ def root():
         "status": "online",
         "service": "ServFaz MVP",
         "excel_path": EXCEL_PATH,
-        "database_path": DATABASE_PATH
+        "engine": engine.nome,
+        "workbook_version": engine.versao,
+        "database_path": DATABASE_PATH,
+        "pronto": warmup.pronto
     }
 
 
+@app.get("/healthz")
+def healthz():
+    """Liveness: o processo está de pé (não depende do aquecimento)."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    """
+    Readiness: 200 só depois de aquecidos banco, índice SELIC e sessões do
+    Excel; 503 (com o estado de cada fase) enquanto a instância está fria.
+    """
+    corpo = {"pronto": warmup.pronto, "fases": warmup.estado()}
+    return JSONBytesResponse(corpo, status_code=200 if corpo["pronto"] else 503)
+
+
+def _prioridade(request: Request, padrao: str = CLASSE_INTERATIVA) -> Tuple[str, str]:
+    """
+    Classe de prioridade (header X-Prioridade) e cliente (header X-Cliente ou IP).
+    
+    Raises:
+        HTTPException 422 para classe desconhecida
+    """
+    try:
+        classe = validar_classe(request.headers.get("x-prioridade"), padrao)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    cliente = request.headers.get("x-cliente") or (request.client.host if request.client else "anonimo")
+    return classe, cliente
+
+
+def _executar_calculo(
+    input_data: CalculateInput,
+    classe: str = CLASSE_INTERATIVA,
+    cliente: Optional[str] = None
+):
+    """
+    Executa o cálculo no Excel e a atualização SELIC.
+    
+    O motor só é chamado com uma vaga do escalonador (classe de prioridade e
+    cliente): lotes não tomam todas as sessões do Excel.
+    
+    Returns:
+        (results_base, results_atualizados, versão da planilha); tabelas em
+        ResultSet, convertidas para JSON só em _calcular_e_salvar
+    """
+    # 1. Validar e garantir dados SELIC
+    print(f"📅 Validando SELIC para: {input_data.correção_até}")
+    try:
+        selic_value = selic_api.ensure_selic(input_data.correção_até)
+        if selic_value:
+            print(f"SELIC encontrada: {selic_value}%")
+    except Exception as selic_error:
+        print(f"⚠️ Aviso SELIC: {str(selic_error)}")
+        # Continuar mesmo sem SELIC (planilha pode ter dados suficientes)
+    
+    # 2. Executar cálculo no motor configurado (Excel por padrão)
+    print(f"Executando cálculo (motor: {engine.nome})")
+    metrics.incr("calculos_excel")
+    
+    with escalonador.vaga(classe, cliente):
+        versao, results = engine.executar_versionado(input_data.dict())
+    
+    print(f"{len(results)} blocos de tabela lidos com sucesso")
+    
+    # 3. Aplicar atualização SELIC (se data > 01/01/2025)
+    results_atualizados = None
+    if selic_updater.precisa_atualizacao(input_data.correção_até):
+        print(f"Aplicando atualização SELIC para {input_data.correção_até}...")
+        results_atualizados = selic_updater.atualizar_result_set(results, input_data.correção_até)
+        print(f"Resultados atualizados com SELIC gerados")
+    else:
+        print(f"Data de correção ≤ 01/01/2025. Sem atualização SELIC.")
+    
+    return results, results_atualizados, versao
+
+
+def _corpo_resposta(salvo: Tuple[str, str, dict, bytes, Optional[str]], compacto: bool) -> bytes:
+    """
+    Monta o corpo da resposta de /calculate (id + created_at + versão da planilha
+    + campos do output).
+    
+    Args:
+        salvo: (result_id, created_at, output_data, output_json, workbook_version)
+        compacto: True para o formato colunar (services/result_codec.py)
+    """
+    result_id, created_at, output_data, output_json, workbook_version = salvo
+    campos = {"id": result_id, "created_at": created_at}
+    if workbook_version:
+        campos["workbook_version"] = workbook_version
+    
+    if compacto:
+        return juntar_campos(campos, dumps(codificar_output(output_data)))
+    
+    return juntar_campos(campos, output_json)
+
+
+def _calcular_e_salvar(
+    input_data: CalculateInput,
+    chave: str,
+    classe: str = CLASSE_INTERATIVA,
+    cliente: Optional[str] = None
+) -> Tuple[str, str, dict, bytes, Optional[str]]:
+    """
+    Executa (ou reaproveita, via single-flight) o cálculo e salva um novo resultado.
+    
+    O output é serializado uma única vez: os mesmos bytes vão para o banco e
+    compõem o corpo da resposta.
+    
+    A coalescência é por versão da planilha: depois de uma recarga, um cálculo
+    novo não reaproveita um em andamento na versão anterior.
+    
+    Returns:
+        (result_id, created_at, output_data, output_json, workbook_version)
+    """
+    (results, results_atualizados, versao), lider = single_flight.executar(
+        f"{engine.versao}:{chave}", lambda: _executar_calculo(input_data, classe, cliente)
+    )
+    
+    if not lider:
+        print("🔁 Cálculo idêntico já em andamento; resultado reutilizado")
+    
+    # 4. Preparar resposta (ResultSet → formato JSON só aqui, na borda)
+    created_at = datetime.now().isoformat()
+    
+    output_data = {
+        "results_base": results.para_tabelas(),
+        "results_atualizados": results_atualizados.para_tabelas() if results_atualizados is not None else None,
+        "correcao_ate": input_data.correção_até
+    }
+    
+    output_json = dumps(output_data)
+    
+    # 5. Salvar no banco
+    print("💾 Salvando no banco de dados...")
+    result_id = storage.save_result(
+        input_data=input_data.dict(),
+        output_data=output_json,
+        workbook_version=versao,
+        created_at=created_at
+    )
+    
+    print(f"🎉 Cálculo concluído! ID: {result_id}")
+    
+    return result_id, created_at, output_data, output_json, versao
+
+
+def executar_job(input_dict: dict) -> str:
+    """Executa um job da fila neste processo (usado por scripts/worker.py)."""
+    input_data = CalculateInput(**input_dict)
+    return _calcular_e_salvar(input_data, single_flight.chave(input_data.dict()))[0]
+
+
+def _calcular_na_fila(
+    input_data: CalculateInput,
+    classe: str = CLASSE_INTERATIVA,
+    cliente: Optional[str] = None
+) -> Tuple[str, str, dict, bytes, Optional[str]]:
+    """
+    Enfileira o cálculo para os workers e aguarda o resultado salvo.
+    
+    Raises:
+        TimeoutError: nenhum worker concluiu o job em JOB_TIMEOUT_SECONDS
+    """
+    job_id = fila_jobs.enfileirar(input_data.dict(), classe, cliente)
+    print(f"📤 Cálculo enfileirado: job {job_id} ({classe})")
+    
+    job = fila_jobs.aguardar(job_id, JOB_TIMEOUT_SECONDS)
+    if job["status"] == STATUS_ERRO:
+        raise RuntimeError(f"Job {job_id} falhou: {job['erro']}")
+    
+    salvo = _carregar_salvo(job["result_id"])
+    if not salvo:
+        raise RuntimeError(f"Resultado {job['result_id']} do job {job_id} não encontrado")
+    return salvo
+
+
+def _despachar(
+    input_data: CalculateInput,
+    chave: str,
+    usar_cache: bool = RESULT_CACHE,
+    classe: str = CLASSE_INTERATIVA,
+    cliente: Optional[str] = None
+) -> Tuple[str, str, dict, bytes, Optional[str]]:
+    """
+    Devolve o resultado pré-calculado (cache de resultados) ou calcula e salva
+    neste processo ou, com CALC_DISPATCH=fila, via workers (na classe de
+    prioridade `classe`).
+    
+    Um acerto do cache devolve o resultado pré-calculado como foi salvo (id e
+    created_at do pré-cálculo): a requisição não cria um registro novo no
+    histórico.
+    """
+    if usar_cache:
+        result_id = consultas_cache.consultar(f"{engine.versao}:{chave}")
+        salvo = _carregar_salvo(result_id) if result_id else None
+        if salvo:
+            print(f"🌙 Resultado pré-calculado reaproveitado: {result_id}")
+            metrics.incr("result_cache_acertos")
+            return salvo
+        metrics.incr("result_cache_falhas")
+    
+    if fila_jobs is not None:
+        return _calcular_na_fila(input_data, classe, cliente)
+    return _calcular_e_salvar(input_data, chave, classe, cliente)
+
+
+def _carregar_salvo(result_id: str) -> Optional[Tuple[str, str, dict, bytes, Optional[str]]]:
+    """Resultado salvo no formato de _calcular_e_salvar, ou None."""
+    stored = storage.get_result(result_id)
+    if not stored:
+        return None
+    
+    output = stored["output_data"]
+    return stored["id"], stored["created_at"], output, dumps(output), stored["workbook_version"]
+
+
+def _precalcular(input_dict: dict) -> Tuple[str, Optional[str]]:
+    """Calcula um caso do pré-cálculo pelo mesmo caminho do /calculate, sem consultar o cache."""
+    input_data = CalculateInput(**input_dict)
+    salvo = _despachar(
+        input_data, single_flight.chave(input_data.dict()), False, CLASSE_PRECALCULO, "precompute"
+    )
+    return salvo[0], salvo[4]
+
+
+consultas_cache = ConsultasCache(storage)
+
+precomputador = Precomputador(
+    storage,
+    _precalcular,
+    lambda caso: CalculateInput(**caso).dict(),
+    lambda: engine.versao,
+    RESULT_CACHE_TTL_SECONDS,
+    metrics
+)
+
+
+def executar_precompute(plano_path: str, paralelo: int = PRECOMPUTE_PARALELO, forcar: bool = False) -> dict:
+    """Executa o plano de pré-cálculo (agendador da API e scripts/precompute.py)."""
+    return precomputador.executar(gerar_casos(carregar_plano(plano_path)), paralelo, forcar)
+
+
+agendador_precompute = (
+    AgendadorDiario(PRECOMPUTE_HORARIO, lambda: executar_precompute(PRECOMPUTE_PLANO), "precompute")
+    if PRECOMPUTE_PLANO and PRECOMPUTE_HORARIO else None
+)
+
+manutencao = Manutencao(storage, RETENTION_ARCHIVE_DAYS, VACUUM_MAX_PAGINAS, metrics)
+recorretor = Recorretor(storage, selic_updater, metrics)
+agendador_manutencao = (
+    AgendadorDiario(MAINTENANCE_HORARIO, manutencao.executar, "manutencao")
+    if MAINTENANCE_HORARIO else None
+)
+
+
+def _calcular_idempotente(
+    input_data: CalculateInput,
+    chave: str,
+    idempotency_key: str,
+    classe: str = CLASSE_INTERATIVA,
+    cliente: Optional[str] = None
+):
+    """
+    Calcula, salva e registra a Idempotency-Key apontando para o resultado.
+    
+    Returns:
+        (chave da entrada, resultado salvo) - a chave permite às retentativas
+        simultâneas conferir que enviaram o mesmo corpo
+    """
+    salvo = _despachar(input_data, chave, classe=classe, cliente=cliente)
+    storage.save_idempotency_key(idempotency_key, chave, salvo[0], IDEMPOTENCY_TTL_SECONDS)
+    return chave, salvo
+
+
+def _replay_idempotente(idempotency_key: str, chave: str) -> Optional[Tuple[str, str, dict, bytes, Optional[str]]]:
+    """
+    Retorna o resultado já salvo para uma Idempotency-Key válida, ou None.
+    
+    Raises:
+        HTTPException 422 se a chave foi usada com outro corpo de requisição
+    """
+    registro = storage.get_idempotency_key(idempotency_key)
+    if not registro:
+        return None
+    
+    if registro["request_hash"] != chave:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key já utilizada com outros dados de entrada"
+        )
+    
+    # Resultado deletado (None): tratar como chave nova
+    return _carregar_salvo(registro["result_id"])
+
+
+def _responder_calculo(
+    input_data: CalculateInput,
+    compacto: bool,
+    idempotency_key: Optional[str],
+    classe: str = CLASSE_INTERATIVA,
+    cliente: Optional[str] = None
+) -> Tuple[str, JSONBytesResponse]:
+    """
+    Calcula (ou devolve o replay idempotente) e monta a resposta de /calculate.
+    
+    Returns:
+        (result_id, resposta)
+    """
+    chave = single_flight.chave(input_data.dict())
+    media_type = MEDIA_TYPE_COMPACTO if compacto else None
+    
+    if not idempotency_key:
+        salvo = _despachar(input_data, chave, classe=classe, cliente=cliente)
+        return salvo[0], JSONBytesResponse(_corpo_resposta(salvo, compacto), media_type=media_type)
+    
+    replay = _replay_idempotente(idempotency_key, chave)
+    if replay:
+        print(f"♻️ Idempotency-Key repetida; devolvendo resultado {replay[0]}")
+        metrics.incr("idempotencia_replays")
+        return replay[0], JSONBytesResponse(
+            _corpo_resposta(replay, compacto),
+            media_type=media_type,
+            headers={"Idempotent-Replayed": "true"}
+        )
+    
+    # Retentativas simultâneas com a mesma chave aguardam a primeira
+    (chave_lider, salvo), lider = single_flight.executar(
+        f"idempotency:{idempotency_key}",
+        lambda: _calcular_idempotente(input_data, chave, idempotency_key, classe, cliente)
+    )
+    headers = {}
+    if not lider:
+        if chave_lider != chave:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key já utilizada com outros dados de entrada"
+            )
+        metrics.incr("idempotencia_replays")
+        headers["Idempotent-Replayed"] = "true"
+    return salvo[0], JSONBytesResponse(_corpo_resposta(salvo, compacto), media_type=media_type, headers=headers)
+
+
 @app.post("/calculate", response_model=CalculateResult)
-def calculate(input_data: CalculateInput):
+def calculate(
+    input_data: CalculateInput,
+    request: Request,
+    formato: Optional[str] = None,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """
     Endpoint principal de cálculo.
     
@@ -115,93 +665,363 @@ def calculate(input_data: CalculateInput):
     3. Escreve na planilha e executa cálculo
     4. Lê resultados das tabelas vermelhas
     5. Salva no banco e retorna JSON
+    
+    Requisições idênticas simultâneas compartilham uma única execução do Excel
+    (single-flight); cada uma ainda recebe seu próprio ID salvo.
+    
+    Com o header Idempotency-Key, uma repetição dentro do TTL devolve a resposta
+    já salva, sem recalcular nem inserir outra linha.
+    
+    Formato compacto (colunar) opcional: ?formato=compacto ou
+    Accept: application/vnd.servfaz.compact+json.
+    
+    Prioridade: header X-Prioridade (interativo - padrão -, lote ou
+    precalculo) e X-Cliente (padrão: IP) para o escalonador; integrações em
+    lote devem enviar X-Prioridade: lote.
+    
+    Perfilamento (administradores, com PROFILING_ENABLED=1): X-Profile: 1 ou
+    ?perfil=1 + X-Admin-Token. O perfil é salvo com o ID do resultado
+    (header X-Profile-Id) e baixado em GET /admin/profiles/{id}.
     """
     try:
-        # 1. Validar e garantir dados SELIC
-        print(f"📅 Validando SELIC para: {input_data.correção_até}")
-        try:
-            selic_value = selic_api.ensure_selic(input_data.correção_até)
-            if selic_value:
-                print(f"SELIC encontrada: {selic_value}%")
-        except Exception as selic_error:
-            print(f"⚠️ Aviso SELIC: {str(selic_error)}")
-            # Continuar mesmo sem SELIC (planilha pode ter dados suficientes)
-        
-        # 2. Executar cálculo no Excel
-        print(f"Abrindo Excel: {EXCEL_PATH}")
-        
-        with ExcelRunner(EXCEL_PATH, MAPA_CELULAS_PATH) as runner:
-            # Escrever inputs
-            print("✏️ Escrevendo dados na planilha...")
-            runner.write_inputs(input_data.dict())
-            
-            # Calcular
-            print("Executando cálculo...")
-            runner.calculate()
-            
-            # Ler resultados
-            print("📖 Lendo resultados das tabelas...")
-            results = runner.read_results()
+        compacto = quer_formato_compacto(formato, request.headers.get("accept"))
+        classe, cliente = _prioridade(request)
         
-        print(f"{len(results)} blocos de tabela lidos com sucesso")
+        if not profiler.solicitado(request.headers, request.query_params):
+            return _responder_calculo(input_data, compacto, idempotency_key, classe, cliente)[1]
         
-        # 3. Aplicar atualização SELIC (se data > 01/01/2025)
-        results_atualizados = None
-        if selic_updater.precisa_atualizacao(input_data.correção_até):
-            print(f"Aplicando atualização SELIC para {input_data.correção_até}...")
-            results_atualizados = selic_updater.atualizar_resultados(results, input_data.correção_até)
-            print(f"Resultados atualizados com SELIC gerados")
-        else:
-            print(f"Data de correção ≤ 01/01/2025. Sem atualização SELIC.")
-        
-        # 4. Preparar resposta
-        created_at = datetime.now().isoformat()
-        
-        output_data = {
-            "results_base": results,
-            "results_atualizados": results_atualizados,
-            "correcao_ate": input_data.correção_até
-        }
-        
-        # 5. Salvar no banco
-        print("💾 Salvando no banco de dados...")
-        result_id = storage.save_result(
-            input_data=input_data.dict(),
-            output_data=output_data
+        with profiler.perfilar() as perfil:
+            result_id, resposta = _responder_calculo(input_data, compacto, idempotency_key, classe, cliente)
+        profiler.salvar(perfil, result_id)
+        metrics.incr("perfis_gravados")
+        resposta.headers["X-Profile-Id"] = result_id
+        return resposta
+    
+    except HTTPException:
+        raise
+    except ProfilingError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Planilha não encontrada: {EXCEL_PATH}"
         )
+    except TimeoutError as e:
+        # Sessão do Excel travada, encerrada pelo watchdog
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        print(f"Erro no cálculo: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao processar cálculo: {str(e)}"
+        )
+
+
+@app.post("/calculate/sweep", response_model=SweepResult)
+def calculate_sweep(sweep_input: SweepInput, request: Request):
+    """
+    Varredura de cenários de acordo para um mesmo caso.
+    
+    Recebe um caso base e grades de valores para deságios/honorários e retorna
+    a matriz de totais de cada combinação, usando uma única sessão do Excel.
+    Os cenários não são salvos no histórico. A sessão passa pelo escalonador
+    como um cálculo (headers X-Prioridade / X-Cliente).
+    """
+    classe, cliente = _prioridade(request)
+    grade = sweep_input.grade.dict(exclude_none=True)
+    campos, combinacoes = gerar_combinacoes(grade)
+    
+    if not campos:
+        raise HTTPException(status_code=422, detail="Informe ao menos um campo com valores na grade")
+    
+    if len(combinacoes) > SWEEP_MAX_COMBINACOES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Grade com {len(combinacoes)} combinações excede o limite de {SWEEP_MAX_COMBINACOES}"
+        )
+    
+    try:
+        try:
+            selic_api.ensure_selic(sweep_input.base.correção_até)
+        except Exception as selic_error:
+            print(f"⚠️ Aviso SELIC: {str(selic_error)}")
         
-        # 6. Retornar resposta
-        response = {
-            "id": result_id,
-            "created_at": created_at,
-            "correcao_ate": input_data.correção_até,
-            "results_base": results,
-            "results_atualizados": results_atualizados
-        }
-        
-        print(f"🎉 Cálculo concluído! ID: {result_id}")
+        print(f"Varredura de {len(combinacoes)} cenários ({', '.join(campos)})")
         
-        return response
+        with escalonador.vaga(classe, cliente):
+            return engine.executar_sessao(
+                lambda runner: ScenarioSweep(runner, selic_updater).executar(
+                    sweep_input.base.dict(), grade, sweep_input.titulos
+                )
+            )
     
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
     except FileNotFoundError:
         raise HTTPException(
             status_code=500,
             detail=f"Planilha não encontrada: {EXCEL_PATH}"
         )
+    except TimeoutError as e:
+        # Sessão do Excel travada, encerrada pelo watchdog
+        raise HTTPException(status_code=504, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        print(f"Erro no cálculo: {str(e)}")
+        print(f"Erro na varredura: {str(e)}")
         raise HTTPException(
             status_code=500,
-            detail=f"Erro ao processar cálculo: {str(e)}"
+            detail=f"Erro ao processar varredura: {str(e)}"
+        )
+
+
+@app.post("/jobs", status_code=202)
+def create_job(input_data: CalculateInput, request: Request):
+    """
+    Enfileira um cálculo sem aguardar (CALC_DISPATCH=fila), na classe lote
+    por padrão (header X-Prioridade para outra classe).
+    Acompanhar em GET /jobs/{id}; concluído, o resultado fica em GET /results/{result_id}.
+    """
+    if fila_jobs is None:
+        raise HTTPException(status_code=501, detail="Fila de jobs desativada (CALC_DISPATCH=local)")
+    
+    classe, cliente = _prioridade(request, CLASSE_LOTE)
+    job_id = fila_jobs.enfileirar(input_data.dict(), classe, cliente)
+    return {"id": job_id, "status": "pendente", "classe": classe}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Estado de um job da fila (pendente, executando, concluido, erro)."""
+    job = fila_jobs.obter(job_id) if fila_jobs is not None else None
+    
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Job não encontrado: {job_id}"
+        )
+    
+    return job
+
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Contadores operacionais do processo (desde o último reinício).
+    """
+    return metrics.snapshot()
+
+
+@app.get("/scheduler/status")
+def scheduler_status(segundos: int = 3600):
+    """
+    Escalonador por prioridade: vagas, fila e espera por classe neste processo
+    e, com CALC_DISPATCH=fila, a espera dos jobs por classe nos últimos `segundos`.
+    """
+    estado = escalonador.estado()
+    if fila_jobs is not None:
+        estado["fila_jobs"] = fila_jobs.estatisticas_espera(max(1, segundos))
+    return estado
+
+
+@app.get("/precompute/report")
+def precompute_report(dias: int = 7):
+    """
+    Cobertura do plano de pré-cálculo no cache (por preset) e taxa de acerto
+    do cache de resultados nos últimos `dias` dias.
+    """
+    if not PRECOMPUTE_PLANO:
+        raise HTTPException(status_code=404, detail="Pré-cálculo não configurado (PRECOMPUTE_PLANO)")
+    
+    consultas_cache.gravar()
+    relatorio = precomputador.relatorio(gerar_casos(carregar_plano(PRECOMPUTE_PLANO)), max(1, dias))
+    relatorio["metricas"] = {
+        nome: valor for nome, valor in metrics.snapshot().items()
+        if nome.startswith(("result_cache_", "precompute_"))
+    }
+    return relatorio
+
+
+@app.get("/maintenance/report")
+def maintenance_report(detalhar: bool = False):
+    """
+    Tamanho e fragmentação do results.db e das partições de arquivo, com o
+    resumo da última manutenção (detalhar=true: espaço por tabela, lê o banco inteiro).
+    """
+    relatorio = manutencao.relatorio(detalhar)
+    relatorio["metricas"] = {
+        nome: valor for nome, valor in metrics.snapshot().items()
+        if nome.startswith("manutencao_")
+    }
+    return relatorio
+
+
+@app.get("/analytics/titulos")
+def analytics_titulos():
+    """Títulos de tabela (com o header) disponíveis para /analytics/valores."""
+    return storage.listar_titulos()
+
+
+@app.get("/analytics/valores")
+def analytics_valores(
+    coluna: str = "Valor Atualizado",
+    titulo: Optional[str] = None,
+    linha: str = "total",
+    atualizado: bool = False,
+    agrupar: str = "municipio",
+    municipio: Optional[str] = None,
+    desde: Optional[str] = None,
+    ate: Optional[str] = None,
+    limit: int = 1000
+):
+    """
+    Agrega um valor das tabelas de todos os resultados salvos, em SQL.
+    
+    Ex.: soma de "TOTAL DO VALOR PROPOSTO PARA ACORDO" por município no mês:
+    /analytics/valores?titulo=TOTAL DO VALOR PROPOSTO PARA ACORDO&coluna=1&desde=2025-10-01
+    
+    Args:
+        coluna: nome da coluna no header ou índice (1 em diante)
+        linha: "total", "todas" ou o índice da linha
+        agrupar: municipio, mes, dia, titulo, workbook_version ou nenhum
+        desde, ate: YYYY-MM-DD (inclusivas)
+    """
+    if linha not in ("total", "todas") and not linha.isdigit():
+        raise HTTPException(status_code=400, detail="linha deve ser 'total', 'todas' ou um índice")
+    
+    try:
+        grupos = storage.agregar_valores(
+            coluna=int(coluna) if coluna.isdigit() else coluna,
+            titulo=titulo,
+            linha={"total": LINHA_TOTAL, "todas": None}.get(linha, int(linha) if linha.isdigit() else None),
+            atualizado=atualizado,
+            agrupar=agrupar,
+            municipio=municipio,
+            desde=desde,
+            ate=ate,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"agrupar": agrupar, "coluna": coluna, "titulo": titulo, "grupos": grupos}
+
+
+@app.get("/results/search")
+def search_results(q: str, limit: int = 20, offset: int = 0):
+    """
+    Busca no histórico por município, datas (dd/mm/aaaa, mm/aaaa ou aaaa) e
+    nomes de tabela, ordenada por relevância e paginada.
+    
+    Declarado antes de /results/{result_id} para não ser capturado por ele.
+    """
+    try:
+        return storage.buscar_resultados(q, min(max(1, limit), 100), max(0, offset))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+
+@app.get("/results/export")
+def export_results(
+    formato: str = "csv",
+    desde: Optional[str] = None,
+    ate: Optional[str] = None,
+    municipio: Optional[str] = None,
+    atualizados: bool = True
+):
+    """
+    Exporta o histórico (uma linha por linha de tabela) em CSV, XLSX ou Parquet,
+    em streaming e com memória constante.
+    
+    Args:
+        formato: csv, xlsx (requer openpyxl) ou parquet (requer pyarrow)
+        desde, ate: YYYY-MM-DD (inclusivas) sobre a data de criação
+        municipio: filtrar um município
+        atualizados: incluir as tabelas de results_atualizados
+    """
+    formato = formato.lower()
+    motivo = formato_disponivel(formato)
+    if motivo:
+        raise HTTPException(status_code=400 if formato not in FORMATOS_EXPORTACAO else 501, detail=motivo)
+    
+    media_type, extensao = FORMATOS_EXPORTACAO[formato]
+    nome = f"servfaz-resultados-{datetime.now():%Y%m%d-%H%M%S}.{extensao}"
+    print(f"📤 Exportando histórico ({formato}, desde={desde}, ate={ate}, município={municipio})")
+    
+    return StreamingResponse(
+        exportar(
+            formato,
+            storage.iterar_resultados(desde, ate, municipio),
+            [titulo["header"] for titulo in storage.listar_titulos()],
+            atualizados
+        ),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nome}"'}
+    )
+
+
+@app.post("/results/recorrecao")
+def recorrigir_resultados(pedido: RecorrecaoInput):
+    """
+    Leva resultados salvos a uma nova data de correção sem o Excel: aplica só
+    a camada SELIC sobre o results_base salvo e grava novos resultados ligados
+    aos originais (origem_id).
+    
+    Seleção por ids ou por filtro (desde/ate/municipio, como em /results/export).
+    Resultados com correção original anterior a 01/01/2025 são ignorados
+    (exigem novo cálculo pela planilha).
+    """
+    try:
+        return recorretor.recorrigir(
+            pedido.correção_até,
+            ids=pedido.ids,
+            desde=pedido.desde,
+            ate=pedido.ate,
+            municipio=pedido.municipio
         )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 
 @app.get("/results/{result_id}")
-def get_result(result_id: str):
+def get_result(result_id: str, request: Request, formato: Optional[str] = None):
     """
     Recupera um resultado específico pelo ID.
+    
+    O JSON salvo é devolvido como está, sem decodificar/recodificar.
+    Resultados são imutáveis: ETag forte + Cache-Control immutable, 304 para
+    If-None-Match correspondente e compressão br/gzip conforme Accept-Encoding.
+    Com ?formato=compacto (ou Accept compacto), output_data vem no formato colunar.
     """
-    result = storage.get_result(result_id)
+    etag = storage.get_result_etag(result_id)
+    
+    if not etag:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Resultado não encontrado: {result_id}"
+        )
+    
+    compacto = quer_formato_compacto(formato, request.headers.get("accept"))
+    if compacto:
+        # ETag distinto por representação
+        etag = etag[:-1] + '-c"'
+    
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL_IMUTAVEL, "Vary": "Accept, Accept-Encoding"}
+    
+    if etag_corresponde(request.headers.get("if-none-match"), etag):
+        metrics.incr("results_304")
+        return Response(status_code=304, headers=headers)
+    
+    if compacto:
+        stored = storage.get_result(result_id)
+        result = stored and juntar_campos(
+            {k: stored[k] for k in ("id", "created_at", "workbook_version") if stored[k]},
+            dumps({"input_data": stored["input_data"], "output_data": codificar_output(stored["output_data"])})
+        )
+    else:
+        result = storage.get_result_raw(result_id)
     
     if not result:
         raise HTTPException(
@@ -209,7 +1029,15 @@ def get_result(result_id: str):
             detail=f"Resultado não encontrado: {result_id}"
         )
     
-    return result
+    corpo, encoding = comprimir(result, request.headers.get("accept-encoding"))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    
+    return JSONBytesResponse(
+        corpo,
+        media_type=MEDIA_TYPE_COMPACTO if compacto else None,
+        headers=headers
+    )
 
 
 @app.get("/results")
@@ -237,6 +1065,26 @@ def delete_result(result_id: str):
     return {"message": f"Resultado {result_id} deletado com sucesso"}
 
 
+@app.get("/admin/profiles/{result_id}")
+def get_profile(result_id: str, request: Request):
+    """
+    Baixa o perfil (pstats) gravado para um resultado. Requer X-Admin-Token.
+    """
+    try:
+        profiler.verificar_admin(request.headers)
+    except ProfilingError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    
+    caminho = profiler.caminho(result_id)
+    if not caminho:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Perfil não encontrado: {result_id}"
+        )
+    
+    return FileResponse(caminho, media_type="application/octet-stream", filename=caminho.name)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,339 @@
+"""
+Motores de cálculo plugáveis.
+
+O /calculate depende apenas da interface CalculationEngine (entrada do
+formulário → tabelas da aba RESUMO). Assim é possível trocar o Excel real
+por um motor falso determinístico em ambientes sem Excel (CI Linux, testes
+de carga).
+
+DECISÕES TÉCNICAS:
+- ExcelEngine: sessões do ExcelPool (xlwings, reaproveitadas entre cálculos);
+  opcionalmente grava cada par entrada/saída em JSON para replay pelo FakeEngine
+- Todo resultado sai com a versão da planilha que o produziu
+  (executar_versionado); recarregar() troca o pool por um da nova versão
+  sem interromper os cálculos em andamento
+- FakeEngine: replay das gravações com latência configurável. Entrada
+  gravada → a saída gravada; entrada nova → uma das gravações escolhida
+  de forma determinística pelo hash da entrada; sem gravações → tabelas
+  sintéticas determinísticas com o layout real (selic_mapping.json)
+- Saída em ResultSet (services/result_set.py), imutável: o FakeEngine devolve
+  a mesma gravação a todos os chamadores sem cópia
+- Seleção via variável de ambiente CALC_ENGINE (excel | fake)
+"""
+
+import json
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .excel_pool import ExcelPool, PoolEncerradoError
+from .excel_runner import ExcelRunner
+from .metrics import Metrics
+from .profiling import propagar
+from .result_set import ResultSet
+from .single_flight import SingleFlight
+from .workbook_watcher import versao_planilha
+
+
+# Mesma normalização usada na coalescência de requisições
+chave_entrada = SingleFlight.chave
+
+
+class CalculationEngine(ABC):
+    """
+    Interface dos motores de cálculo.
+    """
+
+    nome = "base"
+
+    @abstractmethod
+    def executar(self, input_data: Dict[str, Any]) -> ResultSet:
+        """
+        Executa um cálculo completo.
+
+        Args:
+            input_data: Dados do formulário (conforme CalculateInput)
+
+        Returns:
+            Blocos de tabela (titulo, header, rows, total) em um ResultSet
+        """
+    
+    @property
+    def versao(self) -> Optional[str]:
+        """Versão da planilha usada nos cálculos (None: motor sem planilha)."""
+        return None
+    
+    def executar_versionado(self, input_data: Dict[str, Any]) -> Tuple[Optional[str], ResultSet]:
+        """
+        Executa um cálculo e informa a versão da planilha que o produziu.
+        
+        Returns:
+            (versão, blocos de tabela)
+        """
+        return self.versao, self.executar(input_data)
+    
+    def recarregar(self) -> bool:
+        """
+        Passa a usar a versão atual da planilha, se ela mudou.
+        
+        Returns:
+            True se uma nova versão foi carregada
+        """
+        return False
+    
+    def executar_sessao(self, funcao: Callable[[ExcelRunner], Any]) -> Any:
+        """
+        Executa `funcao(runner)` com uma sessão aberta da planilha
+        (ex.: varredura de cenários).
+        """
+        raise NotImplementedError(f"O motor '{self.nome}' não oferece sessões da planilha")
+    
+    def aquecer(self) -> None:
+        """Prepara o motor antes do primeiro cálculo (padrão: nada a fazer)."""
+        pass
+    
+    def encerrar(self) -> None:
+        """Libera os recursos do motor no desligamento (padrão: nada a fazer)."""
+        pass
+
+
+class ExcelEngine(CalculationEngine):
+    """
+    Motor real: escreve na planilha, recalcula e lê as tabelas via ExcelRunner.
+    """
+
+    nome = "excel"
+
+    def __init__(
+        self,
+        excel_path: str,
+        mapa_celulas_path: str,
+        gravacoes_dir: Optional[str] = None,
+        tamanho_pool: int = 1,
+        metrics: Optional[Metrics] = None,
+        diretorio_copias: Optional[str] = None,
+        prazos: Optional[Dict[str, float]] = None,
+        max_rss_mb: float = 0
+    ):
+        self.excel_path = excel_path
+        self.mapa_celulas_path = mapa_celulas_path
+        self.gravacoes_dir = Path(gravacoes_dir) if gravacoes_dir else None
+        self.tamanho_pool = tamanho_pool
+        self.metrics = metrics
+        self.diretorio_copias = diretorio_copias
+        self.prazos = prazos
+        self.max_rss_mb = max_rss_mb
+        self._lock_recarga = threading.Lock()
+        self.pool = self._novo_pool(versao_planilha(excel_path))
+
+    @property
+    def versao(self) -> Optional[str]:
+        return self.pool.versao
+
+    def executar(self, input_data: Dict[str, Any]) -> ResultSet:
+        return self.executar_versionado(input_data)[1]
+
+    def executar_versionado(self, input_data: Dict[str, Any]) -> Tuple[Optional[str], ResultSet]:
+        versao, results = self._no_pool_atual(lambda runner: self._calcular(runner, input_data))
+
+        if self.gravacoes_dir:
+            self._gravar(input_data, results)
+
+        return versao, results
+
+    def executar_sessao(self, funcao: Callable[[ExcelRunner], Any]) -> Any:
+        return self._no_pool_atual(funcao)[1]
+
+    def aquecer(self) -> None:
+        # Excel órfãos de execuções anteriores saem antes de abrir as sessões novas
+        self.pool.limpar_orfaos()
+        self.pool.aquecer()
+
+    def encerrar(self) -> None:
+        self.pool.encerrar()
+
+    def recarregar(self) -> bool:
+        with self._lock_recarga:
+            versao = versao_planilha(self.excel_path)
+            if versao is None or versao == self.pool.versao:
+                return False
+
+            print(f"🔄 Nova versão da planilha ({self.pool.versao} → {versao}); abrindo sessões...")
+            novo = self._novo_pool(versao)
+            try:
+                novo.aquecer()
+            except Exception:
+                novo.encerrar()
+                raise
+
+            antigo, self.pool = self.pool, novo
+
+        if self.metrics:
+            self.metrics.incr("planilha_recargas")
+        # Sessões antigas terminam os cálculos já enfileirados e fecham
+        threading.Thread(target=antigo.encerrar, name=f"excel-drenagem-{antigo.versao}", daemon=True).start()
+        print(f"✅ Planilha {versao} em uso")
+        return True
+
+    def _novo_pool(self, versao: Optional[str]) -> ExcelPool:
+        return ExcelPool(
+            self.excel_path,
+            self.mapa_celulas_path,
+            self.tamanho_pool,
+            self.metrics,
+            versao,
+            self.diretorio_copias,
+            self.prazos,
+            self.max_rss_mb
+        )
+
+    def _no_pool_atual(self, funcao: Callable[[ExcelRunner], Any]) -> Tuple[Optional[str], Any]:
+        """Executa no pool vigente; se ele acabou de ser trocado, usa o novo."""
+        while True:
+            pool = self.pool
+            try:
+                resultado = pool.executar(propagar(funcao))
+            except PoolEncerradoError:
+                if pool is self.pool:
+                    raise
+                continue
+            # Depois de executar: o pool só fixa a versão ao preparar o modelo
+            return pool.versao, resultado
+
+    @staticmethod
+    def _calcular(runner: ExcelRunner, input_data: Dict[str, Any]) -> ResultSet:
+        print("✏️ Escrevendo dados na planilha...")
+        runner.write_inputs(input_data)
+
+        print("Executando cálculo...")
+        runner.calculate()
+
+        print("📖 Lendo resultados das tabelas...")
+        return ResultSet.de_tabelas(runner.read_results())
+
+    def _gravar(self, input_data: Dict[str, Any], results: ResultSet) -> None:
+        """Salva o par entrada/saída para replay pelo FakeEngine."""
+        self.gravacoes_dir.mkdir(parents=True, exist_ok=True)
+        caminho = self.gravacoes_dir / f"{chave_entrada(input_data)}.json"
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump({"input": input_data, "results": results.para_tabelas()}, f, ensure_ascii=False)
+
+
+class FakeEngine(CalculationEngine):
+    """
+    Motor falso determinístico para CI e testes de carga.
+    """
+
+    nome = "fake"
+
+    TITULO_ACORDO = "TOTAL DO VALOR PROPOSTO PARA ACORDO"
+
+    def __init__(
+        self,
+        layout_path: str,
+        gravacoes_dir: Optional[str] = None,
+        latencia_ms: float = 0,
+        jitter_ms: float = 0
+    ):
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self._aleatorio = random.Random(0)
+
+        # Layout real das tabelas (títulos e cabeçalhos)
+        with open(layout_path, 'r', encoding='utf-8') as f:
+            self.layout = json.load(f)["tabelas_afetadas"]
+
+        # Gravações de saídas reais da aba RESUMO, indexadas pela entrada
+        self.gravacoes: Dict[str, ResultSet] = {}
+        if gravacoes_dir and Path(gravacoes_dir).exists():
+            for caminho in sorted(Path(gravacoes_dir).glob("*.json")):
+                with open(caminho, 'r', encoding='utf-8') as f:
+                    gravacao = json.load(f)
+                self.gravacoes[chave_entrada(gravacao["input"])] = ResultSet.de_tabelas(gravacao["results"])
+
+    def executar(self, input_data: Dict[str, Any]) -> ResultSet:
+        if self.latencia_ms or self.jitter_ms:
+            atraso = self.latencia_ms + self._aleatorio.uniform(0, self.jitter_ms)
+            time.sleep(atraso / 1000)
+
+        chave = chave_entrada(input_data)
+        if chave in self.gravacoes:
+            gravacao = self.gravacoes[chave]
+        elif self.gravacoes:
+            chaves = sorted(self.gravacoes)
+            gravacao = self.gravacoes[chaves[int(chave[:16], 16) % len(chaves)]]
+        else:
+            return self._sintetizar(chave, input_data)
+
+        # ResultSet é imutável: a mesma gravação serve a todos os chamadores
+        return gravacao
+
+    def _sintetizar(self, chave: str, input_data: Dict[str, Any]) -> ResultSet:
+        """
+        Gera tabelas sintéticas determinísticas (mesma entrada → mesmos valores),
+        sensíveis aos percentuais de honorários e deságio.
+        """
+        gerador = random.Random(int(chave[:16], 16))
+        honorarios = float(input_data.get("honorários_s_valor_da_condenação") or 0) / 100
+        honorarios_fixo = float(input_data.get("honorários_em_valor_fixo") or 0)
+        desagio = float(input_data.get("deságio_a_aplicar_sobre_o_principal") or 0) / 100
+        desagio_honorarios = float(input_data.get("deságio_em_a_aplicar_em_honorários") or 0) / 100
+
+        results = []
+        for tabela in self.layout:
+            corrigido = round(gerador.uniform(1e6, 5e7), 2)
+            juros = round(corrigido * gerador.uniform(0.1, 0.6), 2)
+            atualizado = round((corrigido + juros) * (1 - desagio), 2)
+            valor_honorarios = round(atualizado * honorarios * (1 - desagio_honorarios), 2)
+            linha = ["Principal", corrigido, juros, atualizado, valor_honorarios, honorarios_fixo, None]
+            results.append({
+                "titulo": tabela["titulo"],
+                "header": list(tabela["header"]),
+                "rows": [linha],
+                "total": ["TOTAL"] + linha[1:],
+            })
+
+        acordo = results[0]["total"]
+        results.append({
+            "titulo": self.TITULO_ACORDO,
+            "header": list(self.layout[0]["header"]),
+            "rows": [["Valor proposto"] + acordo[1:]],
+            "total": ["TOTAL"] + acordo[1:],
+        })
+        return ResultSet.de_tabelas(results)
+
+
+def criar_engine(
+    tipo: str,
+    excel_path: str,
+    mapa_celulas_path: str,
+    layout_path: str,
+    gravacoes_dir: Optional[str] = None,
+    latencia_ms: float = 0,
+    jitter_ms: float = 0,
+    tamanho_pool: int = 1,
+    metrics: Optional[Metrics] = None,
+    diretorio_copias: Optional[str] = None,
+    prazos: Optional[Dict[str, float]] = None,
+    max_rss_mb: float = 0
+) -> CalculationEngine:
+    """
+    Cria o motor de cálculo configurado.
+
+    Args:
+        tipo: "excel" (padrão) ou "fake"
+        tamanho_pool: Sessões do Excel mantidas abertas (motor "excel")
+        diretorio_copias: Onde ficam as cópias privadas da planilha (motor "excel")
+        prazos: Prazo em segundos por etapa da sessão do Excel (watchdog)
+        max_rss_mb: Memória residente que faz a sessão ser reciclada (0 = sem limite)
+    """
+    if tipo == "fake":
+        return FakeEngine(layout_path, gravacoes_dir, latencia_ms, jitter_ms)
+    if tipo == "excel":
+        return ExcelEngine(
+            excel_path, mapa_celulas_path, gravacoes_dir, tamanho_pool, metrics, diretorio_copias, prazos, max_rss_mb
+        )
+    raise ValueError(f"Motor de cálculo desconhecido: {tipo}")
@@ -0,0 +1,358 @@
+"""
+Pool de sessões do Excel reutilizadas entre cálculos.
+
+Abrir o Excel + planilhamae.xlsx custa vários segundos; sem o pool, cada
+cálculo pagava essa partida a frio. O pool mantém N sessões abertas
+(EXCEL_POOL_SIZE), pré-abertas no aquecimento da API.
+
+DECISÕES TÉCNICAS:
+- Uma thread dedicada por sessão: objetos COM do Excel pertencem à thread
+  que os criou (apartment), então a sessão nunca troca de thread; os cálculos
+  são enviados às threads por uma fila compartilhada (quem estiver livre pega)
+- pythoncom.CoInitialize/CoUninitialize por thread quando disponível (Windows)
+- Sessão descartada (fechada e reaberta no próximo cálculo) após qualquer erro,
+  pois o Excel pode ter ficado em estado inconsistente
+- Sem aquecimento, as sessões abrem sob demanda no primeiro cálculo de cada thread
+- Um pool serve uma única versão da planilha (`versao`); na recarga a quente o
+  motor sobe um pool novo e encerra o antigo, que drena os cálculos já
+  enfileirados. Pool encerrado recusa cálculos novos (PoolEncerradoError)
+- Cada sessão abre uma cópia privada da planilha (diretorio_copias, ex. um
+  tmpfs), nunca o arquivo mestre: várias sessões no mesmo arquivo geravam
+  avisos de somente leitura/arquivo bloqueado e serializavam o I/O. As cópias
+  saem de um modelo intocado copiado do mestre uma vez por pool (a versão do
+  pool é o hash desse modelo); ao reabrir a sessão (reset após erro) a cópia
+  é refeita a partir do modelo. Entradas nunca voltam ao arquivo mestre
+- Sessões supervisionadas pelo ExcelWatchdog (prazos por etapa, memória,
+  órfãos de execuções anteriores; ver services/excel_watchdog.py)
+"""
+
+import itertools
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, InvalidStateError
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .excel_runner import ExcelRunner
+from .excel_watchdog import ExcelWatchdog, RegistroProcessos, memoria_residente_mb, psutil, remover_copias_orfas
+from .metrics import Metrics
+from .workbook_watcher import versao_planilha
+
+try:
+    import pythoncom
+except ImportError:  # pywin32 só existe no Windows
+    pythoncom = None
+
+
+_ENCERRAR = object()
+_SEQUENCIA_MODELO = itertools.count()
+
+DIRETORIO_COPIAS_PADRAO = str(Path(tempfile.gettempdir()) / "servfaz-excel")
+
+
+class PoolEncerradoError(RuntimeError):
+    """Cálculo enviado a um pool já encerrado (ex.: substituído na recarga)."""
+    pass
+
+
+def _concluir(futuro: Future, resultado: Any = None, erro: Optional[BaseException] = None) -> None:
+    """Conclui o futuro, a menos que o watchdog já o tenha falhado."""
+    try:
+        if erro is not None:
+            futuro.set_exception(erro)
+        else:
+            futuro.set_result(resultado)
+    except InvalidStateError:
+        pass
+
+
+class _Sessao:
+    """Estado de uma thread do pool, visível para o watchdog."""
+
+    def __init__(self, nome: str, aquecendo: bool):
+        self.nome = nome
+        self.aquecendo = aquecendo
+        self.thread: Optional[threading.Thread] = None
+        self.runner: Optional[ExcelRunner] = None
+        self.aberta = False  # Conta em sessoes_abertas
+        self.futuro: Optional[Future] = None
+        self.morta_em: Optional[float] = None  # Excel encerrado pelo watchdog
+        self.abandonada = False  # Thread substituída (presa mesmo após a morte do Excel)
+
+    def falhar(self, erro: BaseException) -> None:
+        """Falha o cálculo em andamento (o chamador deixa de esperar)."""
+        futuro = self.futuro
+        if futuro is not None and not futuro.done():
+            _concluir(futuro, erro=erro)
+
+
+class ExcelPool:
+    """
+    Conjunto de sessões do Excel, cada uma presa a uma thread própria.
+    """
+
+    def __init__(
+        self,
+        excel_path: str,
+        mapa_celulas_path: str,
+        tamanho: int = 1,
+        metrics: Optional[Metrics] = None,
+        versao: Optional[str] = None,
+        diretorio_copias: Optional[str] = None,
+        prazos: Optional[Dict[str, float]] = None,
+        max_rss_mb: float = 0
+    ):
+        self.excel_path = excel_path
+        self.mapa_celulas_path = mapa_celulas_path
+        self.tamanho = max(1, tamanho)
+        self.metrics = metrics
+        self.versao = versao
+        self.diretorio_copias = Path(diretorio_copias or DIRETORIO_COPIAS_PADRAO)
+        self.max_rss_mb = max_rss_mb
+        self.registro = RegistroProcessos(self.diretorio_copias / "pids")
+        self.watchdog = ExcelWatchdog(self, prazos, metrics=metrics)
+        self._modelo: Optional[Path] = None
+
+        self._fila: "queue.Queue[Any]" = queue.Queue()
+        self._sessoes: List[_Sessao] = []
+        self._lock = threading.Lock()
+        self._abertas = 0
+        self._aquecidas = threading.Semaphore(0)
+        self._erro_aquecimento: Optional[BaseException] = None
+        self._encerrado = False
+        self._nomes = itertools.count()
+
+        if max_rss_mb and psutil is None:
+            print("⚠️ EXCEL_MAX_RSS_MB requer psutil: reciclagem por memória desativada")
+
+    @property
+    def sessoes_abertas(self) -> int:
+        return self._abertas
+
+    def sessoes(self) -> List[_Sessao]:
+        """Sessões ativas (cópia da lista, para o watchdog)."""
+        with self._lock:
+            return list(self._sessoes)
+
+    def iniciar(self, aquecer: bool = False) -> None:
+        """
+        Sobe as threads do pool e o watchdog (idempotente).
+
+        Args:
+            aquecer: Abre as sessões imediatamente em vez de no primeiro cálculo
+        """
+        with self._lock:
+            if self._sessoes or self._encerrado:
+                return
+            for _ in range(self.tamanho):
+                self._nova_sessao(aquecer)
+        self.watchdog.iniciar()
+
+    def _nova_sessao(self, aquecer: bool) -> None:
+        """Sobe a thread de uma sessão (chamar com self._lock)."""
+        sessao = _Sessao(f"excel-{next(self._nomes)}", aquecer)
+        sessao.thread = threading.Thread(target=self._loop, args=(sessao,), name=sessao.nome, daemon=True)
+        self._sessoes.append(sessao)
+        sessao.thread.start()
+
+    def substituir(self, sessao: _Sessao) -> None:
+        """Abandona a thread de uma sessão presa e sobe outra no lugar."""
+        with self._lock:
+            if sessao.abandonada:
+                return
+            sessao.abandonada = True
+            if sessao in self._sessoes:
+                self._sessoes.remove(sessao)
+            if not self._encerrado:
+                self._nova_sessao(sessao.aquecendo)
+            if sessao.aberta:
+                sessao.aberta = False
+                self._abertas -= 1
+        runner = sessao.runner
+        if runner is not None:
+            self.registro.remover(runner.pid)
+        if self.metrics:
+            self.metrics.incr("excel_threads_substituidas")
+
+    def limpar_orfaos(self) -> int:
+        """
+        Encerra Excel e apaga cópias deixados por execuções anteriores do serviço.
+
+        Returns:
+            Quantidade de processos do Excel encerrados
+        """
+        encerrados = self.registro.encerrar_orfaos()
+        remover_copias_orfas(self.diretorio_copias)
+        if encerrados and self.metrics:
+            self.metrics.incr("excel_orfaos_encerrados", encerrados)
+        return encerrados
+
+    def aquecer(self, timeout: Optional[float] = None) -> None:
+        """
+        Abre todas as sessões e aguarda até estarem prontas.
+
+        Raises:
+            Exceção da primeira sessão que falhou ao abrir
+        """
+        self.iniciar(aquecer=True)
+        for _ in range(self.tamanho):
+            if not self._aquecidas.acquire(timeout=timeout):
+                raise TimeoutError("Tempo esgotado abrindo as sessões do Excel")
+        if self._erro_aquecimento is not None:
+            raise self._erro_aquecimento
+
+    def executar(self, funcao: Callable[[ExcelRunner], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Executa `funcao(runner)` em uma sessão livre e retorna o resultado.
+        """
+        self.iniciar()
+        futuro: Future = Future()
+        with self._lock:
+            # Sob o lock: nenhum cálculo entra na fila depois dos sinais de encerramento
+            if self._encerrado:
+                raise PoolEncerradoError("Pool do Excel encerrado")
+            self._fila.put((funcao, futuro))
+        return futuro.result(timeout)
+
+    def encerrar(self) -> None:
+        """Fecha todas as sessões (cálculos já enfileirados terminam antes)."""
+        with self._lock:
+            self._encerrado = True
+            sessoes = list(self._sessoes)
+            for _ in sessoes:
+                self._fila.put(_ENCERRAR)
+        for sessao in sessoes:
+            # O watchdog segue ativo: uma sessão presa é morta/abandonada em vez de travar o desligamento
+            while sessao.thread.is_alive() and not sessao.abandonada:
+                sessao.thread.join(0.5)
+        self.watchdog.parar()
+
+        with self._lock:
+            self._sessoes = []
+            modelo, self._modelo = self._modelo, None
+        if modelo is not None:
+            modelo.unlink(missing_ok=True)
+
+    def _preparar_modelo(self) -> Path:
+        """Copia o arquivo mestre para o modelo intocado do pool (uma vez)."""
+        with self._lock:
+            if self._modelo is None:
+                self.diretorio_copias.mkdir(parents=True, exist_ok=True)
+                sufixo = Path(self.excel_path).suffix
+                modelo = self.diretorio_copias / f"modelo-{os.getpid()}-{next(_SEQUENCIA_MODELO)}{sufixo}"
+                shutil.copyfile(self.excel_path, modelo)
+                # A versão servida é a do conteúdo efetivamente copiado
+                self.versao = versao_planilha(str(modelo))
+                self._modelo = modelo
+            return self._modelo
+
+    def _abrir_sessao(self, sessao: _Sessao) -> ExcelRunner:
+        modelo = self._preparar_modelo()
+        copia = modelo.with_name(f"{modelo.stem}-{sessao.nome}{modelo.suffix}")
+        shutil.copyfile(modelo, copia)
+
+        runner = ExcelRunner(str(copia), self.mapa_celulas_path)
+        sessao.runner = runner  # Visível ao watchdog já durante a abertura
+        try:
+            runner.abrir()
+        except BaseException:
+            sessao.runner = None
+            sessao.morta_em = None
+            try:
+                runner.fechar()
+            except Exception:
+                pass
+            copia.unlink(missing_ok=True)
+            raise
+        self.registro.registrar(runner.pid)
+        with self._lock:
+            sessao.aberta = True
+            self._abertas += 1
+        if self.metrics:
+            self.metrics.incr("excel_sessoes_abertas")
+        print(f"📗 Sessão do Excel aberta ({sessao.nome}, planilha {self.versao})")
+        return runner
+
+    def _fechar_sessao(self, sessao: _Sessao) -> None:
+        runner, sessao.runner = sessao.runner, None
+        if runner is None:
+            return
+        if not sessao.abandonada:
+            # Abandonada: o Excel já foi morto e o registro ajustado em substituir()
+            try:
+                runner.fechar()
+            except Exception as e:
+                print(f"⚠️ Erro ao fechar sessão do Excel: {str(e)}")
+            self.registro.remover(runner.pid)
+        try:
+            runner.excel_path.unlink(missing_ok=True)
+        except OSError as e:
+            print(f"⚠️ Não foi possível remover a cópia {runner.excel_path.name}: {str(e)}")
+        with self._lock:
+            if sessao.aberta:
+                sessao.aberta = False
+                self._abertas -= 1
+
+    def _reciclar_se_pesada(self, sessao: _Sessao) -> None:
+        """Fecha a sessão (reaberta no próximo cálculo) se o Excel passou do limite de memória."""
+        runner = sessao.runner
+        if not self.max_rss_mb or runner is None or runner.pid is None:
+            return
+        rss = memoria_residente_mb(runner.pid)
+        if rss is not None and rss > self.max_rss_mb:
+            print(f"♻️ Sessão {sessao.nome} com {rss:.0f} MB (limite {self.max_rss_mb:g} MB); reciclando")
+            self._fechar_sessao(sessao)
+            if self.metrics:
+                self.metrics.incr("excel_sessoes_recicladas")
+
+    def _loop(self, sessao: _Sessao) -> None:
+        """Thread de uma sessão: abre (se aquecer) e atende cálculos da fila."""
+        if pythoncom is not None:
+            pythoncom.CoInitialize()
+
+        try:
+            if sessao.aquecendo:
+                try:
+                    self._abrir_sessao(sessao)
+                except Exception as e:
+                    print(f"Erro ao abrir sessão do Excel: {str(e)}")
+                    self._erro_aquecimento = e
+                finally:
+                    sessao.aquecendo = False
+                    self._aquecidas.release()
+
+            while not sessao.abandonada:
+                item = self._fila.get()
+                if item is _ENCERRAR:
+                    break
+
+                funcao, futuro = item
+                if not futuro.set_running_or_notify_cancel():
+                    continue
+
+                sessao.futuro = futuro
+                try:
+                    if sessao.runner is None:
+                        self._abrir_sessao(sessao)
+                    _concluir(futuro, funcao(sessao.runner))
+                except BaseException as e:
+                    _concluir(futuro, erro=e)
+                    # O Excel pode ter ficado inconsistente (ou foi morto): reabrir no próximo cálculo
+                    self._fechar_sessao(sessao)
+                    sessao.morta_em = None
+                else:
+                    if sessao.morta_em is not None:
+                        # Watchdog encerrou o Excel no instante em que o cálculo terminou
+                        self._fechar_sessao(sessao)
+                        sessao.morta_em = None
+                    else:
+                        self._reciclar_se_pesada(sessao)
+                finally:
+                    sessao.futuro = None
+        finally:
+            self._fechar_sessao(sessao)
+            if pythoncom is not None:
+                pythoncom.CoUninitialize()
@@ -6,16 +6,88 @@ DECISÕES TÉCNICAS:
 - xlwings para manter fórmulas ativas no Excel
 - Leitura linha a linha para identificar blocos (título, cabeçalho, valores, total)
 - Tratamento especial para "TOTAL DO VALOR PROPOSTO PARA ACORDO" (apenas colunas A-C)
+- xlwings importado só ao abrir a primeira sessão (import lento; o motor fake não precisa)
+- Etapa em andamento (abertura, escrita, calculo, leitura) e PID do Excel
+  expostos para o watchdog do pool (services/excel_watchdog.py)
 """
 
-import xlwings as xw
+import functools
 import json
+import time
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 from decimal import Decimal
 import re
 
+def _importar_xlwings():
+    """Importa o xlwings sob demanda (necessário só com o motor Excel, CALC_ENGINE=excel)."""
+    try:
+        import xlwings
+    except ImportError:
+        raise RuntimeError("xlwings não está instalado: necessário para o motor Excel")
+    return xlwings
+
+
+def _etapa(nome: str):
+    """Registra em runner.etapa a etapa em andamento e quando começou."""
+    def decorador(metodo):
+        @functools.wraps(metodo)
+        def envolvido(self, *args, **kwargs):
+            self.etapa = (nome, time.monotonic())
+            try:
+                return metodo(self, *args, **kwargs)
+            finally:
+                self.etapa = None
+        return envolvido
+    return decorador
+
+
+class _CelulaSnapshot:
+    """Célula congelada com a mesma interface de leitura de xlwings.Range (value, number_format)."""
+    
+    def __init__(self, value: Any, number_format: str):
+        self.value = value
+        self.number_format = number_format
+
+
+class SheetSnapshot:
+    """
+    Cópia congelada (valor + formato) das células da aba RESUMO.
+    
+    Permite executar o parser de read_results() sem Excel (benchmarks e
+    diagnóstico): basta atribuir o snapshot a `runner.sheet`.
+    """
+    
+    def __init__(self, celulas: Dict[str, Tuple[Any, str]]):
+        self.celulas = celulas
+    
+    def range(self, endereco: str) -> _CelulaSnapshot:
+        valor, formato = self.celulas.get(endereco, (None, "General"))
+        return _CelulaSnapshot(valor, formato)
+    
+    @classmethod
+    def capturar(cls, sheet, linha_inicio: int, linha_fim: int, colunas: List[str]) -> "SheetSnapshot":
+        """Captura as células de uma aba aberta no Excel."""
+        celulas = {}
+        for linha in range(linha_inicio, linha_fim + 1):
+            for col in colunas:
+                cell = sheet.range(f"{col}{linha}")
+                if cell.value is not None:
+                    celulas[f"{col}{linha}"] = (ExcelRunner._convert_value(cell.value), cell.number_format)
+        return cls(celulas)
+    
+    def salvar(self, path: str) -> None:
+        """Salva o snapshot em JSON."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({k: list(v) for k, v in self.celulas.items()}, f, ensure_ascii=False)
+    
+    @classmethod
+    def carregar(cls, path: str) -> "SheetSnapshot":
+        """Carrega um snapshot salvo com salvar()."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls({k: tuple(v) for k, v in json.load(f).items()})
+
 
 class ExcelRunner:
     def __init__(self, excel_path: str, mapa_celulas_path: str):
@@ -29,6 +101,14 @@ class ExcelRunner:
         self.app = None
         self.wb = None
         self.sheet = None
+        
+        # PID do processo do Excel e etapa em andamento (nome, início monotônico)
+        self.pid: Optional[int] = None
+        self.etapa: Optional[Tuple[str, float]] = None
+        
+        # Linha-chave de cada bloco (TOTAL ou última linha de valores),
+        # preenchida por read_results() e usada em leituras pontuais
+        self.linhas_chave: Dict[str, int] = {}
     
     @staticmethod
     def _parse_date(date_str: str) -> datetime:
@@ -91,20 +171,38 @@ class ExcelRunner:
         
         return value
     
-    def __enter__(self):
-        """Abre o Excel ao entrar no contexto."""
+    @_etapa("abertura")
+    def abrir(self) -> None:
+        """Abre o Excel e a planilha (sessão mantida até fechar())."""
+        xw = _importar_xlwings()
         self.app = xw.App(visible=False)
+        self.pid = getattr(self.app, "pid", None)
         self.wb = self.app.books.open(str(self.excel_path.absolute()))
         self.sheet = self.wb.sheets[self.mapa['aba']]
+    
+    def fechar(self) -> None:
+        """Fecha a planilha (sem salvar) e o Excel."""
+        try:
+            if self.wb:
+                self.wb.close()
+        finally:
+            if self.app:
+                self.app.quit()
+            self.app = None
+            self.wb = None
+            self.sheet = None
+            self.pid = None
+    
+    def __enter__(self):
+        """Abre o Excel ao entrar no contexto."""
+        self.abrir()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Fecha o Excel ao sair do contexto."""
-        if self.wb:
-            self.wb.close()
-        if self.app:
-            self.app.quit()
+        self.fechar()
     
+    @_etapa("escrita")
     def write_inputs(self, data: Dict[str, Any]) -> None:
         """
         Escreve os dados de entrada nas células correspondentes da aba RESUMO.
@@ -176,10 +274,12 @@ class ExcelRunner:
                 valor_fim = self._parse_date(valor_fim)
             self.sheet.range("F6").value = valor_fim
     
+    @_etapa("calculo")
     def calculate(self) -> None:
         """Executa o recálculo da planilha."""
         self.wb.app.calculate()
     
+    @_etapa("leitura")
     def read_results(self) -> List[Dict[str, Any]]:
         """
         Lê as tabelas vermelhas (linhas 21-104, colunas A-F e AB).
@@ -195,6 +295,7 @@ class ExcelRunner:
         usam todas as colunas (A-F + AB).
         """
         results = []
+        self.linhas_chave = {}
         linha_atual = self.mapa['tabelas']['inicio']  # 21
         linha_fim = self.mapa['tabelas']['fim']  # 104
         
@@ -282,6 +383,9 @@ class ExcelRunner:
                 
                 if total:
                     bloco["total"] = total
+                    self.linhas_chave[titulo] = linha_valores
+                elif rows:
+                    self.linhas_chave[titulo] = linha_valores - 1
                 
                 results.append(bloco)
                 
@@ -292,3 +396,23 @@ class ExcelRunner:
                 linha_atual += 1
         
         return results
+    
+    def read_row(self, linha: int) -> List[Any]:
+        """
+        Lê uma única linha (colunas A-F + AB) já convertida.
+        Usado para releituras pontuais sem varrer todas as tabelas.
+        """
+        row_data = []
+        for col in ['A', 'B', 'C', 'D', 'E', 'F', 'AB']:
+            val = self._read_cell_value(f'{col}{linha}')
+            row_data.append(self._convert_value(val))
+        return row_data
+    
+    def snapshot(self) -> SheetSnapshot:
+        """Captura as células da área de tabelas (linhas 21-104, A-F + AB)."""
+        return SheetSnapshot.capturar(
+            self.sheet,
+            self.mapa['tabelas']['inicio'],
+            self.mapa['tabelas']['fim'],
+            ['A', 'B', 'C', 'D', 'E', 'F', 'AB']
+        )
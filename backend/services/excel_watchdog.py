@@ -0,0 +1,240 @@
+"""
+Supervisão das sessões do Excel (watchdog).
+
+Um app.calculate() travado, ou uma exceção entre xw.App(visible=False) e o
+fechamento, deixava a thread da requisição presa para sempre ou um Excel
+invisível órfão consumindo memória. O watchdog acompanha as sessões do
+ExcelPool e:
+
+- aplica um prazo por etapa (abertura, escrita, calculo, leitura): estourado,
+  o processo do Excel é morto, o cálculo falha com TimeoutError e a sessão é
+  substituída por uma nova
+- recicla (fecha e reabre) uma sessão cujo Excel passou de EXCEL_MAX_RSS_MB
+  de memória residente, entre dois cálculos
+- no startup, encerra processos do Excel deixados por execuções anteriores do
+  serviço que morreram sem fechá-los (e apaga as cópias de planilha delas)
+
+DECISÕES TÉCNICAS:
+- Cada sessão registra o PID do seu Excel em <diretorio_copias>/pids/<pid>.pid
+  com o PID do serviço como dono; órfão = arquivo cujo dono não está mais vivo
+  (só processos que o serviço abriu são encerrados, nunca um Excel do usuário)
+- psutil (opcional) para memória residente e para conferir o nome do processo
+  antes de encerrar um órfão (PID reaproveitado pelo SO); sem psutil, prazos
+  continuam valendo (os.kill) e a limpeza de órfãos apenas remove os arquivos
+- Thread presa mesmo após a morte do Excel é abandonada: o pool sobe outra
+  thread no lugar e a antiga sai sozinha se um dia retornar
+"""
+
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from .metrics import Metrics
+
+try:
+    import psutil
+except ImportError:  # psutil é opcional
+    psutil = None
+
+
+# Prazos padrão por etapa (segundos)
+PRAZOS_PADRAO: Dict[str, float] = {
+    "abertura": 120,
+    "escrita": 30,
+    "calculo": 120,
+    "leitura": 60,
+}
+
+# Tempo para a thread da sessão reagir à morte do Excel antes de ser abandonada
+CARENCIA_SEGUNDOS = 10
+
+
+def processo_vivo(pid: int) -> Optional[bool]:
+    """True/False se o processo existe; None quando não é possível saber."""
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    if os.name != "posix":
+        # No Windows, os.kill(pid, 0) encerraria o processo
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def encerrar_processo(pid: int) -> bool:
+    """Mata um processo (TerminateProcess no Windows). Retorna True se conseguiu."""
+    try:
+        if psutil is not None:
+            psutil.Process(pid).kill()
+        else:
+            os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+        return True
+    except Exception as e:
+        print(f"⚠️ Não foi possível encerrar o processo {pid}: {str(e)}")
+        return False
+
+
+def memoria_residente_mb(pid: int) -> Optional[float]:
+    """Memória residente do processo em MB (None sem psutil ou se ele não existir)."""
+    if psutil is None:
+        return None
+    try:
+        return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def _parece_excel(pid: int) -> bool:
+    try:
+        return "excel" in psutil.Process(pid).name().lower()
+    except Exception:
+        return False
+
+
+class RegistroProcessos:
+    """
+    PIDs dos processos do Excel abertos pelo serviço, em arquivos no disco.
+    """
+
+    def __init__(self, diretorio: Path):
+        self.diretorio = Path(diretorio)
+
+    def registrar(self, pid: Optional[int]) -> None:
+        if pid is None:
+            return
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        (self.diretorio / f"{pid}.pid").write_text(str(os.getpid()), encoding="utf-8")
+
+    def remover(self, pid: Optional[int]) -> None:
+        if pid is not None:
+            (self.diretorio / f"{pid}.pid").unlink(missing_ok=True)
+
+    def encerrar_orfaos(self) -> int:
+        """
+        Encerra os Excel registrados por serviços que já não estão vivos.
+
+        Returns:
+            Quantidade de processos encerrados
+        """
+        if not self.diretorio.exists():
+            return 0
+
+        encerrados = 0
+        for arquivo in self.diretorio.glob("*.pid"):
+            try:
+                pid = int(arquivo.stem)
+                dono = int(arquivo.read_text(encoding="utf-8").strip() or 0)
+            except (ValueError, OSError):
+                arquivo.unlink(missing_ok=True)
+                continue
+
+            if dono == os.getpid() or processo_vivo(dono) is not False:
+                continue
+
+            if psutil is None:
+                print(f"⚠️ Excel órfão {pid} não verificado (psutil ausente); apenas o registro foi removido")
+            elif psutil.pid_exists(pid) and _parece_excel(pid) and encerrar_processo(pid):
+                print(f"🧹 Excel órfão encerrado (PID {pid}, serviço {dono})")
+                encerrados += 1
+            arquivo.unlink(missing_ok=True)
+
+        return encerrados
+
+
+def remover_copias_orfas(diretorio: Path) -> int:
+    """
+    Apaga cópias de planilha (modelo-<pid>-*) de serviços que já não estão vivos.
+
+    Returns:
+        Quantidade de arquivos removidos
+    """
+    removidos = 0
+    for arquivo in Path(diretorio).glob("modelo-*"):
+        try:
+            dono = int(arquivo.name.split("-")[1])
+        except (IndexError, ValueError):
+            continue
+        if dono != os.getpid() and processo_vivo(dono) is False:
+            try:
+                arquivo.unlink()
+                removidos += 1
+            except OSError:
+                pass  # ainda aberta por um Excel que não pôde ser encerrado
+    return removidos
+
+
+class ExcelWatchdog:
+    """
+    Thread que verifica periodicamente as sessões de um ExcelPool.
+    """
+
+    def __init__(
+        self,
+        pool: "ExcelPool",
+        prazos: Optional[Dict[str, float]] = None,
+        intervalo: float = 1.0,
+        metrics: Optional[Metrics] = None
+    ):
+        self.pool = pool
+        self.prazos = dict(PRAZOS_PADRAO, **(prazos or {}))
+        self.intervalo = intervalo
+        self.metrics = metrics
+
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def iniciar(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="excel-watchdog", daemon=True)
+        self._thread.start()
+
+    def parar(self) -> None:
+        self._parar.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _loop(self) -> None:
+        while not self._parar.wait(self.intervalo):
+            for sessao in self.pool.sessoes():
+                try:
+                    self.verificar(sessao)
+                except Exception as e:
+                    print(f"Erro no watchdog do Excel ({sessao.nome}): {str(e)}")
+
+    def verificar(self, sessao: "_Sessao") -> None:
+        """Aplica os prazos a uma sessão (chamado a cada intervalo)."""
+        agora = time.monotonic()
+
+        if sessao.morta_em is not None:
+            # Excel já morto: a thread deveria ter voltado; senão, abandoná-la
+            if agora - sessao.morta_em > CARENCIA_SEGUNDOS:
+                print(f"⚠️ Sessão {sessao.nome} não respondeu após encerrar o Excel; substituindo a thread")
+                self.pool.substituir(sessao)
+            return
+
+        runner = sessao.runner
+        etapa = runner.etapa if runner is not None else None
+        if etapa is None:
+            return
+
+        nome, inicio = etapa
+        prazo = self.prazos.get(nome)
+        if not prazo or agora - inicio <= prazo:
+            return
+
+        print(f"⏱️ Sessão {sessao.nome} excedeu o prazo de {nome} ({prazo:g}s); encerrando o Excel (PID {runner.pid})")
+        sessao.morta_em = agora
+        sessao.falhar(TimeoutError(f"Excel excedeu o prazo da etapa '{nome}' ({prazo:g}s)"))
+        if runner.pid is not None:
+            encerrar_processo(runner.pid)
+        if self.metrics:
+            self.metrics.incr("excel_sessoes_mortas")
@@ -0,0 +1,238 @@
+"""
+Exportação do histórico de cálculos (CSV, XLSX, Parquet) em streaming.
+
+Uma linha por linha de tabela de cada resultado (inclusive a de total), no
+formato "tidy" para tabelas dinâmicas/pandas:
+
+    id, created_at, municipio, correcao_ate, workbook_version, serie,
+    tabela, linha, descricao, <uma coluna por nome de header>
+
+As colunas de valores são a união, em ordem, dos headers conhecidos
+(result_titles): cada linha preenche as colunas do header da sua tabela.
+
+DECISÕES TÉCNICAS:
+- Resultados lidos um por vez (Storage.iterar_resultados, cursor no servidor):
+  a memória não cresce com o tamanho do histórico
+- CSV: escrito e enviado em blocos à medida que as linhas são lidas
+  (UTF-8 com BOM para o Excel reconhecer a codificação)
+- XLSX (openpyxl, write-only) e Parquet (pyarrow, grupos de linhas de
+  LINHAS_POR_GRUPO): ambos só ficam válidos com os metadados gravados no
+  final, então são escritos em arquivo temporário e enviados em blocos ao
+  terminar; memória limitada ao grupo de linhas / à linha atual
+- XLSX: passando do limite de linhas de uma planilha, continua em uma nova aba
+- openpyxl e pyarrow são opcionais: formato sem a biblioteca → indisponível
+- descricao é sempre texto (str da primeira célula): o tipo da coluna no
+  Parquet é fixo (string) e a planilha pode devolver números/datas ali
+"""
+
+import csv
+import io
+import os
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .storage import LINHA_TOTAL, SUFIXO_ATUALIZADO
+
+try:
+    import openpyxl
+except ImportError:  # openpyxl é opcional (exportação XLSX)
+    openpyxl = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pyarrow é opcional (exportação Parquet)
+    pyarrow = None
+
+
+COLUNAS_FIXAS = [
+    "id", "created_at", "municipio", "correcao_ate", "workbook_version",
+    "serie", "tabela", "linha", "descricao",
+]
+
+# formato → (media type, extensão)
+FORMATOS: Dict[str, Tuple[str, str]] = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+LINHAS_POR_GRUPO = 50_000
+LINHAS_POR_BLOCO_CSV = 500
+MAX_LINHAS_XLSX = 1_048_576
+TAMANHO_BLOCO = 64 * 1024
+
+
+def formato_disponivel(formato: str) -> Optional[str]:
+    """None se o formato pode ser gerado; senão, o motivo."""
+    if formato not in FORMATOS:
+        return f"Formato inválido: {formato} (use {', '.join(FORMATOS)})"
+    if formato == "xlsx" and openpyxl is None:
+        return "Exportação XLSX requer openpyxl (pip install openpyxl)"
+    if formato == "parquet" and pyarrow is None:
+        return "Exportação Parquet requer pyarrow (pip install pyarrow)"
+    return None
+
+
+def colunas_valores(headers: Iterable[List[str]]) -> List[str]:
+    """União ordenada dos nomes de coluna dos headers (sem a coluna de descrição)."""
+    return list(dict.fromkeys(nome for header in headers for nome in header[1:]))
+
+
+def gerar_linhas(
+    resultados: Iterable[Tuple[str, str, Optional[str], Dict[str, Any], Dict[str, Any]]],
+    valores: List[str],
+    atualizados: bool = True
+) -> Iterator[List[Any]]:
+    """
+    Achata os resultados em linhas de exportação (COLUNAS_FIXAS + valores).
+
+    Args:
+        resultados: (id, created_at, workbook_version, input_data, output_data)
+        valores: colunas de valores (colunas_valores)
+        atualizados: incluir as tabelas de results_atualizados
+    """
+    posicao = {nome: i for i, nome in enumerate(valores)}
+    series = [("base", "results_base")] + ([("atualizado", "results_atualizados")] if atualizados else [])
+
+    for result_id, created_at, versao, input_data, output_data in resultados:
+        fixas = [result_id, created_at, input_data.get("município"), input_data.get("correção_até"), versao]
+
+        for serie, chave in series:
+            for tabela in output_data.get(chave) or []:
+                titulo = tabela["titulo"].rsplit(SUFIXO_ATUALIZADO, 1)[0]
+                destino = [posicao.get(nome) for nome in tabela["header"][1:]]
+
+                linhas = list(enumerate(tabela.get("rows") or []))
+                if tabela.get("total"):
+                    linhas.append((LINHA_TOTAL, tabela["total"]))
+
+                for numero, celulas in linhas:
+                    # Descrição sempre texto (coluna string no Parquet), mesmo vinda como número da planilha
+                    descricao = str(celulas[0]) if celulas and celulas[0] is not None else None
+                    linha = fixas + [serie, titulo, numero, descricao] + [None] * len(valores)
+                    for indice, valor in zip(destino, celulas[1:]):
+                        if indice is not None and isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                            linha[len(COLUNAS_FIXAS) + indice] = float(valor)
+                    yield linha
+
+
+def exportar_csv(linhas: Iterable[List[Any]], colunas: List[str]) -> Iterator[bytes]:
+    """CSV em blocos de LINHAS_POR_BLOCO_CSV linhas."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write("\ufeff")  # BOM
+    escritor.writerow(colunas)
+
+    for i, linha in enumerate(linhas, start=1):
+        escritor.writerow(linha)
+        if i % LINHAS_POR_BLOCO_CSV == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _enviar_arquivo(caminho: str) -> Iterator[bytes]:
+    """Envia um arquivo temporário em blocos e o apaga ao final."""
+    try:
+        with open(caminho, "rb") as f:
+            while True:
+                bloco = f.read(TAMANHO_BLOCO)
+                if not bloco:
+                    break
+                yield bloco
+    finally:
+        os.unlink(caminho)
+
+
+def _arquivo_temporario(sufixo: str) -> str:
+    descritor, caminho = tempfile.mkstemp(prefix="servfaz-export-", suffix=sufixo)
+    os.close(descritor)
+    return caminho
+
+
+def exportar_xlsx(linhas: Iterable[List[Any]], colunas: List[str]) -> Iterator[bytes]:
+    """XLSX por workbook write-only do openpyxl (linhas vão direto para o disco)."""
+    caminho = _arquivo_temporario(".xlsx")
+    try:
+        workbook = openpyxl.Workbook(write_only=True)
+        planilha = None
+        linhas_na_planilha = MAX_LINHAS_XLSX
+
+        for linha in linhas:
+            if linhas_na_planilha >= MAX_LINHAS_XLSX:
+                planilha = workbook.create_sheet(f"resultados_{len(workbook.worksheets) + 1}")
+                planilha.append(colunas)
+                linhas_na_planilha = 1
+            planilha.append(linha)
+            linhas_na_planilha += 1
+
+        if planilha is None:
+            workbook.create_sheet("resultados_1").append(colunas)
+        workbook.save(caminho)
+    except BaseException:
+        os.unlink(caminho)
+        raise
+
+    yield from _enviar_arquivo(caminho)
+
+
+def exportar_parquet(linhas: Iterable[List[Any]], colunas: List[str]) -> Iterator[bytes]:
+    """Parquet gravado em grupos de LINHAS_POR_GRUPO linhas (ParquetWriter)."""
+    tipos = {"linha": pyarrow.int32()}
+    schema = pyarrow.schema([
+        (nome, tipos.get(nome, pyarrow.string()) if i < len(COLUNAS_FIXAS) else pyarrow.float64())
+        for i, nome in enumerate(colunas)
+    ])
+
+    caminho = _arquivo_temporario(".parquet")
+    try:
+        with pyarrow.parquet.ParquetWriter(caminho, schema, compression="zstd") as writer:
+            grupo: List[List[Any]] = []
+            for linha in linhas:
+                grupo.append(linha)
+                if len(grupo) >= LINHAS_POR_GRUPO:
+                    writer.write_table(_tabela_arrow(grupo, schema))
+                    grupo = []
+            if grupo:
+                writer.write_table(_tabela_arrow(grupo, schema))
+    except BaseException:
+        os.unlink(caminho)
+        raise
+
+    yield from _enviar_arquivo(caminho)
+
+
+def _tabela_arrow(grupo: List[List[Any]], schema: "pyarrow.Schema") -> "pyarrow.Table":
+    colunas = [list(coluna) for coluna in zip(*grupo)]
+    return pyarrow.Table.from_arrays(
+        [pyarrow.array(coluna, type=campo.type) for coluna, campo in zip(colunas, schema)],
+        schema=schema
+    )
+
+
+EXPORTADORES = {
+    "csv": exportar_csv,
+    "xlsx": exportar_xlsx,
+    "parquet": exportar_parquet,
+}
+
+
+def exportar(
+    formato: str,
+    resultados: Iterable[Tuple[str, str, Optional[str], Dict[str, Any], Dict[str, Any]]],
+    headers: Iterable[List[str]],
+    atualizados: bool = True
+) -> Iterator[bytes]:
+    """
+    Gera o arquivo de exportação em blocos de bytes.
+
+    Args:
+        formato: chave de FORMATOS (verificar antes com formato_disponivel)
+        resultados: Storage.iterar_resultados(...)
+        headers: headers conhecidos (Storage.listar_titulos)
+    """
+    valores = colunas_valores(headers)
+    return EXPORTADORES[formato](gerar_linhas(resultados, valores, atualizados), COLUNAS_FIXAS + valores)
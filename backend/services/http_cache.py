@@ -0,0 +1,80 @@
+"""
+Cache HTTP e compressão para resultados salvos (imutáveis).
+
+Um resultado salvo nunca muda: o mesmo ID sempre devolve os mesmos bytes.
+Por isso GET /results/{id} pode usar ETag forte + Cache-Control immutable, e
+uma nova visita do Histórico custa apenas um 304 (ou nada, com o cache do navegador).
+
+DECISÕES TÉCNICAS:
+- ETag forte derivado do ID + hash SHA-256 do conteúdo salvo
+- If-None-Match com comparação fraca (RFC 9110), aceitando lista e "*"
+- Brotli quando o pacote `brotli` estiver instalado e o cliente aceitar; senão gzip
+- Respostas pequenas (< TAMANHO_MINIMO_COMPRESSAO) não são comprimidas
+"""
+
+import gzip
+import hashlib
+from typing import Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional
+    brotli = None
+
+
+CACHE_CONTROL_IMUTAVEL = "public, max-age=31536000, immutable"
+TAMANHO_MINIMO_COMPRESSAO = 1024
+
+
+def hash_conteudo(conteudo: bytes) -> str:
+    """Hash SHA-256 (hex) do conteúdo salvo."""
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def gerar_etag(result_id: str, content_hash: str) -> str:
+    """ETag forte (entre aspas) derivado do ID e do hash do conteúdo."""
+    digest = hashlib.sha256(f"{result_id}:{content_hash}".encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_corresponde(if_none_match: Optional[str], etag: str) -> bool:
+    """Verifica se o header If-None-Match contém o ETag (comparação fraca)."""
+    if not if_none_match:
+        return False
+
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*":
+            return True
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == etag:
+            return True
+
+    return False
+
+
+def comprimir(conteudo: bytes, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """
+    Comprime o conteúdo conforme o Accept-Encoding do cliente.
+
+    Returns:
+        (conteúdo, content-encoding usado ou None se não comprimido)
+    """
+    if len(conteudo) < TAMANHO_MINIMO_COMPRESSAO or not accept_encoding:
+        return conteudo, None
+
+    aceitos = set()
+    for parte in accept_encoding.split(","):
+        nome, _, parametros = parte.partition(";")
+        if parametros.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        aceitos.add(nome.strip().lower())
+
+    if brotli is not None and "br" in aceitos:
+        return brotli.compress(conteudo, quality=5), "br"
+
+    if "gzip" in aceitos:
+        return gzip.compress(conteudo, compresslevel=6), "gzip"
+
+    return conteudo, None
@@ -0,0 +1,373 @@
+"""
+Fila durável de cálculos para vários nós de processamento.
+
+Com CALC_DISPATCH=fila, o /calculate deixa de executar o cálculo no próprio
+processo: grava um job na tabela `jobs` e aguarda um worker (scripts/worker.py,
+um ou mais processos, em uma ou mais máquinas) concluí-lo. O worker reivindica
+o job com uma concessão (lease) por tempo limitado, renova a concessão
+periodicamente (heartbeat) enquanto calcula e grava o resultado via Storage.
+Se o worker morrer, a concessão expira e outro worker retoma o job.
+
+DECISÕES TÉCNICAS:
+- Interface JobQueue + backend SQLite (SQLiteJobQueue); outro backend
+  (Postgres, Redis) só precisa implementar os mesmos métodos e entrar em criar_fila()
+- Reivindicação atômica com BEGIN IMMEDIATE (um escritor por vez no SQLite);
+  WAL + busy_timeout para vários processos no mesmo arquivo
+- Cada operação do worker confere o dono (worker_id) do job: quem perdeu a
+  concessão não conclui nem falha um job já retomado por outro
+- Até `max_tentativas` reivindicações por job (falha ou concessão expirada);
+  depois disso o job fica com status 'erro'
+- Tempo em epoch (time.time()): as concessões são comparadas entre máquinas,
+  então os relógios dos nós precisam estar sincronizados (NTP)
+- Prioridade (services/scheduler.py): cada job tem classe (interativo, lote,
+  precalculo) e cliente. A reivindicação escolhe a classe com fila cuja
+  ocupação relativa (jobs executando + 1) / peso é a menor - os workers se
+  dividem entre as classes na proporção dos pesos - e, nela, o job mais
+  antigo de um cliente abaixo de `max_por_cliente` jobs executando. Reserva
+  interativa: workers dedicados (scripts/worker.py --classes interativo),
+  já que a fila não sabe quantos workers existem
+- iniciado_em (primeira reivindicação) - created_at = espera na fila
+  (estatisticas_espera, por classe)
+"""
+
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from .scheduler import CLASSE_INTERATIVA, CLASSES, PESOS_PADRAO
+from .serialization import dumps, loads
+
+
+STATUS_PENDENTE = "pendente"
+STATUS_EXECUTANDO = "executando"
+STATUS_CONCLUIDO = "concluido"
+STATUS_ERRO = "erro"
+
+
+class JobQueue(ABC):
+    """
+    Interface das filas de jobs de cálculo.
+    """
+
+    @abstractmethod
+    def enfileirar(
+        self,
+        input_data: Dict[str, Any],
+        classe: str = CLASSE_INTERATIVA,
+        cliente: Optional[str] = None
+    ) -> str:
+        """Cria um job pendente (classe de prioridade e cliente) e retorna o ID."""
+
+    @abstractmethod
+    def reivindicar(
+        self,
+        worker_id: str,
+        lease_segundos: float,
+        classes: Optional[Sequence[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Reivindica o próximo job pendente (ou com concessão expirada) pela
+        prioridade das classes.
+
+        Args:
+            classes: classes que este worker atende (None = todas)
+
+        Returns:
+            {"id", "input_data", "tentativas", "classe"} ou None se não houver job
+        """
+
+    @abstractmethod
+    def renovar(self, job_id: str, worker_id: str, lease_segundos: float) -> bool:
+        """Heartbeat: estende a concessão. False se o worker já não é o dono."""
+
+    @abstractmethod
+    def concluir(self, job_id: str, worker_id: str, result_id: str) -> bool:
+        """Marca o job como concluído com o ID do resultado salvo."""
+
+    @abstractmethod
+    def falhar(self, job_id: str, worker_id: str, erro: str) -> bool:
+        """Registra a falha; o job volta a pendente enquanto houver tentativas."""
+
+    @abstractmethod
+    def obter(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Estado de um job (sem o input)."""
+
+    @abstractmethod
+    def estatisticas_espera(self, segundos: float = 3600) -> Dict[str, Dict[str, Any]]:
+        """Por classe: jobs na fila/executando e espera dos iniciados nos últimos `segundos`."""
+
+    def aguardar(self, job_id: str, timeout: float, intervalo: float = 0.05) -> Dict[str, Any]:
+        """
+        Aguarda o job terminar (concluído ou erro).
+
+        Raises:
+            TimeoutError: job ainda não terminou no prazo
+        """
+        limite = time.monotonic() + timeout
+        while True:
+            job = self.obter(job_id)
+            if job is None or job["status"] in (STATUS_CONCLUIDO, STATUS_ERRO):
+                return job
+            if time.monotonic() >= limite:
+                raise TimeoutError(f"Job {job_id} não concluído em {timeout:g}s (status: {job['status']})")
+            time.sleep(intervalo)
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Fila de jobs na tabela `jobs` de um banco SQLite.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_tentativas: int = 3,
+        pesos: Optional[Dict[str, float]] = None,
+        max_por_cliente: int = 0
+    ):
+        self.db_path = Path(db_path)
+        self.max_tentativas = max_tentativas
+        self.pesos = dict(pesos or PESOS_PADRAO)
+        self.max_por_cliente = max_por_cliente
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: transações explícitas (BEGIN IMMEDIATE)
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout = 30000")
+        return conn
+
+    def _init_db(self) -> None:
+        """Cria a tabela 'jobs' se não existir."""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                input_data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                worker_id TEXT,
+                lease_expira_em REAL,
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                result_id TEXT,
+                erro TEXT,
+                classe TEXT NOT NULL DEFAULT 'interativo',
+                cliente TEXT,
+                iniciado_em REAL
+            )
+        """)
+
+        # Migração: tabelas criadas antes das classes de prioridade
+        colunas = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "classe" not in colunas:
+            conn.execute("ALTER TABLE jobs ADD COLUMN classe TEXT NOT NULL DEFAULT 'interativo'")
+        if "cliente" not in colunas:
+            conn.execute("ALTER TABLE jobs ADD COLUMN cliente TEXT")
+        if "iniciado_em" not in colunas:
+            conn.execute("ALTER TABLE jobs ADD COLUMN iniciado_em REAL")
+
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_classe ON jobs (status, classe, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_cliente ON jobs (cliente, status)")
+        conn.close()
+
+    def enfileirar(
+        self,
+        input_data: Dict[str, Any],
+        classe: str = CLASSE_INTERATIVA,
+        cliente: Optional[str] = None
+    ) -> str:
+        job_id = str(uuid.uuid4())
+        agora = time.time()
+
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO jobs (id, status, input_data, created_at, updated_at, classe, cliente) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, STATUS_PENDENTE, dumps(input_data).decode("utf-8"), agora, agora, classe, cliente)
+        )
+        conn.close()
+
+        return job_id
+
+    def reivindicar(
+        self,
+        worker_id: str,
+        lease_segundos: float,
+        classes: Optional[Sequence[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        agora = time.time()
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+
+            # Concessões expiradas sem tentativas restantes: erro definitivo
+            conn.execute(
+                """
+                UPDATE jobs SET status = ?, erro = 'Concessão expirada sem tentativas restantes',
+                    worker_id = NULL, lease_expira_em = NULL, updated_at = ?
+                WHERE status = ? AND lease_expira_em < ? AND tentativas >= ?
+                """,
+                (STATUS_ERRO, agora, STATUS_EXECUTANDO, agora, self.max_tentativas)
+            )
+
+            row = None
+            for classe in self._ordem_classes(conn, agora, classes):
+                row = conn.execute(
+                    """
+                    SELECT id, input_data, tentativas, classe FROM jobs j
+                    WHERE (status = ? OR (status = ? AND lease_expira_em < ?)) AND classe = ?
+                        AND (? = 0 OR cliente IS NULL OR (
+                            SELECT COUNT(*) FROM jobs e
+                            WHERE e.cliente = j.cliente AND e.status = ? AND e.lease_expira_em >= ?
+                        ) < ?)
+                    ORDER BY created_at
+                    LIMIT 1
+                    """,
+                    (STATUS_PENDENTE, STATUS_EXECUTANDO, agora, classe,
+                     self.max_por_cliente, STATUS_EXECUTANDO, agora, self.max_por_cliente)
+                ).fetchone()
+                if row is not None:
+                    break
+
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                """
+                UPDATE jobs SET status = ?, worker_id = ?, lease_expira_em = ?,
+                    tentativas = tentativas + 1, updated_at = ?, iniciado_em = COALESCE(iniciado_em, ?)
+                WHERE id = ?
+                """,
+                (STATUS_EXECUTANDO, worker_id, agora + lease_segundos, agora, agora, row[0])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        return {"id": row[0], "input_data": loads(row[1]), "tentativas": row[2] + 1, "classe": row[3]}
+
+    def _ordem_classes(
+        self,
+        conn: sqlite3.Connection,
+        agora: float,
+        classes: Optional[Sequence[str]]
+    ) -> List[str]:
+        """Classes a tentar, da menor ocupação relativa ((executando + 1) / peso) para a maior."""
+        executando = dict(conn.execute(
+            "SELECT classe, COUNT(*) FROM jobs WHERE status = ? AND lease_expira_em >= ? GROUP BY classe",
+            (STATUS_EXECUTANDO, agora)
+        ).fetchall())
+        permitidas = [classe for classe in CLASSES if classes is None or classe in classes]
+        return sorted(permitidas, key=lambda classe: (executando.get(classe, 0) + 1) / self.pesos[classe])
+
+    def _atualizar_do_dono(self, job_id: str, worker_id: str, campos: str, valores: tuple) -> bool:
+        """UPDATE condicionado ao worker ainda ser o dono do job em execução."""
+        conn = self._connect()
+        cursor = conn.execute(
+            f"UPDATE jobs SET {campos}, updated_at = ? WHERE id = ? AND worker_id = ? AND status = ?",
+            valores + (time.time(), job_id, worker_id, STATUS_EXECUTANDO)
+        )
+        atualizado = cursor.rowcount > 0
+        conn.close()
+        return atualizado
+
+    def renovar(self, job_id: str, worker_id: str, lease_segundos: float) -> bool:
+        return self._atualizar_do_dono(
+            job_id, worker_id, "lease_expira_em = ?", (time.time() + lease_segundos,)
+        )
+
+    def concluir(self, job_id: str, worker_id: str, result_id: str) -> bool:
+        return self._atualizar_do_dono(
+            job_id, worker_id,
+            "status = ?, result_id = ?, lease_expira_em = NULL, erro = NULL",
+            (STATUS_CONCLUIDO, result_id)
+        )
+
+    def falhar(self, job_id: str, worker_id: str, erro: str) -> bool:
+        return self._atualizar_do_dono(
+            job_id, worker_id,
+            "status = CASE WHEN tentativas >= ? THEN ? ELSE ? END, worker_id = NULL, lease_expira_em = NULL, erro = ?",
+            (self.max_tentativas, STATUS_ERRO, STATUS_PENDENTE, erro)
+        )
+
+    def obter(self, job_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT id, status, created_at, updated_at, worker_id, tentativas, result_id, erro, classe "
+            "FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        conn.close()
+
+        if not row:
+            return None
+
+        return {
+            "id": row[0],
+            "status": row[1],
+            "created_at": row[2],
+            "updated_at": row[3],
+            "worker_id": row[4],
+            "tentativas": row[5],
+            "result_id": row[6],
+            "erro": row[7],
+            "classe": row[8]
+        }
+
+    def estatisticas_espera(self, segundos: float = 3600) -> Dict[str, Dict[str, Any]]:
+        agora = time.time()
+        conn = self._connect()
+        ocupacao = conn.execute(
+            "SELECT classe, SUM(status = ?), SUM(status = ?) FROM jobs WHERE status IN (?, ?) GROUP BY classe",
+            (STATUS_PENDENTE, STATUS_EXECUTANDO, STATUS_PENDENTE, STATUS_EXECUTANDO)
+        ).fetchall()
+        esperas = conn.execute(
+            "SELECT classe, COUNT(*), AVG(iniciado_em - created_at), MAX(iniciado_em - created_at) "
+            "FROM jobs WHERE iniciado_em >= ? GROUP BY classe",
+            (agora - segundos,)
+        ).fetchall()
+        conn.close()
+
+        estatisticas = {
+            classe: {"na_fila": 0, "executando": 0, "iniciados": 0, "espera_media_segundos": 0.0,
+                     "espera_max_segundos": 0.0}
+            for classe in CLASSES
+        }
+        for classe, na_fila, executando in ocupacao:
+            if classe in estatisticas:
+                estatisticas[classe].update(na_fila=na_fila, executando=executando)
+        for classe, iniciados, media, maximo in esperas:
+            if classe in estatisticas:
+                estatisticas[classe].update(
+                    iniciados=iniciados,
+                    espera_media_segundos=round(media, 4),
+                    espera_max_segundos=round(maximo, 4)
+                )
+        return estatisticas
+
+
+def criar_fila(
+    url: str,
+    max_tentativas: int = 3,
+    pesos: Optional[Dict[str, float]] = None,
+    max_por_cliente: int = 0
+) -> JobQueue:
+    """
+    Cria a fila de jobs a partir de uma URL (hoje: sqlite:///caminho ou caminho).
+    """
+    if "://" not in url or url.startswith("sqlite:///"):
+        return SQLiteJobQueue(url.replace("sqlite:///", ""), max_tentativas, pesos, max_por_cliente)
+    raise ValueError(f"Backend de fila não suportado: {url}")
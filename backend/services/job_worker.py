@@ -0,0 +1,127 @@
+"""
+Worker da fila de cálculos (CALC_DISPATCH=fila).
+
+Reivindica jobs da JobQueue, executa o cálculo com o motor local e grava o
+resultado via Storage. Enquanto o cálculo roda, uma thread renova a concessão
+(heartbeat); se o worker morrer, a concessão expira e outro worker retoma o job.
+
+DECISÕES TÉCNICAS:
+- Um job por vez por worker (o paralelismo vem de vários workers/processos)
+- Heartbeat a cada lease/3: uma renovação perdida não derruba a concessão
+- Concessão perdida durante o cálculo (renovar() → False): o resultado é
+  descartado do ponto de vista da fila (concluir() não altera o job de outro dono)
+- Fila vazia: espera `intervalo_ocioso` antes de tentar de novo
+- `classes` restringe as classes de prioridade atendidas (ex.: workers
+  reservados ao interativo); a ordem entre classes é decidida pela fila
+"""
+
+import os
+import socket
+import threading
+import traceback
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from .job_queue import JobQueue
+from .metrics import Metrics
+
+
+def id_worker() -> str:
+    """Identificador do worker: <host>:<pid>."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobWorker:
+    """
+    Loop de um worker: reivindica, executa com heartbeat e conclui jobs.
+    """
+
+    def __init__(
+        self,
+        fila: JobQueue,
+        executar_job: Callable[[Dict[str, Any]], str],
+        worker_id: Optional[str] = None,
+        lease_segundos: float = 60,
+        intervalo_ocioso: float = 0.2,
+        metrics: Optional[Metrics] = None,
+        classes: Optional[Sequence[str]] = None
+    ):
+        """
+        Args:
+            fila: Fila de jobs
+            executar_job: input_data → ID do resultado salvo
+            classes: classes de prioridade atendidas (None = todas)
+        """
+        self.fila = fila
+        self.executar_job = executar_job
+        self.worker_id = worker_id or id_worker()
+        self.lease_segundos = lease_segundos
+        self.intervalo_ocioso = intervalo_ocioso
+        self.metrics = metrics
+        self.classes = list(classes) if classes else None
+        self._parar = threading.Event()
+
+    def parar(self) -> None:
+        self._parar.set()
+
+    def executar(self, max_jobs: Optional[int] = None) -> int:
+        """
+        Processa jobs até parar() (ou até `max_jobs`).
+
+        Returns:
+            Quantidade de jobs processados
+        """
+        print(f"👷 Worker {self.worker_id} aguardando jobs ({', '.join(self.classes or ['todas as classes'])})")
+        processados = 0
+
+        while not self._parar.is_set() and (max_jobs is None or processados < max_jobs):
+            job = self.fila.reivindicar(self.worker_id, self.lease_segundos, self.classes)
+            if job is None:
+                self._parar.wait(self.intervalo_ocioso)
+                continue
+
+            self.processar(job)
+            processados += 1
+
+        return processados
+
+    def processar(self, job: Dict[str, Any]) -> None:
+        """Executa um job reivindicado, renovando a concessão enquanto calcula."""
+        job_id = job["id"]
+        print(f"📥 Job {job_id} ({job.get('classe')}, tentativa {job['tentativas']}) em {self.worker_id}")
+
+        concluido = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat,
+            args=(job_id, concluido),
+            name=f"heartbeat-{job_id[:8]}",
+            daemon=True
+        )
+        heartbeat.start()
+
+        try:
+            result_id = self.executar_job(job["input_data"])
+        except Exception as e:
+            concluido.set()
+            heartbeat.join()
+            traceback.print_exc()
+            self.fila.falhar(job_id, self.worker_id, str(e))
+            if self.metrics:
+                self.metrics.incr("jobs_falhos")
+            return
+
+        concluido.set()
+        heartbeat.join()
+        if self.fila.concluir(job_id, self.worker_id, result_id):
+            print(f"✅ Job {job_id} concluído: resultado {result_id}")
+            if self.metrics:
+                self.metrics.incr("jobs_concluidos")
+        else:
+            print(f"⚠️ Job {job_id} retomado por outro worker; resultado {result_id} descartado")
+            if self.metrics:
+                self.metrics.incr("jobs_concessao_perdida")
+
+    def _heartbeat(self, job_id: str, concluido: threading.Event) -> None:
+        while not concluido.wait(self.lease_segundos / 3):
+            if not self.fila.renovar(job_id, self.worker_id, self.lease_segundos):
+                print(f"⚠️ Concessão do job {job_id} perdida")
+                return
@@ -0,0 +1,99 @@
+"""
+Manutenção do results.db: arquivamento, vacuum incremental e métricas.
+
+Cada execução:
+1. arquiva os resultados com mais de RETENTION_ARCHIVE_DAYS dias
+   (Storage.arquivar_antigos: output_data vai para partições mensais
+   comprimidas, ainda legíveis por GET /results/{id});
+2. devolve ao sistema as páginas livres (Storage.vacuum_incremental, até
+   VACUUM_MAX_PAGINAS por execução) e trunca o WAL;
+3. guarda o resumo para GET /maintenance/report.
+
+DECISÕES TÉCNICAS:
+- Mesmo agendador diário do pré-cálculo (AgendadorDiario), de preferência em
+  horário diferente; em produção com várias instâncias, usar
+  scripts/maintenance.py no cron / Agendador de Tarefas
+- Limite de páginas por execução: o vacuum incremental segura a escrita do
+  banco enquanto roda; em bancos muito fragmentados o espaço volta ao longo
+  de alguns dias em vez de uma pausa longa
+- Uma execução por vez (lock): agendador e comando podem coincidir
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from .metrics import Metrics
+
+
+class Manutencao:
+    """
+    Executa a manutenção do banco e mantém o resumo da última execução.
+    """
+
+    def __init__(
+        self,
+        storage: Any,
+        dias_arquivo: int = 0,
+        vacuum_paginas: int = 0,
+        metrics: Optional[Metrics] = None
+    ):
+        """
+        Args:
+            storage: Storage (ou WriteBehindStorage)
+            dias_arquivo: idade (dias) a partir da qual os resultados são arquivados (0 = não arquivar)
+            vacuum_paginas: máximo de páginas liberadas por execução (0 = todas)
+        """
+        self.storage = storage
+        self.dias_arquivo = dias_arquivo
+        self.vacuum_paginas = vacuum_paginas
+        self.metrics = metrics
+        self.ultima_execucao: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def executar(self, dias_arquivo: Optional[int] = None, vacuum_paginas: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Arquiva os resultados antigos e executa o vacuum incremental.
+
+        Args:
+            dias_arquivo, vacuum_paginas: sobrescrevem os valores do construtor
+
+        Returns:
+            Resumo: arquivamento, vacuum, segundos
+        """
+        dias = self.dias_arquivo if dias_arquivo is None else dias_arquivo
+        paginas = self.vacuum_paginas if vacuum_paginas is None else vacuum_paginas
+
+        with self._lock:
+            inicio = time.perf_counter()
+            resumo: Dict[str, Any] = {"inicio": datetime.now().isoformat(), "arquivamento": None}
+
+            if dias > 0:
+                antes_de = (datetime.now() - timedelta(days=dias)).strftime("%Y-%m-%d")
+                resumo["arquivamento"] = {"antes_de": antes_de, **self.storage.arquivar_antigos(antes_de)}
+                arquivados = resumo["arquivamento"]["arquivados"]
+                print(f"🗄️ Arquivamento: {arquivados} resultados anteriores a {antes_de}")
+                if self.metrics:
+                    self.metrics.incr("manutencao_arquivados", arquivados)
+
+            resumo["vacuum"] = self.storage.vacuum_incremental(paginas)
+            liberados = resumo["vacuum"]["bytes_antes"] - resumo["vacuum"]["bytes_depois"]
+            print(f"🧹 Vacuum: {resumo['vacuum']['paginas_liberadas']} páginas ({liberados / 1e6:.1f} MB) liberadas")
+
+            resumo["segundos"] = round(time.perf_counter() - inicio, 2)
+            if self.metrics:
+                self.metrics.incr("manutencao_execucoes")
+            self.ultima_execucao = resumo
+            return resumo
+
+    def relatorio(self, detalhar: bool = False) -> Dict[str, Any]:
+        """Estatísticas atuais do banco, configuração e resumo da última execução."""
+        return {
+            "banco": self.storage.estatisticas_banco(detalhar),
+            "configuracao": {
+                "dias_arquivo": self.dias_arquivo,
+                "vacuum_paginas": self.vacuum_paginas,
+            },
+            "ultima_execucao": self.ultima_execucao,
+        }
@@ -0,0 +1,36 @@
+"""
+Métricas simples em memória do processo da API.
+
+DECISÕES TÉCNICAS:
+- Contadores thread-safe (os endpoints síncronos rodam no threadpool do FastAPI)
+- Sem dependência externa: exposição em JSON via GET /metrics
+- Valores zerados a cada reinício do processo
+"""
+
+import threading
+from typing import Dict
+
+
+class Metrics:
+    """
+    Registro de contadores nomeados.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores: Dict[str, float] = {}
+    
+    def incr(self, nome: str, valor: float = 1) -> None:
+        """Incrementa o contador `nome` (criando-o se necessário)."""
+        with self._lock:
+            self._contadores[nome] = self._contadores.get(nome, 0) + valor
+    
+    def get(self, nome: str) -> float:
+        """Retorna o valor atual de um contador (0 se não existir)."""
+        with self._lock:
+            return self._contadores.get(nome, 0)
+    
+    def snapshot(self) -> Dict[str, float]:
+        """Retorna uma cópia de todos os contadores."""
+        with self._lock:
+            return dict(sorted(self._contadores.items()))
@@ -0,0 +1,321 @@
+"""
+Pré-cálculo noturno dos cenários padrão.
+
+A maior parte das requisições repete os mesmos municípios com datas e
+honorários padrão. Fora do horário de pico, o pré-cálculo executa esses
+casos (municípios × presets de um plano JSON) pelo mesmo caminho do
+/calculate (motor local ou fila de workers), salva os resultados no Storage e
+registra cada um no cache de resultados. Durante o dia, um /calculate idêntico
+é respondido direto do cache.
+
+Plano (ex.: data/precompute.example.json):
+    {
+      "municipios": ["Fortaleza", "Caucaia"],
+      "presets": [
+        {"nome": "padrao", "ajuizamento": "01/01/2010", ..., "correção_até": "hoje"}
+      ]
+    }
+
+Datas aceitam os marcadores "hoje" e "inicio_mes", resolvidos no dia da execução.
+
+DECISÕES TÉCNICAS:
+- Chave do cache = versão da planilha + hash normalizado da entrada (o mesmo
+  do single-flight): uma nova planilha invalida o cache sem apagar nada
+- Casos já cobertos por uma entrada válida são pulados (forcar=True recalcula)
+- Paralelismo configurável: com a fila de jobs, vários workers atendem o lote
+- Agendador diário simples (thread) para o processo da API; em produção com
+  várias instâncias, preferir o comando scripts/precompute.py no cron / Agendador de Tarefas
+- Consulta do cache sem escrita por requisição (ConsultasCache): acertos e
+  falhas acumulam em memória e vão ao banco em uma transação a cada
+  LOTE_CONSULTAS consultas ou INTERVALO_CONSULTAS segundos (e no desligamento)
+- Um acerto devolve o resultado pré-calculado tal como foi salvo (mesmo id e
+  created_at): a requisição não gera um novo registro no histórico
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .metrics import Metrics
+from .single_flight import SingleFlight
+
+
+# Gravação em lote das contagens de consultas ao cache
+LOTE_CONSULTAS = 100
+INTERVALO_CONSULTAS = 60.0
+
+MARCADORES_DATA = {
+    "hoje": lambda dia: dia.strftime("%d/%m/%Y"),
+    "inicio_mes": lambda dia: dia.replace(day=1).strftime("%d/%m/%Y"),
+}
+
+
+def carregar_plano(path: str) -> Dict[str, Any]:
+    """Lê o plano de pré-cálculo (municípios e presets)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        plano = json.load(f)
+
+    if not plano.get("municipios") or not plano.get("presets"):
+        raise ValueError(f"Plano sem municípios ou presets: {path}")
+    return plano
+
+
+def gerar_casos(plano: Dict[str, Any], dia: Optional[date] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Expande o plano em casos (município × preset), resolvendo os marcadores de data.
+
+    Returns:
+        Lista de (nome do preset, entrada do /calculate)
+    """
+    dia = dia or date.today()
+    casos = []
+
+    for preset in plano["presets"]:
+        nome = preset.get("nome", "preset")
+        campos = {
+            campo: MARCADORES_DATA[valor](dia) if isinstance(valor, str) and valor in MARCADORES_DATA else valor
+            for campo, valor in preset.items()
+            if campo != "nome"
+        }
+        for municipio in plano["municipios"]:
+            casos.append((nome, {"município": municipio, **campos}))
+
+    return casos
+
+
+def chave_cache(versao: Optional[str], input_data: Dict[str, Any]) -> str:
+    """Chave do cache de resultados: versão da planilha + hash da entrada."""
+    return f"{versao}:{SingleFlight.chave(input_data)}"
+
+
+class Precomputador:
+    """
+    Executa um lote de casos e carrega os resultados no cache.
+    """
+
+    def __init__(
+        self,
+        storage: Any,
+        calcular: Callable[[Dict[str, Any]], Tuple[str, Optional[str]]],
+        normalizar: Callable[[Dict[str, Any]], Dict[str, Any]],
+        versao: Callable[[], Optional[str]],
+        ttl_segundos: int = 24 * 3600,
+        metrics: Optional[Metrics] = None
+    ):
+        """
+        Args:
+            storage: Storage (ou WriteBehindStorage)
+            calcular: entrada → (ID do resultado salvo, versão da planilha)
+            normalizar: entrada → entrada validada (mesma forma usada no /calculate)
+            versao: versão atual da planilha
+            ttl_segundos: Validade das entradas do cache
+        """
+        self.storage = storage
+        self.calcular = calcular
+        self.normalizar = normalizar
+        self.versao = versao
+        self.ttl_segundos = ttl_segundos
+        self.metrics = metrics
+
+    def executar(
+        self,
+        casos: List[Tuple[str, Dict[str, Any]]],
+        paralelo: int = 1,
+        forcar: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Calcula os casos ainda não cobertos e registra-os no cache.
+
+        Returns:
+            Resumo: total, calculados, ja_cobertos, erros, segundos
+        """
+        inicio = time.perf_counter()
+        entradas = [(nome, self.normalizar(caso)) for nome, caso in casos]
+
+        pendentes = entradas
+        if not forcar:
+            versao = self.versao()
+            cobertos = self.storage.get_cache_entries([chave_cache(versao, entrada) for _, entrada in entradas])
+            pendentes = [
+                (nome, entrada) for nome, entrada in entradas
+                if chave_cache(versao, entrada) not in cobertos
+            ]
+
+        resumo = {
+            "total": len(entradas),
+            "calculados": 0,
+            "ja_cobertos": len(entradas) - len(pendentes),
+            "erros": [],
+        }
+        print(f"🌙 Pré-cálculo: {len(pendentes)} de {len(entradas)} casos a calcular (paralelo={paralelo})")
+
+        with ThreadPoolExecutor(max_workers=max(1, paralelo), thread_name_prefix="precompute") as executor:
+            for nome, entrada, erro in executor.map(lambda caso: self._calcular_caso(*caso), pendentes):
+                if erro:
+                    resumo["erros"].append({"preset": nome, "município": entrada["município"], "erro": erro})
+                else:
+                    resumo["calculados"] += 1
+
+        resumo["segundos"] = round(time.perf_counter() - inicio, 2)
+        print(
+            f"🌙 Pré-cálculo concluído em {resumo['segundos']}s: {resumo['calculados']} calculados, "
+            f"{resumo['ja_cobertos']} já cobertos, {len(resumo['erros'])} erros"
+        )
+        return resumo
+
+    def _calcular_caso(self, nome: str, entrada: Dict[str, Any]) -> Tuple[str, Dict[str, Any], Optional[str]]:
+        try:
+            result_id, versao = self.calcular(entrada)
+            # Chave pela versão que de fato produziu o resultado
+            self.storage.save_cache_entry(chave_cache(versao, entrada), result_id, versao, self.ttl_segundos)
+            if self.metrics:
+                self.metrics.incr("precompute_calculados")
+            return nome, entrada, None
+        except Exception as e:
+            print(f"Erro no pré-cálculo ({nome}, {entrada.get('município')}): {str(e)}")
+            if self.metrics:
+                self.metrics.incr("precompute_erros")
+            return nome, entrada, str(e)
+
+    def relatorio(self, casos: List[Tuple[str, Dict[str, Any]]], dias: int = 7) -> Dict[str, Any]:
+        """
+        Cobertura do plano no cache (por preset) e taxa de acerto dos últimos dias.
+        """
+        versao = self.versao()
+        chaves = [(nome, chave_cache(versao, self.normalizar(caso))) for nome, caso in casos]
+        entradas = self.storage.get_cache_entries([chave for _, chave in chaves])
+
+        por_preset: Dict[str, Dict[str, int]] = {}
+        for nome, chave in chaves:
+            item = por_preset.setdefault(nome, {"casos": 0, "cobertos": 0, "acertos": 0})
+            item["casos"] += 1
+            if chave in entradas:
+                item["cobertos"] += 1
+                item["acertos"] += entradas[chave]["acertos"]
+
+        consultas = self.storage.get_cache_stats(dias)
+        acertos = sum(d["acertos"] for d in consultas)
+        total_consultas = acertos + sum(d["falhas"] for d in consultas)
+
+        return {
+            "workbook_version": versao,
+            "cobertura": {
+                "casos": len(chaves),
+                "cobertos": len(entradas),
+                "percentual": round(100 * len(entradas) / len(chaves), 1) if chaves else 0.0,
+                "por_preset": por_preset,
+            },
+            "taxa_acerto": {
+                "dias": dias,
+                "consultas": total_consultas,
+                "acertos": acertos,
+                "percentual": round(100 * acertos / total_consultas, 1) if total_consultas else 0.0,
+                "por_dia": consultas,
+            },
+        }
+
+
+class ConsultasCache:
+    """
+    Consulta o cache de resultados e acumula acertos/falhas para gravação em lote.
+    """
+
+    def __init__(
+        self,
+        storage: Any,
+        lote: int = LOTE_CONSULTAS,
+        intervalo: float = INTERVALO_CONSULTAS
+    ):
+        """
+        Args:
+            storage: Storage (ou WriteBehindStorage)
+            lote: consultas acumuladas que disparam a gravação
+            intervalo: segundos máximos entre gravações (verificado a cada consulta)
+        """
+        self.storage = storage
+        self.lote = max(1, lote)
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._acertos_por_chave: Dict[str, int] = {}
+        self._por_dia: Dict[str, List[int]] = {}
+        self._pendentes = 0
+        self._ultima_gravacao = time.monotonic()
+
+    def consultar(self, chave: str) -> Optional[str]:
+        """
+        ID do resultado pré-calculado da chave (ou None), contabilizando a consulta.
+        """
+        result_id = self.storage.consultar_cache(chave)
+
+        with self._lock:
+            if result_id:
+                self._acertos_por_chave[chave] = self._acertos_por_chave.get(chave, 0) + 1
+            contagem = self._por_dia.setdefault(date.today().isoformat(), [0, 0])
+            contagem[0 if result_id else 1] += 1
+            self._pendentes += 1
+            gravar = (
+                self._pendentes >= self.lote
+                or time.monotonic() - self._ultima_gravacao >= self.intervalo
+            )
+
+        if gravar:
+            self.gravar()
+        return result_id
+
+    def gravar(self) -> None:
+        """Grava as contagens acumuladas (uma transação)."""
+        with self._lock:
+            acertos_por_chave, self._acertos_por_chave = self._acertos_por_chave, {}
+            por_dia, self._por_dia = self._por_dia, {}
+            self._pendentes = 0
+            self._ultima_gravacao = time.monotonic()
+
+        if not por_dia:
+            return
+        try:
+            self.storage.registrar_consultas_cache(
+                acertos_por_chave, {dia: (acertos, falhas) for dia, (acertos, falhas) in por_dia.items()}
+            )
+        except Exception as e:
+            # Só estatística: não deve derrubar o /calculate que disparou a gravação
+            print(f"⚠️ Falha ao gravar consultas do cache de resultados: {str(e)}")
+
+
+class AgendadorDiario:
+    """
+    Executa uma tarefa todo dia no horário HH:MM (hora local), numa thread.
+    """
+
+    def __init__(self, horario: str, tarefa: Callable[[], Any], nome: str = "agendador"):
+        hora, minuto = (int(parte) for parte in horario.split(":"))
+        self.hora = hora
+        self.minuto = minuto
+        self.tarefa = tarefa
+        self.nome = nome
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def proxima_execucao(self, agora: Optional[datetime] = None) -> datetime:
+        agora = agora or datetime.now()
+        alvo = agora.replace(hour=self.hora, minute=self.minuto, second=0, microsecond=0)
+        return alvo if alvo > agora else alvo + timedelta(days=1)
+
+    def iniciar(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name=self.nome, daemon=True)
+        self._thread.start()
+        print(f"⏰ {self.nome}: próxima execução em {self.proxima_execucao():%d/%m/%Y %H:%M}")
+
+    def parar(self) -> None:
+        self._parar.set()
+
+    def _loop(self) -> None:
+        while not self._parar.wait((self.proxima_execucao() - datetime.now()).total_seconds()):
+            try:
+                self.tarefa()
+            except Exception as e:
+                print(f"Erro em {self.nome}: {str(e)}")
@@ -0,0 +1,173 @@
+"""
+Perfilamento sob demanda de requisições /calculate.
+
+Quando um cálculo específico fica lento em produção, um administrador pode
+repetir a requisição com o perfilamento ligado e obter o perfil de CPU dela,
+salvo com o mesmo ID do resultado.
+
+Ativação (todas as condições):
+- PROFILING_ENABLED=1 e PROFILING_ADMIN_TOKEN definido no servidor
+- header X-Admin-Token igual ao token configurado
+- header X-Profile: 1 ou query ?perfil=1
+
+Arquivos gerados em PROFILING_DIR:
+- <result_id>.prof: estatísticas do cProfile (pstats), para snakeviz,
+  flameprof (flamegraph) ou `python -m pstats`
+- <result_id>.txt: resumo das funções com maior tempo acumulado
+
+DECISÕES TÉCNICAS:
+- cProfile (stdlib): sem dependência nova. O cProfile só vê a thread em que foi
+  ligado, e o Excel roda nas threads de sessão do ExcelPool (a requisição só
+  espera o futuro): o motor passa a função da sessão por propagar(), que a
+  perfila na thread da sessão e anexa esse perfil ao da requisição; salvar()
+  junta os dois (pstats.Stats.add)
+- Propagação por ContextVar, definida só dentro de perfilar(): fora dele
+  propagar() devolve a própria função. Um seguidor do single-flight mostra só
+  a espera (a sessão é do líder); com CALC_DISPATCH=fila o cálculo roda em
+  outro processo e não entra no perfil
+- Desligado (padrão): solicitado() retorna False antes de olhar headers e o
+  endpoint segue o caminho normal, sem profiler instalado
+- Token comparado com hmac.compare_digest
+"""
+
+import cProfile
+import hmac
+import io
+import pstats
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Mapping, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+# Perfis das threads de sessão da requisição sendo perfilada (None = sem perfilamento)
+_perfis_sessao: ContextVar[Optional[List[cProfile.Profile]]] = ContextVar("perfis_sessao", default=None)
+
+
+class ProfilingError(Exception):
+    """Pedido de perfilamento sem credencial de administrador válida."""
+    pass
+
+
+class Perfil:
+    """Perfil de uma requisição: a thread dela e as threads de sessão que executaram por ela."""
+
+    def __init__(self):
+        self.requisicao = cProfile.Profile()
+        self.sessoes: List[cProfile.Profile] = []
+
+
+def propagar(funcao: Callable[..., T]) -> Callable[..., T]:
+    """
+    Leva o perfilamento da requisição atual para a thread que executar
+    `funcao` (ex.: sessão do ExcelPool). Sem perfilamento ativo, devolve a
+    própria função.
+    """
+    perfis = _perfis_sessao.get()
+    if perfis is None:
+        return funcao
+
+    def perfilada(*args: Any, **kwargs: Any) -> T:
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Python 3.12+: um único cProfile ativo por interpretador, e o da
+            # requisição já recebe os eventos de todas as threads
+            return funcao(*args, **kwargs)
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            perfil.disable()
+            perfis.append(perfil)
+
+    return perfilada
+
+
+class RequestProfiler:
+    """
+    Perfilador de requisições habilitado por configuração.
+    """
+
+    LINHAS_RESUMO = 40
+
+    def __init__(self, habilitado: bool, diretorio: str, admin_token: Optional[str] = None):
+        self.habilitado = habilitado and bool(admin_token)
+        self.diretorio = Path(diretorio)
+        self.admin_token = admin_token or ""
+
+        if habilitado and not admin_token:
+            print("⚠️ PROFILING_ENABLED=1 sem PROFILING_ADMIN_TOKEN: perfilamento desativado")
+
+    def solicitado(self, headers: Mapping[str, str], query: Mapping[str, str]) -> bool:
+        """
+        Verifica se a requisição pediu perfilamento.
+
+        Raises:
+            ProfilingError: pedido feito sem o token de administrador correto
+        """
+        if not self.habilitado:
+            return False
+
+        pedido = headers.get("x-profile") or query.get("perfil")
+        if not pedido or pedido.lower() in ("0", "false", "nao", "não"):
+            return False
+
+        self.verificar_admin(headers)
+        return True
+
+    def verificar_admin(self, headers: Mapping[str, str]) -> None:
+        """
+        Confere o header X-Admin-Token.
+
+        Raises:
+            ProfilingError: perfilamento desativado ou token ausente/incorreto
+        """
+        token = headers.get("x-admin-token") or ""
+        if not self.habilitado or not hmac.compare_digest(token.encode("utf-8"), self.admin_token.encode("utf-8")):
+            raise ProfilingError("Perfilamento restrito a administradores")
+
+    @contextmanager
+    def perfilar(self) -> Iterator[Perfil]:
+        """
+        Executa o bloco sob o cProfile (inclusive o trabalho repassado a
+        threads de sessão por propagar()) e devolve o perfil para salvar().
+        """
+        perfil = Perfil()
+        token = _perfis_sessao.set(perfil.sessoes)
+        perfil.requisicao.enable()
+        try:
+            yield perfil
+        finally:
+            perfil.requisicao.disable()
+            _perfis_sessao.reset(token)
+
+    def salvar(self, perfil: Perfil, result_id: str) -> Path:
+        """
+        Grava o perfil (.prof) e o resumo (.txt) com o ID do resultado.
+
+        Returns:
+            Caminho do arquivo .prof
+        """
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        caminho = self.diretorio / f"{result_id}.prof"
+
+        stats = pstats.Stats(perfil.requisicao)
+        for sessao in perfil.sessoes:
+            stats.add(sessao)
+        stats.dump_stats(str(caminho))
+
+        resumo = io.StringIO()
+        stats.stream = resumo
+        stats.strip_dirs().sort_stats("cumulative").print_stats(self.LINHAS_RESUMO)
+        (self.diretorio / f"{result_id}.txt").write_text(resumo.getvalue(), encoding="utf-8")
+
+        print(f"🔬 Perfil salvo: {caminho}")
+        return caminho
+
+    def caminho(self, result_id: str) -> Optional[Path]:
+        """Caminho do perfil de um resultado, se existir."""
+        caminho = self.diretorio / f"{Path(result_id).name}.prof"
+        return caminho if caminho.exists() else None
@@ -0,0 +1,190 @@
+"""
+Recorreção em lote de resultados salvos para uma nova data de correção, sem Excel.
+
+A cada nova SELIC publicada, casos já calculados precisam ser trazidos para a
+nova data. A planilha só entra nos resultados base (results_base, valores em
+01/01/2025); a correção posterior é a camada SELIC aplicada em Python
+(SelicUpdater.atualizar_resultados). A recorreção reaproveita o results_base
+salvo, aplica o fator da nova data e grava um novo resultado ligado ao
+original (coluna origem_id), sem abrir o Excel.
+
+DECISÕES TÉCNICAS:
+- Um único fator para todos os resultados (mesma data de correção), obtido
+  uma vez do SelicUpdater
+- Mesma regra monetária da API: cada results_base vira um ResultSet e passa
+  por SelicUpdater.sobrepor_fator (colunas de juros, atualizado e honorários
+  multiplicadas na matriz float64, sufixo do título); não há uma segunda
+  implementação da atualização aqui
+- Só resultados com correção original a partir de 01/01/2025: é o critério do
+  SelicUpdater para o results_base estar na data base. Os demais (e os que já
+  estão na data pedida ou não têm results_base) voltam em "ignorados" e
+  precisam de um novo cálculo pela planilha
+- Novos resultados gravados por lote em uma transação
+  (Storage.save_results_batch), com a workbook_version do original
+"""
+
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .metrics import Metrics
+from .result_set import ResultSet
+from .selic_updater import SelicUpdater
+
+
+# Resultados por transação de gravação
+LOTE_RECORRECAO = 500
+
+
+class Recorretor:
+    """
+    Leva resultados salvos a uma nova data de correção aplicando só a camada SELIC.
+    """
+
+    def __init__(
+        self,
+        storage: Any,
+        updater: SelicUpdater,
+        metrics: Optional[Metrics] = None,
+        lote: int = LOTE_RECORRECAO
+    ):
+        """
+        Args:
+            storage: Storage (ou WriteBehindStorage)
+            updater: SelicUpdater da API (fator e cache da SELIC)
+            lote: resultados por transação de gravação
+        """
+        self.storage = storage
+        self.updater = updater
+        self.metrics = metrics
+        self.lote = max(1, lote)
+
+    def recorrigir(
+        self,
+        correcao_ate: str,
+        ids: Optional[Sequence[str]] = None,
+        desde: Optional[str] = None,
+        ate: Optional[str] = None,
+        municipio: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Cria, para cada resultado selecionado, um novo resultado corrigido até
+        correcao_ate e ligado ao original.
+
+        Args:
+            correcao_ate: nova data de correção (DD/MM/AAAA, posterior a 01/01/2025)
+            ids: resultados a recorrigir
+            desde, ate, municipio: filtro sobre o histórico (como em /results/export)
+
+        Returns:
+            {"correcao_ate", "fator", "criados": [{"origem_id", "id"}],
+             "ignorados": [{"id", "motivo"}], "segundos"}
+
+        Raises:
+            ValueError: data inválida/não posterior a 01/01/2025 ou nenhuma seleção
+        """
+        if not ids and not (desde or ate or municipio):
+            raise ValueError("Informe os ids ou um filtro (desde, ate, municipio)")
+        if not self.updater.precisa_atualizacao(correcao_ate):
+            raise ValueError(
+                f"Data de correção inválida ou não posterior a 01/01/2025: {correcao_ate} "
+                "(correções até a data base exigem o cálculo pela planilha)"
+            )
+
+        inicio = time.perf_counter()
+        fator = self.updater.fator_atualizacao(correcao_ate)
+        print(f"🔁 Recorreção até {correcao_ate} (fator {fator})")
+
+        # Resultados ainda na fila do write-behind também entram
+        flush = getattr(self.storage, "flush", None)
+        if flush:
+            flush()
+
+        criados: List[Dict[str, str]] = []
+        ignorados: List[Dict[str, str]] = []
+        encontrados = set()
+        pendentes: List[Tuple[str, Optional[str], Dict[str, Any], Dict[str, Any]]] = []
+
+        for result_id, _, versao, input_data, output_data in self.storage.iterar_resultados(
+            desde, ate, municipio, ids=list(ids) if ids else None
+        ):
+            encontrados.add(result_id)
+            motivo = self._motivo_ignorar(correcao_ate, input_data, output_data)
+            if motivo:
+                ignorados.append({"id": result_id, "motivo": motivo})
+                continue
+
+            pendentes.append((result_id, versao, input_data, output_data))
+            if len(pendentes) >= self.lote:
+                criados.extend(self._gravar(pendentes, fator, correcao_ate))
+                pendentes = []
+
+        if pendentes:
+            criados.extend(self._gravar(pendentes, fator, correcao_ate))
+
+        for result_id in ids or ():
+            if result_id not in encontrados:
+                ignorados.append({"id": result_id, "motivo": "não encontrado"})
+
+        segundos = round(time.perf_counter() - inicio, 3)
+        print(f"✅ Recorreção: {len(criados)} criados, {len(ignorados)} ignorados em {segundos}s")
+        if self.metrics:
+            self.metrics.incr("recorrecao_criados", len(criados))
+            self.metrics.incr("recorrecao_ignorados", len(ignorados))
+
+        return {
+            "correcao_ate": correcao_ate,
+            "fator": fator,
+            "criados": criados,
+            "ignorados": ignorados,
+            "segundos": segundos,
+        }
+
+    def _motivo_ignorar(
+        self,
+        correcao_ate: str,
+        input_data: Dict[str, Any],
+        output_data: Dict[str, Any]
+    ) -> Optional[str]:
+        """Motivo para não recorrigir o resultado (None = elegível)."""
+        original = input_data.get("correção_até") or output_data.get("correcao_ate")
+        if not output_data.get("results_base"):
+            return "sem results_base"
+        if original == correcao_ate:
+            return f"já corrigido até {correcao_ate}"
+        if not original or not self.updater.base_na_data_base(original):
+            return f"correção original ({original}) anterior a 01/01/2025: exige novo cálculo pela planilha"
+        return None
+
+    def _gravar(
+        self,
+        pendentes: List[Tuple[str, Optional[str], Dict[str, Any], Dict[str, Any]]],
+        fator: Optional[float],
+        correcao_ate: str
+    ) -> List[Dict[str, str]]:
+        """Aplica o fator a cada resultado do lote e grava os novos resultados."""
+        bases = [output_data["results_base"] for _, _, _, output_data in pendentes]
+        # Sem fator (nenhum mês completo de SELIC): a atualização devolve a base
+        atualizados = [
+            self.updater.sobrepor_fator(ResultSet.de_tabelas(base), fator, correcao_ate).para_tabelas()
+            if fator is not None else base
+            for base in bases
+        ]
+
+        created_at = datetime.now().isoformat()
+        linhas = []
+        origens: Dict[str, str] = {}
+        for (origem_id, versao, input_data, _), base, atualizado in zip(pendentes, bases, atualizados):
+            novo_id = str(uuid.uuid4())
+            linhas.append((
+                novo_id,
+                created_at,
+                {**input_data, "correção_até": correcao_ate},
+                {"results_base": base, "results_atualizados": atualizado, "correcao_ate": correcao_ate},
+                versao,
+            ))
+            origens[novo_id] = origem_id
+
+        self.storage.save_results_batch(linhas, origens)
+        return [{"origem_id": origem_id, "id": novo_id} for novo_id, origem_id in origens.items()]
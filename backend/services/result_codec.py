@@ -0,0 +1,181 @@
+"""
+Formato compacto (colunar) para resultados de cálculo.
+
+No formato padrão cada TableBlock repete o cabeçalho de 7 colunas, e
+results_atualizados repete títulos, cabeçalhos e todas as colunas, mudando
+apenas C, D e E. O formato compacto (opt-in) envia:
+
+- cabeçalhos distintos uma única vez (tabelas referenciam pelo índice)
+- cada tabela como lista de colunas (col A = rótulos, demais = números)
+- results_atualizados apenas com as colunas alteradas em relação à base
+
+Estrutura ("formato": "compact-v1"):
+    {
+      "formato": "compact-v1",
+      "correcao_ate": "...",
+      "headers": [[...], ...],
+      "results_base": [{"titulo", "h", "cols": [[...], ...], "total": [...] | null}],
+      "results_atualizados": null | {
+        "sufixo": " - ATUALIZADO ATÉ ...",
+        "tabelas": [{"c": [idx...], "v": [[...], ...], "t": [...]}  (só colunas alteradas)
+                    | {"tabela": {...}}]                             (tabela completa)
+      }
+    }
+
+O decodificador do frontend fica em frontend/src/utils/compactResult.js.
+
+DECISÕES TÉCNICAS:
+- Colunas alteradas enviadas por completo (sem fatores): decodificação exata
+- Tabelas atualizadas com estrutura diferente da base caem para o modo completo
+"""
+
+from typing import Any, Dict, List, Optional
+
+
+FORMATO_COMPACTO = "compact-v1"
+MEDIA_TYPE_COMPACTO = "application/vnd.servfaz.compact+json"
+
+
+def quer_formato_compacto(formato: Optional[str], accept: Optional[str]) -> bool:
+    """Negociação: ?formato=compacto ou Accept com o media type compacto."""
+    if formato:
+        return formato.lower() in ("compacto", "compact", FORMATO_COMPACTO)
+    return bool(accept) and MEDIA_TYPE_COMPACTO in accept
+
+
+def _colunas(table: Dict[str, Any]) -> List[List[Any]]:
+    """Transpõe as linhas de uma tabela em colunas."""
+    largura = len(table["header"])
+    return [[row[i] if i < len(row) else None for row in table["rows"]] for i in range(largura)]
+
+
+def _codificar_tabela(table: Dict[str, Any], headers: List[List[str]], indices: Dict[tuple, int]) -> Dict[str, Any]:
+    chave = tuple(table["header"])
+    if chave not in indices:
+        indices[chave] = len(headers)
+        headers.append(list(table["header"]))
+
+    return {
+        "titulo": table["titulo"],
+        "h": indices[chave],
+        "cols": _colunas(table),
+        "total": table.get("total"),
+    }
+
+
+def _codificar_atualizada(
+    base: Dict[str, Any],
+    atualizada: Dict[str, Any],
+    sufixo: str,
+    headers: List[List[str]],
+    indices: Dict[tuple, int]
+) -> Dict[str, Any]:
+    """Codifica uma tabela atualizada como diferença de colunas da base."""
+    mesma_estrutura = (
+        atualizada["titulo"] == base["titulo"] + sufixo
+        and atualizada["header"] == base["header"]
+        and len(atualizada["rows"]) == len(base["rows"])
+        and bool(atualizada.get("total")) == bool(base.get("total"))
+    )
+    if not mesma_estrutura:
+        return {"tabela": _codificar_tabela(atualizada, headers, indices)}
+
+    cols_base = _colunas(base)
+    cols_atual = _colunas(atualizada)
+    total_base = base.get("total") or []
+    total_atual = atualizada.get("total") or []
+
+    alteradas = [
+        i for i in range(len(cols_atual))
+        if cols_atual[i] != cols_base[i]
+        or (i < len(total_atual) and (i >= len(total_base) or total_atual[i] != total_base[i]))
+    ]
+
+    return {
+        "c": alteradas,
+        "v": [cols_atual[i] for i in alteradas],
+        "t": [total_atual[i] if i < len(total_atual) else None for i in alteradas] if total_atual else None,
+    }
+
+
+def codificar_output(output_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converte um output no formato padrão (results_base, results_atualizados,
+    correcao_ate) para o formato compacto.
+    """
+    headers: List[List[str]] = []
+    indices: Dict[tuple, int] = {}
+    base = output_data.get("results_base") or []
+    atualizados = output_data.get("results_atualizados")
+    correcao_ate = output_data.get("correcao_ate")
+
+    compacto = {
+        "formato": FORMATO_COMPACTO,
+        "correcao_ate": correcao_ate,
+        "headers": headers,
+        "results_base": [_codificar_tabela(t, headers, indices) for t in base],
+        "results_atualizados": None,
+    }
+
+    if atualizados is not None:
+        sufixo = f" - ATUALIZADO ATÉ {correcao_ate}"
+        if len(atualizados) == len(base):
+            tabelas = [
+                _codificar_atualizada(b, a, sufixo, headers, indices)
+                for b, a in zip(base, atualizados)
+            ]
+        else:
+            tabelas = [{"tabela": _codificar_tabela(a, headers, indices)} for a in atualizados]
+        compacto["results_atualizados"] = {"sufixo": sufixo, "tabelas": tabelas}
+
+    return compacto
+
+
+def _decodificar_tabela(tabela: Dict[str, Any], headers: List[List[str]]) -> Dict[str, Any]:
+    cols = tabela["cols"]
+    n_linhas = len(cols[0]) if cols else 0
+    bloco = {
+        "titulo": tabela["titulo"],
+        "header": list(headers[tabela["h"]]),
+        "rows": [[col[i] for col in cols] for i in range(n_linhas)],
+    }
+    if tabela.get("total"):
+        bloco["total"] = tabela["total"]
+    return bloco
+
+
+def decodificar_output(compacto: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverso de codificar_output (mesma lógica do decodificador do frontend)."""
+    headers = compacto["headers"]
+    base = [_decodificar_tabela(t, headers) for t in compacto["results_base"]]
+    atualizados = None
+
+    if compacto.get("results_atualizados"):
+        sufixo = compacto["results_atualizados"]["sufixo"]
+        atualizados = []
+        for indice, delta in enumerate(compacto["results_atualizados"]["tabelas"]):
+            if "tabela" in delta:
+                atualizados.append(_decodificar_tabela(delta["tabela"], headers))
+                continue
+
+            tabela_base = base[indice]
+            bloco = {
+                "titulo": tabela_base["titulo"] + sufixo,
+                "header": list(tabela_base["header"]),
+                "rows": [list(row) for row in tabela_base["rows"]],
+            }
+            total = list(tabela_base["total"]) if tabela_base.get("total") else None
+            for j, coluna in enumerate(delta["c"]):
+                for i, row in enumerate(bloco["rows"]):
+                    row[coluna] = delta["v"][j][i]
+                if total is not None and delta.get("t") is not None:
+                    total[coluna] = delta["t"][j]
+            if total is not None:
+                bloco["total"] = total
+            atualizados.append(bloco)
+
+    return {
+        "results_base": base,
+        "results_atualizados": atualizados,
+        "correcao_ate": compacto.get("correcao_ate"),
+    }
@@ -0,0 +1,202 @@
+"""
+Representação interna tipada das tabelas de um cálculo (ResultSet).
+
+Do leitor (motor de cálculo) até a resposta, as tabelas circulavam como
+listas de dicts com listas Python mistas (None/float/str), e a atualização
+SELIC copiava cada linha (row.copy(), header.copy()) a cada requisição. O
+ResultSet guarda o mesmo conteúdo em estruturas compactas e imutáveis e só
+vira o formato JSON (titulo, header, rows, total) na borda da API
+(para_tabelas()).
+
+ESTRUTURA:
+- titulos / headers: tuplas internadas (sys.intern; headers iguais são o
+  mesmo objeto em todos os ResultSets do processo)
+- valores: matriz float64 (array('d') em ordem de linha, linhas × largura)
+  com as linhas de todas as tabelas empilhadas; a linha de total, quando
+  existe, é a última da tabela
+- validos: máscara (bytearray) das células numéricas da matriz; vazias:
+  posições fora da máscara (rótulos e células vazias)
+- rotulos: células não numéricas (rótulos da coluna A, textos), à parte
+- inicio: primeira linha de cada tabela na matriz (+ fim da última)
+
+DECISÕES TÉCNICAS:
+- Imutável: motores podem devolver o mesmo ResultSet a vários chamadores
+  sem cópia defensiva
+- Sobreposição copy-on-write (com_fator): o novo ResultSet copia só a matriz
+  de valores e multiplica as colunas no lugar (numpy sobre o mesmo buffer,
+  sem numpy um laço); máscara, rótulos, headers e estrutura são
+  compartilhados com o original
+- Inteiros continuam inteiros em para_tabelas (posições guardadas à parte);
+  booleanos são rótulos, como em extrair_valores do Storage
+- Tabela sem total e tabela com total vazio/None são equivalentes (o leitor
+  só grava "total" quando a linha existe)
+"""
+
+import sys
+from array import array
+from typing import Any, Dict, FrozenSet, Iterable, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Headers internados: headers iguais viram o mesmo objeto (poucos por planilha)
+_HEADERS: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def _internar_header(header: Sequence[str]) -> Tuple[str, ...]:
+    chave = tuple(header)
+    internado = _HEADERS.get(chave)
+    if internado is None:
+        internado = tuple(sys.intern(nome) if isinstance(nome, str) else nome for nome in chave)
+        _HEADERS[chave] = internado
+    return internado
+
+
+def _numerico(tipo: type) -> bool:
+    return tipo is float or tipo is int or (issubclass(tipo, (int, float)) and not issubclass(tipo, bool))
+
+
+class ResultSet:
+    """
+    Tabelas de um cálculo (results_base ou results_atualizados) em forma tipada.
+    """
+
+    __slots__ = (
+        "titulos", "headers", "inicio", "com_total", "largura",
+        "comprimentos", "valores", "validos", "vazias", "rotulos", "inteiros"
+    )
+
+    def __init__(
+        self,
+        titulos: Tuple[str, ...],
+        headers: Tuple[Tuple[str, ...], ...],
+        inicio: Tuple[int, ...],
+        com_total: Tuple[bool, ...],
+        largura: int,
+        comprimentos: array,
+        valores: array,
+        validos: bytearray,
+        vazias: Tuple[int, ...],
+        rotulos: Dict[int, Any],
+        inteiros: FrozenSet[int]
+    ):
+        """Use de_tabelas(); o construtor recebe as estruturas já montadas."""
+        self.titulos = titulos
+        self.headers = headers
+        self.inicio = inicio
+        self.com_total = com_total
+        self.largura = largura
+        self.comprimentos = comprimentos
+        self.valores = valores
+        self.validos = validos
+        self.vazias = vazias
+        self.rotulos = rotulos
+        self.inteiros = inteiros
+
+    @classmethod
+    def de_tabelas(cls, tabelas: Iterable[Dict[str, Any]]) -> "ResultSet":
+        """
+        Monta o ResultSet a partir das tabelas no formato de read_results()
+        ({"titulo", "header", "rows", ["total"]}).
+        """
+        tabelas = list(tabelas)
+        linhas: List[Sequence[Any]] = []
+        titulos, headers, inicio, com_total = [], [], [0], []
+        for tabela in tabelas:
+            titulos.append(sys.intern(tabela["titulo"]))
+            headers.append(_internar_header(tabela["header"]))
+            linhas.extend(tabela["rows"])
+            total = tabela.get("total")
+            if total:
+                linhas.append(total)
+            com_total.append(bool(total))
+            inicio.append(len(linhas))
+
+        largura = max((len(linha) for linha in linhas), default=0)
+        comprimentos = array("H", (len(linha) for linha in linhas))
+        celulas: List[Any] = []
+        for linha in linhas:
+            celulas.extend(linha)
+            if len(linha) < largura:
+                celulas.extend([None] * (largura - len(linha)))
+
+        # Classificação por tipo (poucos tipos distintos), não por célula
+        tipos = [type(valor) for valor in celulas]
+        numericos = {tipo: _numerico(tipo) for tipo in set(tipos)}
+        validos = bytearray([numericos[tipo] for tipo in tipos])
+        valores = array("d", [valor if numericos[tipo] else 0.0 for valor, tipo in zip(celulas, tipos)])
+        vazias = tuple([posicao for posicao, valido in enumerate(validos) if not valido])
+        rotulos = {
+            posicao: sys.intern(celulas[posicao]) if tipos[posicao] is str else celulas[posicao]
+            for posicao in vazias if celulas[posicao] is not None
+        }
+        tipos_inteiros = {tipo for tipo, numerico in numericos.items() if numerico and issubclass(tipo, int)}
+        inteiros = frozenset(
+            [posicao for posicao, tipo in enumerate(tipos) if tipo in tipos_inteiros] if tipos_inteiros else ()
+        )
+
+        return cls(
+            tuple(titulos), tuple(headers), tuple(inicio), tuple(com_total),
+            largura, comprimentos, valores, validos, vazias, rotulos, inteiros
+        )
+
+    def __len__(self) -> int:
+        return len(self.titulos)
+
+    def com_fator(self, colunas: Sequence[int], fator: float, sufixo_titulo: str = "") -> "ResultSet":
+        """
+        Novo ResultSet com as colunas multiplicadas pelo fator em todas as
+        linhas (inclusive totais) e o sufixo acrescentado aos títulos.
+
+        Só a matriz de valores é copiada; o restante é compartilhado.
+        """
+        colunas = [coluna for coluna in colunas if coluna < self.largura]
+        valores = array("d", self.valores)
+        if colunas and len(valores):
+            if np is not None:
+                matriz = np.frombuffer(valores, dtype=np.float64).reshape(-1, self.largura)
+                matriz[:, colunas] *= fator
+            else:
+                for posicao in range(0, len(valores), self.largura):
+                    for coluna in colunas:
+                        valores[posicao + coluna] *= fator
+
+        # Células vazias/rótulos continuam 0.0 na matriz e fora da máscara
+        inteiros = self.inteiros
+        if inteiros:
+            inteiros = frozenset(p for p in inteiros if p % self.largura not in colunas)
+
+        titulos = tuple(sys.intern(f"{titulo}{sufixo_titulo}") for titulo in self.titulos) if sufixo_titulo else self.titulos
+        return ResultSet(
+            titulos, self.headers, self.inicio, self.com_total, self.largura,
+            self.comprimentos, valores, self.validos, self.vazias, self.rotulos, inteiros
+        )
+
+    def para_tabelas(self) -> List[Dict[str, Any]]:
+        """Tabelas no formato JSON da API ({"titulo", "header", "rows", ["total"]})."""
+        celulas = self.valores.tolist()
+        for posicao in self.vazias:
+            celulas[posicao] = self.rotulos.get(posicao)
+        for posicao in self.inteiros:
+            celulas[posicao] = int(celulas[posicao])
+
+        largura = self.largura
+        linhas = [
+            celulas[indice * largura:indice * largura + comprimento]
+            for indice, comprimento in enumerate(self.comprimentos)
+        ]
+        tabelas = []
+        for i, titulo in enumerate(self.titulos):
+            primeira, fim = self.inicio[i], self.inicio[i + 1]
+            tabela = {
+                "titulo": titulo,
+                "header": list(self.headers[i]),
+                "rows": linhas[primeira:fim - self.com_total[i]],
+            }
+            if self.com_total[i]:
+                tabela["total"] = linhas[fim - 1]
+            tabelas.append(tabela)
+        return tabelas
@@ -0,0 +1,154 @@
+"""
+Varredura de cenários de acordo (deságio / honorários) para um mesmo caso.
+
+Em vez de abrir uma sessão do Excel por combinação, a varredura abre a planilha
+uma única vez, escreve o caso base e, para cada combinação da grade, reescreve
+apenas as células de percentual/honorários que mudaram, recalcula e relê somente
+as linhas-chave (TOTAL) das tabelas pedidas.
+
+DECISÕES TÉCNICAS:
+- Uma única sessão ExcelRunner para toda a grade
+- Combinações geradas em ordem lexicográfica (itertools.product), de forma que
+  entre duas combinações consecutivas normalmente só uma célula muda
+- Layout das tabelas descoberto na primeira leitura completa; demais leituras
+  são pontuais (read_row)
+- Correção SELIC aplicada com um único fator composto para toda a matriz
+"""
+
+from itertools import product
+from typing import Dict, List, Any, Tuple
+
+from .excel_runner import ExcelRunner
+from .selic_updater import SelicUpdater
+
+
+# Campos do formulário que podem variar na grade (células B11-B14)
+CAMPOS_VARIAVEIS = [
+    "honorários_s_valor_da_condenação",
+    "honorários_em_valor_fixo",
+    "deságio_a_aplicar_sobre_o_principal",
+    "deságio_em_a_aplicar_em_honorários",
+]
+
+
+def gerar_combinacoes(grade: Dict[str, List[float]]) -> Tuple[List[str], List[Tuple[float, ...]]]:
+    """
+    Gera o produto cartesiano da grade.
+
+    Args:
+        grade: Dicionário campo → lista de valores (apenas CAMPOS_VARIAVEIS)
+
+    Returns:
+        (campos na ordem usada, lista de tuplas de valores)
+    """
+    campos = [campo for campo in CAMPOS_VARIAVEIS if grade.get(campo)]
+    combinacoes = list(product(*(grade[campo] for campo in campos)))
+    return campos, combinacoes
+
+
+class ScenarioSweep:
+    """
+    Executa uma grade de cenários sobre uma sessão aberta do ExcelRunner.
+    """
+
+    def __init__(self, runner: ExcelRunner, selic_updater: SelicUpdater):
+        self.runner = runner
+        self.selic_updater = selic_updater
+
+    @staticmethod
+    def _localizar_titulos(results: List[Dict[str, Any]], titulos: List[str]) -> List[str]:
+        """
+        Resolve os títulos pedidos contra os títulos reais da planilha
+        (comparação por prefixo, sem diferenciar maiúsculas).
+        """
+        encontrados = []
+        for pedido in titulos:
+            pedido_norm = pedido.strip().upper()
+            for bloco in results:
+                if bloco["titulo"].upper().startswith(pedido_norm) and bloco["titulo"] not in encontrados:
+                    encontrados.append(bloco["titulo"])
+        return encontrados
+
+    def executar(
+        self,
+        base_input: Dict[str, Any],
+        grade: Dict[str, List[float]],
+        titulos: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Calcula a matriz de totais para todas as combinações da grade.
+
+        Args:
+            base_input: Dados do caso base (conforme CalculateInput)
+            grade: Valores a testar para cada campo variável
+            titulos: Títulos (ou prefixos) das tabelas cujos totais interessam
+
+        Returns:
+            Dicionário com campos, combinações, títulos, cabeçalho e matriz de valores
+        """
+        campos, combinacoes = gerar_combinacoes(grade)
+        correcao_ate = base_input["correção_até"]
+
+        # Caso base completo (datas, município, etc.) escrito uma única vez
+        self.runner.write_inputs(base_input)
+
+        valores = []
+        titulos_encontrados: List[str] = []
+        header: List[str] = []
+        anteriores: Dict[str, float] = {}
+
+        for indice, combinacao in enumerate(combinacoes):
+            # Reescrever apenas as células que mudaram desde a combinação anterior
+            alterados = {
+                campo: valor
+                for campo, valor in zip(campos, combinacao)
+                if anteriores.get(campo) != valor
+            }
+            if alterados:
+                self.runner.write_inputs(alterados)
+                anteriores.update(alterados)
+
+            self.runner.calculate()
+
+            if indice == 0:
+                # Primeira leitura completa: descobre títulos, cabeçalho e linhas-chave
+                results = self.runner.read_results()
+                titulos_encontrados = self._localizar_titulos(results, titulos)
+                if not titulos_encontrados:
+                    raise ValueError(f"Nenhuma tabela encontrada para os títulos: {titulos}")
+                header = next(b["header"] for b in results if b["titulo"] == titulos_encontrados[0])
+
+            valores.append([
+                self.runner.read_row(self.runner.linhas_chave[titulo])
+                for titulo in titulos_encontrados
+            ])
+
+        # Correção SELIC: mesmo fator composto para toda a matriz
+        valores_atualizados = None
+        if self.selic_updater.precisa_atualizacao(correcao_ate):
+            fator = self.selic_updater.fator_acumulado(correcao_ate)
+            colunas = (
+                SelicUpdater.COLUNA_JUROS,
+                SelicUpdater.COLUNA_ATUALIZADO,
+                SelicUpdater.COLUNA_HONORARIOS,
+            )
+            valores_atualizados = [
+                [
+                    [
+                        valor * fator if i in colunas and isinstance(valor, (int, float)) else valor
+                        for i, valor in enumerate(linha)
+                    ]
+                    for linha in linhas
+                ]
+                for linhas in valores
+            ]
+
+        return {
+            "correcao_ate": correcao_ate,
+            "campos": campos,
+            "combinacoes": [list(c) for c in combinacoes],
+            "titulos": titulos_encontrados,
+            "header": header,
+            "valores": valores,
+            "valores_atualizados": valores_atualizados,
+        }
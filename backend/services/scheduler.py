@@ -0,0 +1,260 @@
+"""
+Escalonamento dos cálculos por classe de prioridade.
+
+Cálculos do formulário (interativo), lotes do back-office (lote) e o
+pré-cálculo noturno (precalculo) disputam as mesmas sessões do Excel. Sem
+escalonamento, um lote grande enfileira centenas de cálculos na frente do
+usuário e a tela fica parada até o lote acabar.
+
+O Escalonador controla quantos cálculos rodam ao mesmo tempo (capacidade =
+sessões do Excel) e, quando há vaga, escolhe quem entra:
+
+- Fila justa ponderada (start-time fair queueing): cada pedido recebe uma
+  etiqueta virtual = max(tempo virtual, última etiqueta da classe) + 1/peso;
+  entra o pedido de menor etiqueta. Com pesos 8/2/1 e todas as classes com
+  fila, o interativo recebe 8 de cada 11 vagas, mas lote e pré-cálculo nunca
+  param de andar. Uma classe ociosa não acumula crédito
+- Reserva interativa: `reserva_interativa` vagas só atendem o interativo (um
+  lote nunca ocupa todas as sessões)
+- Limite por cliente: no máximo `max_por_cliente` cálculos de um mesmo
+  cliente rodando; os demais esperam sem bloquear os de outros clientes
+
+DECISÕES TÉCNICAS:
+- Custo unitário por cálculo (as durações do Excel são parecidas entre casos)
+- Dentro da classe, ordem de chegada (FIFO), pulando pedidos de clientes no limite
+- Tempo de espera na fila por classe: contadores escalonador_espera_segundos_<classe>
+  e escalonador_atendidos_<classe> em GET /metrics; percentis da janela
+  recente em estado() (GET /scheduler/status)
+- capacidade=0 desliga o escalonador (cálculos entram direto, como antes)
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from .metrics import Metrics
+
+
+CLASSE_INTERATIVA = "interativo"
+CLASSE_LOTE = "lote"
+CLASSE_PRECALCULO = "precalculo"
+
+# Ordem = desempate entre classes com a mesma etiqueta
+CLASSES = (CLASSE_INTERATIVA, CLASSE_LOTE, CLASSE_PRECALCULO)
+
+PESOS_PADRAO = {CLASSE_INTERATIVA: 8.0, CLASSE_LOTE: 2.0, CLASSE_PRECALCULO: 1.0}
+
+# Esperas guardadas por classe para os percentis de estado()
+JANELA_ESPERAS = 500
+
+
+def validar_classe(classe: Optional[str], padrao: str = CLASSE_INTERATIVA) -> str:
+    """
+    Classe de prioridade informada (ou a padrão).
+
+    Raises:
+        ValueError: classe desconhecida
+    """
+    if not classe:
+        return padrao
+    classe = classe.strip().lower()
+    if classe not in CLASSES:
+        raise ValueError(f"Classe de prioridade inválida: {classe} (use {', '.join(CLASSES)})")
+    return classe
+
+
+def interpretar_pesos(texto: Optional[str]) -> Dict[str, float]:
+    """
+    Pesos no formato "interativo=8,lote=2,precalculo=1" (classes omitidas
+    mantêm o peso padrão).
+
+    Raises:
+        ValueError: classe desconhecida ou peso não positivo
+    """
+    pesos = dict(PESOS_PADRAO)
+    for parte in (texto or "").split(","):
+        if not parte.strip():
+            continue
+        classe, _, valor = parte.partition("=")
+        classe = validar_classe(classe)
+        peso = float(valor)
+        if peso <= 0:
+            raise ValueError(f"Peso da classe {classe} deve ser positivo: {valor}")
+        pesos[classe] = peso
+    return pesos
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+
+
+class _Pedido:
+    """Cálculo aguardando (ou ocupando) uma vaga."""
+
+    __slots__ = ("classe", "cliente", "etiqueta", "chegada", "liberado")
+
+    def __init__(self, classe: str, cliente: Optional[str], etiqueta: float):
+        self.classe = classe
+        self.cliente = cliente
+        self.etiqueta = etiqueta
+        self.chegada = time.monotonic()
+        self.liberado = False
+
+
+class Escalonador:
+    """
+    Vagas de cálculo distribuídas por classe de prioridade e por cliente.
+    """
+
+    def __init__(
+        self,
+        capacidade: int,
+        pesos: Optional[Dict[str, float]] = None,
+        reserva_interativa: int = 0,
+        max_por_cliente: int = 0,
+        metrics: Optional[Metrics] = None
+    ):
+        """
+        Args:
+            capacidade: cálculos simultâneos (0 = sem escalonamento)
+            pesos: peso de cada classe na fila justa (PESOS_PADRAO)
+            reserva_interativa: vagas exclusivas da classe interativa
+            max_por_cliente: cálculos simultâneos por cliente (0 = sem limite)
+        """
+        self.capacidade = max(0, capacidade)
+        self.pesos = dict(pesos or PESOS_PADRAO)
+        self.reserva_interativa = max(0, reserva_interativa)
+        if self.capacidade and self.reserva_interativa >= self.capacidade:
+            # Ao menos uma vaga para as demais classes, senão nunca andariam
+            self.reserva_interativa = self.capacidade - 1
+            print(f"⚠️ Reserva interativa limitada a {self.reserva_interativa} (capacidade {self.capacidade})")
+        self.max_por_cliente = max(0, max_por_cliente)
+        self.metrics = metrics
+
+        self._cond = threading.Condition()
+        self._fila: Dict[str, Deque[_Pedido]] = {classe: deque() for classe in CLASSES}
+        self._ultima_etiqueta: Dict[str, float] = {classe: 0.0 for classe in CLASSES}
+        self._tempo_virtual = 0.0
+        self._executando: Dict[str, int] = {classe: 0 for classe in CLASSES}
+        self._por_cliente: Dict[str, int] = {}
+        self._esperas: Dict[str, Deque[float]] = {classe: deque(maxlen=JANELA_ESPERAS) for classe in CLASSES}
+        self._atendidos: Dict[str, int] = {classe: 0 for classe in CLASSES}
+
+    @contextmanager
+    def vaga(self, classe: str = CLASSE_INTERATIVA, cliente: Optional[str] = None) -> Iterator[float]:
+        """
+        Aguarda uma vaga para o cálculo e a ocupa enquanto o bloco executa.
+
+        Yields:
+            Segundos de espera na fila
+        """
+        if not self.capacidade:
+            yield 0.0
+            return
+
+        pedido = self._entrar(classe, cliente)
+        try:
+            yield time.monotonic() - pedido.chegada
+        finally:
+            self._sair(pedido)
+
+    def _entrar(self, classe: str, cliente: Optional[str]) -> _Pedido:
+        with self._cond:
+            etiqueta = max(self._tempo_virtual, self._ultima_etiqueta[classe])
+            self._ultima_etiqueta[classe] = etiqueta + 1 / self.pesos[classe]
+            pedido = _Pedido(classe, cliente, etiqueta)
+            self._fila[classe].append(pedido)
+
+            self._liberar()
+            while not pedido.liberado:
+                self._cond.wait()
+
+            espera = time.monotonic() - pedido.chegada
+            self._esperas[classe].append(espera)
+            self._atendidos[classe] += 1
+
+        if self.metrics:
+            self.metrics.incr(f"escalonador_espera_segundos_{classe}", espera)
+            self.metrics.incr(f"escalonador_atendidos_{classe}")
+        return pedido
+
+    def _sair(self, pedido: _Pedido) -> None:
+        with self._cond:
+            self._executando[pedido.classe] -= 1
+            if pedido.cliente is not None:
+                restantes = self._por_cliente[pedido.cliente] - 1
+                if restantes:
+                    self._por_cliente[pedido.cliente] = restantes
+                else:
+                    del self._por_cliente[pedido.cliente]
+            self._liberar()
+
+    def _proximo(self, classe: str) -> Optional[_Pedido]:
+        """Primeiro pedido da classe cujo cliente está abaixo do limite."""
+        for pedido in self._fila[classe]:
+            if (
+                not self.max_por_cliente
+                or pedido.cliente is None
+                or self._por_cliente.get(pedido.cliente, 0) < self.max_por_cliente
+            ):
+                return pedido
+        return None
+
+    def _liberar(self) -> None:
+        """Ocupa as vagas livres com os pedidos elegíveis de menor etiqueta (chamar com o lock)."""
+        liberou = False
+        while sum(self._executando.values()) < self.capacidade:
+            nao_interativos = sum(self._executando.values()) - self._executando[CLASSE_INTERATIVA]
+            candidatos = [
+                pedido for pedido in (self._proximo(classe) for classe in CLASSES)
+                if pedido is not None and (
+                    pedido.classe == CLASSE_INTERATIVA
+                    or nao_interativos < self.capacidade - self.reserva_interativa
+                )
+            ]
+            if not candidatos:
+                break
+
+            # min() mantém a ordem de CLASSES no empate
+            pedido = min(candidatos, key=lambda p: p.etiqueta)
+            self._fila[pedido.classe].remove(pedido)
+            self._tempo_virtual = pedido.etiqueta
+            self._executando[pedido.classe] += 1
+            if pedido.cliente is not None:
+                self._por_cliente[pedido.cliente] = self._por_cliente.get(pedido.cliente, 0) + 1
+            pedido.liberado = True
+            liberou = True
+
+        if liberou:
+            self._cond.notify_all()
+
+    def estado(self) -> Dict[str, Any]:
+        """Configuração, ocupação e espera recente (média/p50/p95/máx) por classe."""
+        with self._cond:
+            classes = {}
+            for classe in CLASSES:
+                esperas = list(self._esperas[classe])
+                classes[classe] = {
+                    "peso": self.pesos[classe],
+                    "na_fila": len(self._fila[classe]),
+                    "executando": self._executando[classe],
+                    "atendidos": self._atendidos[classe],
+                    "espera_segundos": {
+                        "media": round(sum(esperas) / len(esperas), 4) if esperas else 0.0,
+                        "p50": round(_percentil(esperas, 0.50), 4),
+                        "p95": round(_percentil(esperas, 0.95), 4),
+                        "max": round(max(esperas), 4) if esperas else 0.0,
+                    },
+                }
+            return {
+                "capacidade": self.capacidade,
+                "reserva_interativa": self.reserva_interativa,
+                "max_por_cliente": self.max_por_cliente,
+                "clientes_ativos": len(self._por_cliente),
+                "classes": classes,
+            }
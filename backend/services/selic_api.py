@@ -4,15 +4,26 @@ Garante que os dados SELIC estejam atualizados na planilha e em cache local.
 
 DECISÕES TÉCNICAS:
 - API oficial: https://api.bcb.gov.br/dados/serie/bcdata.sgs.4390/dados?formato=json
-- Cache local em JSON para evitar requisições repetidas
+- Série diária (SGS 11, % a.d.) em cache próprio (selic_cache_diaria.bin), buscada
+  por intervalo de datas apenas quando a correção diária é usada
+- Cache local binário (selic_cache.bin, ver selic_store.py) lido via mmap;
+  um selic_cache.json antigo no mesmo diretório é importado na primeira execução
+- Caches abertos no primeiro uso (propriedades cache/cache_diario), não no
+  construtor: o import do main.py não lê nem grava disco; na API isso acontece
+  na fase "selic" do aquecimento
 - Validação da data "correção_até" para determinar se precisa atualizar
 """
 
 import httpx
 import json
+import os
+import threading
+import time
 from pathlib import Path
-from datetime import datetime
-from typing import Optional, Dict, List
+from datetime import date, datetime
+from typing import Optional, Dict, List, Sequence
+
+from .selic_store import SelicStore, importar_json
 
 
 class SelicAPI:
@@ -21,26 +32,70 @@ class SelicAPI:
     """
     
     API_URL = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.4390/dados?formato=json"
+    API_URL_DIARIA = (
+        "https://api.bcb.gov.br/dados/serie/bcdata.sgs.11/dados"
+        "?formato=json&dataInicial={inicio}&dataFinal={fim}"
+    )
+    
+    # Intervalo mínimo entre consultas da série diária para um mesmo fim
+    # (dias ainda sem taxa publicada, como hoje, não disparam uma consulta por cálculo)
+    REVALIDACAO_DIARIA_SEGUNDOS = 3600
     
     def __init__(self, cache_path: str = "./data/selic_cache.json"):
-        self.cache_path = Path(cache_path)
-        self.cache = self._load_cache()
+        # O caminho configurado pode ser o .json antigo ou o próprio .bin
+        self.cache_path = Path(cache_path).with_suffix(".bin")
+        self._json_path = Path(cache_path).with_suffix(".json")
+        self._cache: Optional[SelicStore] = None
+        self._cache_diario: Optional[SelicStore] = None
+        self._lock_abertura = threading.Lock()
+        # Permite apontar para um servidor BCB local (testes de carga)
+        self.api_url = os.getenv("SELIC_API_URL", self.API_URL)
+        self.api_url_diaria = os.getenv("SELIC_DIARIA_API_URL", self.API_URL_DIARIA)
+        self._consultas_diarias: Dict[date, float] = {}
+        self._lock_diario = threading.Lock()
+        # Uma busca/gravação da série mensal por vez (requisições simultâneas
+        # do mesmo mês novo esperam a primeira e leem o cache atualizado)
+        self._lock_mensal = threading.Lock()
+    
+    @property
+    def cache(self) -> SelicStore:
+        """Série mensal (aberta e, se preciso, convertida do JSON no primeiro uso)."""
+        if self._cache is None:
+            with self._lock_abertura:
+                if self._cache is None:
+                    self._cache = self._load_cache(self._json_path)
+        return self._cache
+    
+    @property
+    def cache_diario(self) -> SelicStore:
+        """Série diária (aberta no primeiro uso)."""
+        if self._cache_diario is None:
+            with self._lock_abertura:
+                if self._cache_diario is None:
+                    self._cache_diario = SelicStore.abrir(
+                        str(self.cache_path.with_name(f"{self.cache_path.stem}_diaria.bin"))
+                    )
+        return self._cache_diario
     
-    def _load_cache(self) -> Dict:
-        """Carrega o cache local de dados SELIC."""
-        if self.cache_path.exists():
+    def _load_cache(self, json_path: Path) -> SelicStore:
+        """Abre o cache binário, importando o JSON antigo se ainda não existir."""
+        if not self.cache_path.exists() and json_path.exists():
             try:
-                with open(self.cache_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception:
-                return {}
-        return {}
+                meses = importar_json(str(json_path), str(self.cache_path))
+                print(f"📦 Cache SELIC convertido para binário: {meses} meses ({self.cache_path.name})")
+            except Exception as e:
+                print(f"⚠️ Não foi possível importar {json_path.name}: {str(e)}")
+        
+        try:
+            return SelicStore.abrir(str(self.cache_path))
+        except ValueError as e:
+            print(f"⚠️ {str(e)}; cache SELIC será recriado")
+            self.cache_path.unlink()
+            return SelicStore.abrir(str(self.cache_path))
     
-    def _save_cache(self) -> None:
-        """Salva o cache local de dados SELIC."""
-        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.cache_path, 'w', encoding='utf-8') as f:
-            json.dump(self.cache, f, indent=2, ensure_ascii=False)
+    def _save_cache(self, serie: Dict[str, float]) -> None:
+        """Regrava o cache local de dados SELIC."""
+        self.cache.salvar(serie)
     
     def _parse_date(self, date_str: str) -> Optional[str]:
         """
@@ -65,7 +120,7 @@ class SelicAPI:
         Retorna lista de dicionários com formato: [{"data": "01/01/2020", "valor": "4.40"}, ...]
         """
         try:
-            response = httpx.get(self.API_URL, timeout=30.0)
+            response = httpx.get(self.api_url, timeout=30.0)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -88,35 +143,146 @@ class SelicAPI:
         if not mes_ano:
             raise ValueError(f"Data inválida para correção: {correcao_ate}")
         
-        # Verificar se já existe no cache
-        if mes_ano in self.cache:
-            return self.cache[mes_ano]
+        # Verificar se já existe no cache (ou se outro processo já o atualizou)
+        selic = self.cache.taxa(mes_ano)
+        if selic is None:
+            self.cache.recarregar_se_mudou()
+            selic = self.cache.taxa(mes_ano)
+        if selic is not None:
+            return selic
         
-        # Buscar dados atualizados da API
-        print(f"📡 Buscando dados SELIC para {mes_ano} na API do Banco Central...")
-        selic_data = self.fetch_selic_data()
-        
-        # Atualizar o cache com todos os dados
-        for item in selic_data:
-            data_item = item.get("data", "")
-            valor_item = item.get("valor", "")
+        with self._lock_mensal:
+            # Outra requisição pode ter atualizado o cache enquanto esta esperava
+            selic = self.cache.taxa(mes_ano)
+            if selic is not None:
+                return selic
+            
+            # Buscar dados atualizados da API
+            print(f"📡 Buscando dados SELIC para {mes_ano} na API do Banco Central...")
+            selic_data = self.fetch_selic_data()
+            
+            # Atualizar o cache com todos os dados
+            serie = self.cache.para_dict()
+            for item in selic_data:
+                data_item = item.get("data", "")
+                valor_item = item.get("valor", "")
+                
+                # Converter data "01/MM/YYYY" para "YYYY-MM"
+                try:
+                    dt = datetime.strptime(data_item, "%d/%m/%Y")
+                    chave = dt.strftime("%Y-%m")
+                    serie[chave] = float(valor_item)
+                except Exception:
+                    continue
             
-            # Converter data "01/MM/YYYY" para "YYYY-MM"
+            # Salvar cache atualizado
+            self._save_cache(serie)
+            
+            # Retornar o valor solicitado
+            return self.cache.taxa(mes_ano)
+    
+    def get_selic_for_month(self, mes_ano: str) -> Optional[float]:
+        """
+        Retorna o valor SELIC para um mês específico (formato: YYYY-MM).
+        """
+        return self.cache.taxa(mes_ano)
+    
+    @staticmethod
+    def serie_diaria_para_dict(selic_data: List[Dict]) -> Dict[str, float]:
+        """Converte a resposta da SGS 11 ([{"data": "DD/MM/YYYY", "valor": "0.05"}]) em "YYYY-MM-DD" → taxa."""
+        serie = {}
+        for item in selic_data:
             try:
-                dt = datetime.strptime(data_item, "%d/%m/%Y")
-                chave = dt.strftime("%Y-%m")
-                self.cache[chave] = float(valor_item)
+                dia = datetime.strptime(item.get("data", ""), "%d/%m/%Y").date()
+                serie[dia.isoformat()] = float(item.get("valor", ""))
             except Exception:
                 continue
+        return serie
+    
+    def fetch_selic_diaria(self, inicio: date, fim: date) -> List[Dict]:
+        """
+        Busca a SELIC diária (% a.d.) da API do Banco Central entre duas datas.
+        """
+        url = self.api_url_diaria.format(inicio=inicio.strftime("%d/%m/%Y"), fim=fim.strftime("%d/%m/%Y"))
+        try:
+            response = httpx.get(url, timeout=30.0)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            raise Exception(f"Erro ao buscar SELIC diária da API: {str(e)}")
+    
+    def _salvar_serie_diaria(self, novos: Dict[str, float], inicio: date) -> None:
+        """Mescla dias novos ao cache diário, mantendo o início mais antigo (chamar com _lock_diario)."""
+        serie = self.cache_diario.para_dict()
+        serie.update(novos)
+        if not serie:
+            return
+        
+        atual = self.cache_diario.primeiro_dia()
+        primeiro = min(inicio, atual) if atual else inicio
+        self.cache_diario.salvar(serie, primeiro.isoformat())
+    
+    def ensure_selic_diaria(self, inicio: date, fim: date) -> bool:
+        """
+        Garante a SELIC diária no cache de `inicio` até `fim`, buscando na API
+        os dias que faltarem.
+        
+        Returns:
+            True se o cache cobre o período inteiro
+        """
+        if self.cache_diario.cobre(inicio, fim):
+            return True
+        
+        self.cache_diario.recarregar_se_mudou()
+        if self.cache_diario.cobre(inicio, fim):
+            return True
+        
+        with self._lock_diario:
+            ultima = self._consultas_diarias.get(fim)
+            if ultima and time.monotonic() - ultima < self.REVALIDACAO_DIARIA_SEGUNDOS:
+                # Consultado há pouco (ou em andamento em outra thread): usa o que houver
+                return self.cache_diario.cobre(inicio, fim)
+            self._consultas_diarias[fim] = time.monotonic()
         
-        # Salvar cache atualizado
-        self._save_cache()
+        # HTTP fora do lock: uma consulta lenta ao BCB não trava os cálculos
+        # que só leem o cache ou pedem outro período
+        print(f"📡 Buscando SELIC diária de {inicio:%d/%m/%Y} a {fim:%d/%m/%Y} na API do Banco Central...")
+        novos = self.serie_diaria_para_dict(self.fetch_selic_diaria(inicio, fim))
         
-        # Retornar o valor solicitado
-        return self.cache.get(mes_ano)
+        with self._lock_diario:
+            self._salvar_serie_diaria(novos, inicio)
+        
+        return self.cache_diario.cobre(inicio, fim)
     
-    def get_selic_for_month(self, mes_ano: str) -> Optional[float]:
+    def importar_selic_diaria(self, json_path: str, inicio: Optional[date] = None) -> int:
         """
-        Retorna o valor SELIC para um mês específico (formato: YYYY-MM).
+        Importa uma série diária offline no formato da SGS 11 (ex.:
+        data/selic_diaria_sintetica.json) para o cache diário.
+        
+        Returns:
+            Quantidade de dias com taxa importados
+        """
+        with open(json_path, 'r', encoding='utf-8') as f:
+            novos = self.serie_diaria_para_dict(json.load(f))
+        if novos:
+            with self._lock_diario:
+                self._salvar_serie_diaria(novos, inicio or date.fromisoformat(min(novos)))
+        return len(novos)
+    
+    def get_fator_diario(self, inicio: date, fim: date) -> Optional[float]:
+        """
+        Fator SELIC diário acumulado de `inicio` até `fim` (taxas dos dias
+        inicio ≤ d < fim) em O(1), ou None se o cache não cobrir o período.
+        """
+        return self.cache_diario.fator_periodo(inicio, fim)
+    
+    def get_fatores_diarios(self, inicio: date, fins: Sequence[date]) -> List[Optional[float]]:
+        """Fatores diários de `inicio` até cada data de `fins` em uma consulta vetorizada."""
+        return self.cache_diario.fatores_periodos(inicio, fins)
+    
+    def get_fator_composto(self, mes_inicio: str, mes_fim: str) -> Optional[float]:
+        """
+        Retorna o fator SELIC composto dos meses mes_inicio..mes_fim (YYYY-MM,
+        inclusive) em O(1), ou None se algum mês não estiver no cache.
         """
-        return self.cache.get(mes_ano)
+        return self.cache.fator_composto(mes_inicio, mes_fim)
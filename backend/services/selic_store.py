@@ -0,0 +1,389 @@
+"""
+Armazenamento binário de séries SELIC (mensal e diária), lido via mmap.
+
+Substitui o selic_cache.json (dict "YYYY-MM" → taxa, lido por inteiro em
+cada SelicAPI e regravado por inteiro a cada atualização) por um arquivo
+compacto com acesso direto pelo deslocamento do período.
+
+FORMATO (little-endian, selic_cache.bin / selic_cache_diaria.bin):
+    cabeçalho (32 bytes):
+        magic       8s   b"SELICBIN"
+        versao      u16  1
+        ano_base    u16  ano do primeiro período da série
+        mes_base    u16  mês (1-12) do primeiro período
+        dia_base    u16  dia do primeiro período (0 = série mensal)
+        n_periodos  u32  quantidade de períodos (meses ou dias corridos)
+        n_lacunas   u32  períodos sem taxa dentro da série
+        (8 bytes de preenchimento)
+    taxas:   float64[n_periodos]      taxa em % ao período (NaN = sem dado)
+    fatores: float64[n_periodos + 1]  fatores[k] = Π (1 + taxa/100) dos k primeiros
+                                      períodos (período sem dado conta como 1)
+
+Série mensal: fator dos meses i..j (inclusive) = fatores[j + 1] / fatores[i].
+Série diária (dias corridos; fins de semana e feriados sem taxa): fator de
+uma data d1 até d2 = fatores[d2 - base] / fatores[d1 - base], ou seja, a
+taxa do dia d (overnight d → próximo dia útil) conta para d1 ≤ d < d2.
+
+DECISÕES TÉCNICAS:
+- Somente stdlib (mmap + memoryview.cast('d')): abrir o arquivo não lê nem
+  converte a série; cada consulta é O(1) pelo deslocamento do período
+- numpy (opcional) para consultar muitas datas de uma vez (fatores_periodos)
+- Gravação atômica (temporário exclusivo por gravação via mkstemp + os.replace); como o Windows não
+  permite substituir um arquivo mapeado, cada caminho tem uma única instância
+  compartilhada no processo (SelicStore.abrir), que solta o mapa antes de trocar
+- Outros processos percebem a troca pelo mtime/tamanho (recarregar_se_mudou)
+- Leituras sob um lock da instância: a troca do mapa nunca é vista pela metade
+- Importação/exportação do JSON antigo: scripts/selic_store.py
+"""
+
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy é opcional (consultas em lote)
+    np = None
+
+
+MAGIC = b"SELICBIN"
+VERSAO = 1
+CABECALHO = struct.Struct("<8sHHHHII8x")
+
+
+def _indice_mes(mes_ano: str) -> int:
+    """Converte "YYYY-MM" em um índice absoluto de meses (ano * 12 + mês - 1)."""
+    ano, mes = mes_ano.split("-")
+    return int(ano) * 12 + int(mes) - 1
+
+
+def _mes_do_indice(indice: int) -> str:
+    return f"{indice // 12:04d}-{indice % 12 + 1:02d}"
+
+
+def _indice_dia(dia: str) -> int:
+    """Converte "YYYY-MM-DD" no ordinal do dia."""
+    return date.fromisoformat(dia).toordinal()
+
+
+def _dia_do_indice(indice: int) -> str:
+    return date.fromordinal(indice).isoformat()
+
+
+class SelicStore:
+    """
+    Série SELIC (mensal ou diária) mapeada em memória.
+    """
+
+    _instancias: Dict[str, "SelicStore"] = {}
+    _lock_instancias = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._arquivo = None
+        self._mmap = None
+        self._assinatura: Optional[Tuple[float, int]] = None
+        self.diaria = False
+        self.indice_base = 0
+        self.n_periodos = 0
+        self.n_lacunas = 0
+        self.taxas = memoryview(b"").cast("d")
+        self.fatores = memoryview(b"").cast("d")
+        self._mapear()
+
+    @classmethod
+    def abrir(cls, path: str) -> "SelicStore":
+        """Instância compartilhada por caminho (necessária para regravar no Windows)."""
+        chave = str(Path(path).resolve())
+        with cls._lock_instancias:
+            if chave not in cls._instancias:
+                cls._instancias[chave] = cls(path)
+            return cls._instancias[chave]
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def _mapear(self) -> None:
+        """Mapeia o arquivo (se existir) e expõe taxas/fatores sem cópia."""
+        self._soltar()
+        if not self.path.exists() or self.path.stat().st_size < CABECALHO.size:
+            return
+
+        self._arquivo = open(self.path, "rb")
+        self._mmap = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        stat = os.fstat(self._arquivo.fileno())
+        self._assinatura = (stat.st_mtime, stat.st_size)
+
+        magic, versao, ano, mes, dia, n_periodos, n_lacunas = CABECALHO.unpack_from(self._mmap, 0)
+        if magic != MAGIC or versao != VERSAO:
+            self._soltar()
+            raise ValueError(f"Arquivo SELIC binário inválido: {self.path}")
+
+        self.diaria = dia != 0
+        self.indice_base = date(ano, mes, dia).toordinal() if self.diaria else ano * 12 + mes - 1
+        self.n_periodos = n_periodos
+        self.n_lacunas = n_lacunas
+
+        inicio_taxas = CABECALHO.size
+        inicio_fatores = inicio_taxas + 8 * n_periodos
+        fim = inicio_fatores + 8 * (n_periodos + 1)
+
+        if sys.byteorder == "little":
+            dados = memoryview(self._mmap)
+            self.taxas = dados[inicio_taxas:inicio_fatores].cast("d")
+            self.fatores = dados[inicio_fatores:fim].cast("d")
+        else:
+            # Hosts big-endian: cópia com troca de bytes (não há acesso direto)
+            taxas = array("d", self._mmap[inicio_taxas:inicio_fatores])
+            fatores = array("d", self._mmap[inicio_fatores:fim])
+            taxas.byteswap()
+            fatores.byteswap()
+            self.taxas = memoryview(taxas)
+            self.fatores = memoryview(fatores)
+
+    def _soltar(self) -> None:
+        """Libera o mapa atual (as memoryviews precisam ser soltas antes do mmap)."""
+        for visao in (self.taxas, self.fatores):
+            if isinstance(visao, memoryview):
+                visao.release()
+        self.taxas = memoryview(b"").cast("d")
+        self.fatores = memoryview(b"").cast("d")
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+        self.n_periodos = 0
+        self.n_lacunas = 0
+
+    def recarregar_se_mudou(self) -> None:
+        """Remapeia o arquivo se outro processo o substituiu."""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return
+        if (stat.st_mtime, stat.st_size) != self._assinatura:
+            with self._lock:
+                self._mapear()
+
+    def _posicao(self, mes_ano: str) -> Optional[int]:
+        posicao = _indice_mes(mes_ano) - self.indice_base
+        if not self.diaria and 0 <= posicao < self.n_periodos:
+            return posicao
+        return None
+
+    def __contains__(self, mes_ano: str) -> bool:
+        return self.taxa(mes_ano) is not None
+
+    def __len__(self) -> int:
+        return self.n_periodos - self.n_lacunas
+
+    def taxa(self, mes_ano: str) -> Optional[float]:
+        """Taxa SELIC (% ao mês) de um mês "YYYY-MM" de uma série mensal, ou None."""
+        with self._lock:
+            posicao = self._posicao(mes_ano)
+            if posicao is None:
+                return None
+            valor = self.taxas[posicao]
+        return None if math.isnan(valor) else valor
+
+    def fator_composto(self, mes_inicio: str, mes_fim: str) -> Optional[float]:
+        """
+        Fator Π (1 + taxa/100) dos meses mes_inicio..mes_fim (inclusive), em O(1).
+
+        Returns:
+            Fator, ou None se algum mês do intervalo não estiver na série
+        """
+        with self._lock:
+            i = self._posicao(mes_inicio)
+            j = self._posicao(mes_fim)
+            if i is None or j is None or j < i:
+                return None
+
+            if self.n_lacunas and any(math.isnan(t) for t in self.taxas[i:j + 1]):
+                return None
+
+            return self.fatores[j + 1] / self.fatores[i]
+
+    def cobre(self, inicio: date, fim: date) -> bool:
+        """Série diária: verifica se o período inicio → fim está dentro da série."""
+        i = inicio.toordinal() - self.indice_base
+        j = fim.toordinal() - self.indice_base
+        return self.diaria and 0 <= i <= j <= self.n_periodos
+
+    def fator_periodo(self, inicio: date, fim: date) -> Optional[float]:
+        """
+        Série diária: fator acumulado de `inicio` até `fim` (taxas dos dias
+        inicio ≤ d < fim), em O(1).
+
+        Returns:
+            Fator, ou None se o período sair da série
+        """
+        with self._lock:
+            if not self.cobre(inicio, fim):
+                return None
+            base = self.indice_base
+            return self.fatores[fim.toordinal() - base] / self.fatores[inicio.toordinal() - base]
+
+    def fatores_periodos(self, inicio: date, fins: Sequence[date]) -> List[Optional[float]]:
+        """
+        Série diária: fatores de `inicio` até cada data de `fins`, em uma única
+        consulta vetorizada (numpy) quando disponível.
+        """
+        with self._lock:
+            if not self.cobre(inicio, inicio):
+                return [None] * len(fins)
+
+            base = self.indice_base
+            posicao_inicio = inicio.toordinal() - base
+            fator_inicio = self.fatores[posicao_inicio]
+            posicoes = [fim.toordinal() - base for fim in fins]
+            validas = [posicao_inicio <= p <= self.n_periodos for p in posicoes]
+
+            if np is not None and fins:
+                indices = np.where(validas, posicoes, 0)
+                valores = (np.asarray(self.fatores)[indices] / fator_inicio).tolist()
+            else:
+                valores = [self.fatores[p] / fator_inicio if ok else None for p, ok in zip(posicoes, validas)]
+
+        return [valor if ok else None for valor, ok in zip(valores, validas)]
+
+    def primeiro_dia(self) -> Optional[date]:
+        """Série diária: primeiro dia da série (ou None se vazia)."""
+        if not self.diaria or not self.n_periodos:
+            return None
+        return date.fromordinal(self.indice_base)
+
+    def ultimo_dia(self) -> Optional[date]:
+        """Série diária: último dia da série (ou None se vazia)."""
+        if not self.diaria or not self.n_periodos:
+            return None
+        return date.fromordinal(self.indice_base + self.n_periodos - 1)
+
+    def para_dict(self) -> Dict[str, float]:
+        """Série completa como dict "YYYY-MM" (ou "YYYY-MM-DD") → taxa."""
+        para_chave = _dia_do_indice if self.diaria else _mes_do_indice
+        with self._lock:
+            return {
+                para_chave(self.indice_base + k): valor
+                for k, valor in enumerate(self.taxas)
+                if not math.isnan(valor)
+            }
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    def salvar(self, serie: Dict[str, float], inicio: Optional[str] = None) -> None:
+        """
+        Regrava o arquivo com a série informada e remapeia.
+
+        Args:
+            inicio: Primeiro período da série, se anterior à primeira taxa
+                    (ex.: série diária consultada a partir de um feriado)
+        """
+        conteudo = codificar(serie, inicio)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Temporário exclusivo por gravação: threads/processos que salvam ao
+        # mesmo tempo não escrevem no mesmo arquivo nem publicam um incompleto
+        descritor, temporario = tempfile.mkstemp(prefix=f"{self.path.name}.", suffix=".tmp", dir=self.path.parent)
+        try:
+            with os.fdopen(descritor, "wb") as f:
+                f.write(conteudo)
+                f.flush()
+                os.fsync(f.fileno())
+
+            with self._lock:
+                self._soltar()
+                os.replace(temporario, self.path)
+                self._mapear()
+        except BaseException:
+            if os.path.exists(temporario):
+                os.unlink(temporario)
+            raise
+
+    def close(self) -> None:
+        """Libera o mapa e remove a instância compartilhada."""
+        with self._lock:
+            self._soltar()
+        with self._lock_instancias:
+            self._instancias.pop(str(self.path.resolve()), None)
+
+
+def codificar(serie: Dict[str, float], inicio: Optional[str] = None) -> bytes:
+    """
+    Serializa uma série no formato binário. Chaves "YYYY-MM" geram uma série
+    mensal; chaves "YYYY-MM-DD", uma série diária em dias corridos. `inicio`
+    (mesmo formato das chaves) antecipa o primeiro período, sem taxa.
+    """
+    if not serie:
+        return CABECALHO.pack(MAGIC, VERSAO, 0, 1, 0, 0, 0)
+
+    diaria = len(next(iter(serie))) == 10
+    para_indice = _indice_dia if diaria else _indice_mes
+    indices = {para_indice(chave): float(taxa) for chave, taxa in serie.items()}
+    inicio = min(min(indices), para_indice(inicio)) if inicio else min(indices)
+    n_periodos = max(indices) - inicio + 1
+
+    taxas = array("d", [math.nan]) * n_periodos
+    for indice, taxa in indices.items():
+        taxas[indice - inicio] = taxa
+
+    fatores = array("d", [1.0])
+    acumulado = 1.0
+    for taxa in taxas:
+        if not math.isnan(taxa):
+            acumulado *= 1 + taxa / 100
+        fatores.append(acumulado)
+
+    if sys.byteorder != "little":
+        taxas.byteswap()
+        fatores.byteswap()
+
+    if diaria:
+        dia_base = date.fromordinal(inicio)
+        ano, mes, dia = dia_base.year, dia_base.month, dia_base.day
+    else:
+        ano, mes, dia = inicio // 12, inicio % 12 + 1, 0
+
+    n_lacunas = n_periodos - len(indices)
+    cabecalho = CABECALHO.pack(MAGIC, VERSAO, ano, mes, dia, n_periodos, n_lacunas)
+    return cabecalho + taxas.tobytes() + fatores.tobytes()
+
+
+def importar_json(json_path: str, bin_path: str) -> int:
+    """
+    Converte um cache JSON (dict "YYYY-MM" ou "YYYY-MM-DD" → taxa) para o formato binário.
+
+    Returns:
+        Quantidade de períodos importados
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        serie = {chave: float(taxa) for chave, taxa in json.load(f).items()}
+    SelicStore.abrir(bin_path).salvar(serie)
+    return len(serie)
+
+
+def exportar_json(bin_path: str, json_path: str) -> int:
+    """
+    Exporta o arquivo binário para JSON (mesmo formato do selic_cache.json).
+
+    Returns:
+        Quantidade de períodos exportados
+    """
+    serie = SelicStore.abrir(bin_path).para_dict()
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(serie, f, indent=2, ensure_ascii=False)
+    return len(serie)
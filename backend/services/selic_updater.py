@@ -7,14 +7,26 @@ para datas posteriores escolhidas pelo usuário.
 DECISÕES TÉCNICAS:
 - Base: Valores da planilha em 01/01/2025
 - Método: Aplicação de SELIC mensal composta (1 + selic_mensal)
+- Fator composto do período lido em O(1) do cache binário (fatores acumulados)
+  e aplicado com uma multiplicação por valor; meses fora do cache caem no
+  cálculo mês a mês (que tenta buscá-los na API)
 - Colunas atualizadas: C (Juros), D (Valor Atualizado), E (Honorários)
+- Regra monetária em um só lugar (sobrepor_fator, sobre ResultSet): a API
+  (atualizar_result_set), a recorreção em lote e atualizar_resultados (tabelas
+  no formato JSON) passam por ela
+- Precisão diária (opcional, precisao="diaria"): fator da SELIC diária (SGS 11)
+  acumulada de 01/01/2025 até o dia exato da correção, lido do índice de fatores
+  diários acumulados; dias posteriores à última taxa publicada entram pro rata
+  pela taxa mensal ((1 + taxa_mes) ** (dias / dias_do_mes)); sem dados diários,
+  volta para o método mensal
 """
 
-from datetime import datetime
-from typing import Dict, List, Any
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Optional
 from pathlib import Path
 import json
 from .selic_api import SelicAPI
+from .result_set import ResultSet
 
 
 class SelicUpdater:
@@ -30,7 +42,12 @@ class SelicUpdater:
     COLUNA_ATUALIZADO = 3  # Coluna D (índice 3)
     COLUNA_HONORARIOS = 4  # Coluna E (índice 4)
     
-    def __init__(self, selic_cache_path: str = "./data/selic_cache.json"):
+    PRECISOES = ("mensal", "diaria")
+    
+    def __init__(self, selic_cache_path: str = "./data/selic_cache.json", precisao: str = "mensal"):
+        if precisao not in self.PRECISOES:
+            raise ValueError(f"Precisão SELIC inválida: {precisao} (use {' ou '.join(self.PRECISOES)})")
+        self.precisao = precisao
         self.selic_api = SelicAPI(selic_cache_path)
         
         # Carregar mapeamento de tabelas que usam SELIC
@@ -119,6 +136,86 @@ class SelicUpdater:
         
         return valor_atual
     
+    def _fator_meses(self, meses: List[str]) -> float:
+        """
+        Fator SELIC composto de uma lista contígua de meses (YYYY-MM).
+        """
+        if not meses:
+            return 1.0
+        
+        fator = self.selic_api.get_fator_composto(meses[0], meses[-1])
+        if fator is None:
+            fator = self._aplicar_selic_composta(1.0, meses)
+        return fator
+    
+    def _fator_pro_rata(self, inicio: date, fim: date) -> Optional[float]:
+        """
+        Fator SELIC mensal pro rata por dias corridos de `inicio` até `fim`:
+        Π (1 + taxa_mes/100) ** (dias no mês / dias do mês).
+        
+        Returns:
+            Fator, ou None se faltar a taxa de algum mês
+        """
+        fator = 1.0
+        atual = inicio
+        while atual < fim:
+            primeiro_dia = atual.replace(day=1)
+            proximo_mes = (primeiro_dia + timedelta(days=32)).replace(day=1)
+            fim_trecho = min(proximo_mes, fim)
+            
+            selic_mensal = self.selic_api.get_selic_for_month(f"{atual:%Y-%m}")
+            if selic_mensal is None:
+                return None
+            
+            fator *= (1 + selic_mensal / 100) ** ((fim_trecho - atual).days / (proximo_mes - primeiro_dia).days)
+            atual = fim_trecho
+        
+        return fator
+    
+    def _fator_diario(self, data_correcao: datetime) -> Optional[float]:
+        """
+        Fator SELIC diário de 01/01/2025 até a data de correção (dia exato).
+        
+        Returns:
+            Fator, ou None se não houver série diária para o período
+        """
+        inicio = self.DATA_BASE.date()
+        fim = data_correcao.date()
+        
+        try:
+            self.selic_api.ensure_selic_diaria(inicio, fim)
+        except Exception as e:
+            print(f"⚠️ Aviso SELIC diária: {str(e)}")
+        
+        fator = self.selic_api.get_fator_diario(inicio, fim)
+        if fator is not None:
+            return fator
+        
+        # Série diária até a última taxa publicada + restante pro rata pela taxa mensal
+        ultimo_dia = self.selic_api.cache_diario.ultimo_dia()
+        if ultimo_dia is None or ultimo_dia + timedelta(days=1) >= fim:
+            return None
+        
+        limite = ultimo_dia + timedelta(days=1)
+        parcial = self.selic_api.get_fator_diario(inicio, limite)
+        restante = self._fator_pro_rata(limite, fim)
+        if parcial is None or restante is None:
+            return None
+        
+        return parcial * restante
+    
+    def _fator_periodo(self, data_correcao: datetime, meses: List[str]) -> float:
+        """
+        Fator SELIC de 01/01/2025 até a data de correção, na precisão configurada.
+        """
+        if self.precisao == "diaria":
+            fator = self._fator_diario(data_correcao)
+            if fator is not None:
+                return fator
+            print("⚠️ SELIC diária indisponível para o período; usando SELIC mensal")
+        
+        return self._fator_meses(meses)
+    
     def precisa_atualizacao(self, correcao_ate: str) -> bool:
         """
         Verifica se a data de correção é posterior à data base (01/01/2025).
@@ -129,82 +226,119 @@ class SelicUpdater:
         except:
             return False
     
-    def atualizar_resultados(self, results: List[Dict[str, Any]], correcao_ate: str) -> List[Dict[str, Any]]:
+    def base_na_data_base(self, correcao_ate: str) -> bool:
         """
-        Atualiza os resultados aplicando SELIC mensal desde 01/01/2025 até a data especificada.
+        Verifica se os resultados base de um cálculo com esta data de correção
+        estão em 01/01/2025 (correção a partir da data base), ou seja, se podem
+        ser levados a outra data só com a camada SELIC.
+        """
+        try:
+            return self._parse_date(correcao_ate) >= self.DATA_BASE
+        except (ValueError, AttributeError):
+            return False
+    
+    def fator_atualizacao(self, correcao_ate: str) -> Optional[float]:
+        """
+        Fator aplicado por atualizar_resultados para a data de correção, ou None
+        quando os resultados base são devolvidos sem alteração.
+        """
+        if not self.precisa_atualizacao(correcao_ate):
+            return None
         
-        Args:
-            results: Lista de tabelas com resultados base (01/01/2025)
-            correcao_ate: Data de correção no formato DD/MM/YYYY
+        # Calcular meses de SELIC a aplicar
+        data_correcao = self._parse_date(correcao_ate)
+        meses_selic = self._get_meses_entre_datas(self.DATA_BASE, data_correcao)
         
-        Returns:
-            Nova lista de tabelas com valores atualizados
+        if self.precisao == "diaria":
+            print(f"Aplicando SELIC diária de {self.DATA_BASE:%d/%m/%Y} a {data_correcao:%d/%m/%Y}")
+        elif not meses_selic:
+            return None
+        else:
+            print(f"Aplicando SELIC de {meses_selic[0]} a {meses_selic[-1]} ({len(meses_selic)} meses)")
+        return self._fator_periodo(data_correcao, meses_selic)
+    
+    def fator_acumulado(self, correcao_ate: str) -> float:
+        """
+        Retorna o fator SELIC composto entre a data base (01/01/2025) e a data de correção.
+        Permite corrigir muitos valores com uma única multiplicação.
         """
-        # Verificar se precisa atualizar
         if not self.precisa_atualizacao(correcao_ate):
-            return results
+            return 1.0
         
-        # Calcular meses de SELIC a aplicar
         data_correcao = self._parse_date(correcao_ate)
         meses_selic = self._get_meses_entre_datas(self.DATA_BASE, data_correcao)
+        return self._fator_periodo(data_correcao, meses_selic)
+    
+    def fatores_acumulados(self, datas_correcao: List[str]) -> List[float]:
+        """
+        Fatores SELIC para várias datas de correção de uma vez. Na precisão
+        diária, as datas cobertas pelo cache saem de uma única consulta
+        vetorizada ao índice de fatores diários acumulados.
+        """
+        datas = [self._parse_date(d) for d in datas_correcao]
+        fatores: List[Optional[float]] = [None] * len(datas)
         
-        if not meses_selic:
-            return results
+        if self.precisao == "diaria":
+            posteriores = [i for i, d in enumerate(datas) if d > self.DATA_BASE]
+            if posteriores:
+                try:
+                    self.selic_api.ensure_selic_diaria(
+                        self.DATA_BASE.date(), max(datas[i] for i in posteriores).date()
+                    )
+                except Exception as e:
+                    print(f"⚠️ Aviso SELIC diária: {str(e)}")
+                
+                encontrados = self.selic_api.get_fatores_diarios(
+                    self.DATA_BASE.date(), [datas[i].date() for i in posteriores]
+                )
+                for i, fator in zip(posteriores, encontrados):
+                    fatores[i] = fator
         
-        print(f"Aplicando SELIC de {meses_selic[0]} a {meses_selic[-1]} ({len(meses_selic)} meses)")
+        return [
+            fator if fator is not None else self.fator_acumulado(d)
+            for fator, d in zip(fatores, datas_correcao)
+        ]
+    
+    def sobrepor_fator(self, results: ResultSet, fator: float, correcao_ate: str) -> ResultSet:
+        """
+        Regra monetária da atualização (único lugar): colunas C, D e E
+        multiplicadas pelo fator em todas as linhas e totais, títulos com o
+        sufixo " - ATUALIZADO ATÉ <data>".
+        """
+        return results.com_fator(
+            (self.COLUNA_JUROS, self.COLUNA_ATUALIZADO, self.COLUNA_HONORARIOS),
+            fator,
+            f" - ATUALIZADO ATÉ {correcao_ate}"
+        )
+    
+    def atualizar_result_set(self, results: ResultSet, correcao_ate: str) -> ResultSet:
+        """
+        Atualiza um ResultSet até a data de correção (sobreposição copy-on-write
+        da matriz de valores).
+        
+        Returns:
+            Novo ResultSet (ou o próprio results, se não há o que atualizar)
+        """
+        fator = self.fator_atualizacao(correcao_ate)
+        if fator is None:
+            return results
+        return self.sobrepor_fator(results, fator, correcao_ate)
+    
+    def atualizar_resultados(self, results: List[Dict[str, Any]], correcao_ate: str) -> List[Dict[str, Any]]:
+        """
+        Atualiza os resultados aplicando SELIC mensal desde 01/01/2025 até a data especificada.
         
-        # Criar cópia profunda dos resultados
-        results_atualizados = []
+        Mesmo caminho de atualizar_result_set (via ResultSet), para chamadores
+        com tabelas no formato JSON.
         
-        for table in results:
-            table_copy = {
-                "titulo": f"{table['titulo']} - ATUALIZADO ATÉ {correcao_ate}",
-                "header": table["header"].copy(),
-                "rows": []
-            }
-            
-            # Atualizar cada linha
-            for row in table["rows"]:
-                row_copy = row.copy()
-                
-                # Atualizar Coluna C (Juros)
-                if len(row_copy) > self.COLUNA_JUROS and isinstance(row_copy[self.COLUNA_JUROS], (int, float)):
-                    valor_base = row_copy[self.COLUNA_JUROS]
-                    row_copy[self.COLUNA_JUROS] = self._aplicar_selic_composta(valor_base, meses_selic)
-                
-                # Atualizar Coluna D (Valor Atualizado)
-                if len(row_copy) > self.COLUNA_ATUALIZADO and isinstance(row_copy[self.COLUNA_ATUALIZADO], (int, float)):
-                    valor_base = row_copy[self.COLUNA_ATUALIZADO]
-                    row_copy[self.COLUNA_ATUALIZADO] = self._aplicar_selic_composta(valor_base, meses_selic)
-                
-                # Atualizar Coluna E (Honorários)
-                if len(row_copy) > self.COLUNA_HONORARIOS and isinstance(row_copy[self.COLUNA_HONORARIOS], (int, float)):
-                    valor_base = row_copy[self.COLUNA_HONORARIOS]
-                    row_copy[self.COLUNA_HONORARIOS] = self._aplicar_selic_composta(valor_base, meses_selic)
-                
-                table_copy["rows"].append(row_copy)
-            
-            # Atualizar linha de total (se existir)
-            if "total" in table and table["total"]:
-                total_copy = table["total"].copy()
-                
-                # Atualizar Coluna C (Juros)
-                if len(total_copy) > self.COLUNA_JUROS and isinstance(total_copy[self.COLUNA_JUROS], (int, float)):
-                    valor_base = total_copy[self.COLUNA_JUROS]
-                    total_copy[self.COLUNA_JUROS] = self._aplicar_selic_composta(valor_base, meses_selic)
-                
-                # Atualizar Coluna D (Valor Atualizado)
-                if len(total_copy) > self.COLUNA_ATUALIZADO and isinstance(total_copy[self.COLUNA_ATUALIZADO], (int, float)):
-                    valor_base = total_copy[self.COLUNA_ATUALIZADO]
-                    total_copy[self.COLUNA_ATUALIZADO] = self._aplicar_selic_composta(valor_base, meses_selic)
-                
-                # Atualizar Coluna E (Honorários)
-                if len(total_copy) > self.COLUNA_HONORARIOS and isinstance(total_copy[self.COLUNA_HONORARIOS], (int, float)):
-                    valor_base = total_copy[self.COLUNA_HONORARIOS]
-                    total_copy[self.COLUNA_HONORARIOS] = self._aplicar_selic_composta(valor_base, meses_selic)
-                
-                table_copy["total"] = total_copy
-            
-            results_atualizados.append(table_copy)
+        Args:
+            results: Lista de tabelas com resultados base (01/01/2025)
+            correcao_ate: Data de correção no formato DD/MM/YYYY
         
-        return results_atualizados
+        Returns:
+            Nova lista de tabelas com valores atualizados
+        """
+        fator = self.fator_atualizacao(correcao_ate)
+        if fator is None:
+            return results
+        return self.sobrepor_fator(ResultSet.de_tabelas(results), fator, correcao_ate).para_tabelas()
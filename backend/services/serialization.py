@@ -0,0 +1,44 @@
+"""
+Serialização JSON compartilhada entre a resposta HTTP e o Storage.
+
+DECISÕES TÉCNICAS:
+- orjson quando instalado (várias vezes mais rápido e já produz bytes UTF-8)
+- Fallback para o json da stdlib com saída equivalente (UTF-8, sem espaços)
+- Resultados serializados UMA vez: os mesmos bytes vão para o SQLite e,
+  com `juntar_campos`, para o corpo da resposta
+"""
+
+import json
+from typing import Any, Dict, Union
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """Serializa para JSON (bytes UTF-8)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Desserializa JSON a partir de bytes ou str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def juntar_campos(campos: Dict[str, Any], objeto_json: bytes) -> bytes:
+    """
+    Insere campos no início de um objeto JSON já serializado, sem decodificá-lo.
+
+    Exemplo: juntar_campos({"id": "x"}, b'{"a":1}') → b'{"id":"x","a":1}'
+    """
+    prefixo = b",".join(dumps(chave) + b":" + dumps(valor) for chave, valor in campos.items())
+    corpo = objeto_json.strip()[1:]
+    if corpo.lstrip().startswith(b"}"):
+        return b"{" + prefixo + b"}"
+    return b"{" + prefixo + b"," + corpo
@@ -0,0 +1,83 @@
+"""
+Coalescência de cálculos idênticos em andamento ("single-flight").
+
+Quando várias requisições com o mesmo CalculateInput chegam ao mesmo tempo
+(duplo clique, retentativas do formulário, vários usuários no mesmo caso),
+apenas a primeira (líder) abre o Excel. As demais (seguidoras) aguardam o
+resultado da líder e o reutilizam.
+
+DECISÕES TÉCNICAS:
+- Chave = SHA-256 do JSON canônico da entrada (chaves ordenadas)
+- Apenas cálculos EM ANDAMENTO são compartilhados; não é um cache de resultados
+- Erros da líder são repassados às seguidoras
+- threading.Event, pois os endpoints síncronos rodam no threadpool do FastAPI
+"""
+
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .metrics import Metrics
+
+
+class _Chamada:
+    """Cálculo em andamento compartilhado entre líder e seguidoras."""
+    
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado: Any = None
+        self.erro: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Garante no máximo uma execução simultânea por chave.
+    """
+    
+    def __init__(self, metrics: Optional[Metrics] = None):
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._em_andamento: Dict[str, _Chamada] = {}
+    
+    @staticmethod
+    def chave(payload: Dict[str, Any]) -> str:
+        """Gera a chave normalizada de uma entrada."""
+        canonico = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+    
+    def executar(self, chave: str, funcao: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Executa `funcao` ou aguarda a execução idêntica já em andamento.
+        
+        Returns:
+            (resultado, True se esta chamada foi a líder)
+        """
+        with self._lock:
+            chamada = self._em_andamento.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = _Chamada()
+                self._em_andamento[chave] = chamada
+        
+        if not lider:
+            if self.metrics:
+                self.metrics.incr("single_flight_coalescidos")
+            chamada.evento.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.resultado, False
+        
+        if self.metrics:
+            self.metrics.incr("single_flight_lideres")
+        
+        try:
+            chamada.resultado = funcao()
+            return chamada.resultado, True
+        except BaseException as e:
+            chamada.erro = e
+            raise
+        finally:
+            with self._lock:
+                self._em_andamento.pop(chave, None)
+            chamada.evento.set()
@@ -5,90 +5,618 @@ Armazena input, output e metadados de cada cálculo realizado.
 DECISÕES TÉCNICAS:
 - SQLite para simplicidade (sem necessidade de servidor externo)
 - Tabela 'results' com id, created_at, input_data, output_data
-- JSON serializado para flexibilidade nos dados
+- JSON serializado para flexibilidade nos dados (via services.serialization)
+- Coluna content_hash (SHA-256 do JSON salvo) para ETag sem ler o conteúdo
+- Coluna workbook_version: versão (hash) da planilha que produziu o resultado;
+  incluída no JSON do resultado apenas quando conhecida (resultados antigos
+  mantêm o mesmo JSON e o mesmo ETag)
+- Tabela 'idempotency_keys' liga uma Idempotency-Key ao resultado gerado (com TTL)
+- Tabela 'result_cache' liga a chave (versão da planilha + hash da entrada) a
+  um resultado pré-calculado (com validade); 'result_cache_consultas' conta
+  acertos/falhas por dia para o relatório de taxa de acerto (consulta só lê;
+  as contagens chegam em lote por registrar_consultas_cache)
+- Tabela de fatos 'result_values' (resultado, título, linha, coluna, valor REAL)
+  com os números das tabelas do output, gravada junto com o resultado: as
+  consultas de carteira (GET /analytics/...) agrupam e somam em SQL sem
+  decodificar output_data. Títulos internados em 'result_titles' e resultados
+  numerados em 'result_keys' (chave inteira crescente: inserções em ordem);
+  a linha de total usa linha = -1; results_atualizados entram com
+  atualizado = 1 sob o título da tabela base. Coluna 'municipio' em results
+  para agrupar/filtrar. Bancos antigos são preenchidos uma vez na migração
+  (PRAGMA user_version). O cache título → id só recebe os títulos de uma
+  transação depois do commit (rollback não deixa IDs órfãos no cache)
+- Busca textual (FTS5, tabela 'results_fts' com rowid = result_keys.n) sobre
+  município, datas da entrada/criação e nomes curtos das tabelas, mantida
+  pelo Storage na gravação e na exclusão; ranking bm25 com peso maior para o
+  município. Sem FTS5 no SQLite, a busca fica indisponível (buscar_resultados
+  levanta RuntimeError) e o resto do Storage funciona normalmente
+- journal_mode=WAL: leituras longas (exportação com cursor) não bloqueiam as
+  gravações dos cálculos
+- Coluna 'origem_id': resultado derivado de outro sem passar pelo Excel (ex.:
+  recorreção SELIC em lote, services/recorrecao.py); entra no JSON do
+  resultado apenas quando presente, como workbook_version
+- Arquivamento (arquivar_antigos): o output_data de resultados antigos sai do
+  banco principal para partições mensais comprimidas (zlib) em
+  <arquivo_dir>/results-AAAA-MM.db; a linha em results fica (coluna
+  'arquivo' = partição, output_data vazio), assim como content_hash,
+  result_values e a busca: listagem, ETag, analytics e busca não mudam, e
+  get_result/get_result_raw/iterar_resultados leem a partição. A partição é
+  gravada antes de esvaziar a linha: uma interrupção no meio só repete o
+  trabalho na próxima execução
+- auto_vacuum=INCREMENTAL: páginas liberadas (exclusões, arquivamento) voltam
+  ao sistema aos poucos por vacuum_incremental(); bancos antigos são
+  convertidos por um VACUUM completo na primeira manutenção, não no startup
+- Esquema criado/migrado no construtor ou, com inicializar=False, na primeira
+  conexão (a API o verifica no aquecimento, fora do import)
 """
 
+import re
 import sqlite3
-import json
+import threading
+import unicodedata
+import zlib
 from pathlib import Path
-from datetime import datetime
-from typing import Dict, Any, Optional
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, Optional, List, Sequence, Tuple, Union
 import uuid
 
+from .serialization import dumps, loads
+from .http_cache import gerar_etag, hash_conteudo
+
+
+# Versão do esquema (PRAGMA user_version); 1 = result_values preenchida,
+# 2 = results_fts preenchida
+VERSAO_ESQUEMA = 2
+
+# Linha de total das tabelas em result_values
+LINHA_TOTAL = -1
+
+SUFIXO_ATUALIZADO = " - ATUALIZADO ATÉ "
+
+# Resultados por transação no preenchimento de result_values em bancos antigos
+LOTE_MIGRACAO = 500
+
+# IDs por consulta em iterar_resultados(ids=...) (limite de parâmetros do SQLite)
+LOTE_IDS = 500
+
+# Resultados por transação no arquivamento e nível de compressão das partições
+LOTE_ARQUIVO = 500
+NIVEL_COMPRESSAO = 6
+
+# Acima disso, a busca ordena pelos mais recentes em vez de pontuar (bm25) todos os acertos
+LIMIAR_RANKING_BUSCA = 5000
+
+# Agrupamentos aceitos por agregar_valores() → expressão SQL
+AGRUPAMENTOS = {
+    "municipio": "r.municipio",
+    "mes": "substr(r.created_at, 1, 7)",
+    "dia": "substr(r.created_at, 1, 10)",
+    "titulo": "t.titulo",
+    "workbook_version": "r.workbook_version",
+    "nenhum": "NULL",
+}
+
+
+def _como_texto(dado: Any) -> str:
+    """Converte um dado (dict, ou JSON já serializado em bytes/str) para texto JSON."""
+    if isinstance(dado, bytes):
+        return dado.decode("utf-8")
+    if isinstance(dado, str):
+        return dado
+    return dumps(dado).decode("utf-8")
+
+
+def montar_json_resultado(
+    result_id: str,
+    created_at: str,
+    input_json: str,
+    output_json: str,
+    workbook_version: Optional[str] = None,
+    origem_id: Optional[str] = None
+) -> bytes:
+    """
+    Monta o JSON de um resultado salvo ({"id", "created_at", ["workbook_version"],
+    ["origem_id"], "input_data", "output_data"}) a partir dos textos JSON já
+    serializados, sem decodificá-los.
+    """
+    versao = b',"workbook_version":' + dumps(workbook_version) if workbook_version else b''
+    origem = b',"origem_id":' + dumps(origem_id) if origem_id else b''
+    return (
+        b'{"id":' + dumps(result_id)
+        + b',"created_at":' + dumps(created_at)
+        + versao
+        + origem
+        + b',"input_data":' + input_json.encode("utf-8")
+        + b',"output_data":' + output_json.encode("utf-8")
+        + b'}'
+    )
+
+
+def extrair_valores(output_data: Dict[str, Any]) -> List[Tuple[str, List[str], int, int, int, float]]:
+    """
+    Achata as tabelas de um output em fatos numéricos.
+    
+    Returns:
+        Lista de (título, header, atualizado, linha, coluna, valor); rótulos
+        (coluna 0) e células vazias/não numéricas ficam de fora
+    """
+    fatos = []
+    
+    for atualizado, chave in ((0, "results_base"), (1, "results_atualizados")):
+        for tabela in output_data.get(chave) or []:
+            titulo = tabela["titulo"]
+            if atualizado and SUFIXO_ATUALIZADO in titulo:
+                titulo = titulo.rsplit(SUFIXO_ATUALIZADO, 1)[0]
+            
+            linhas = list(enumerate(tabela.get("rows") or []))
+            if tabela.get("total"):
+                linhas.append((LINHA_TOTAL, tabela["total"]))
+            
+            for linha, valores in linhas:
+                for coluna, valor in enumerate(valores[1:], start=1):
+                    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                        fatos.append((titulo, tabela["header"], atualizado, linha, coluna, float(valor)))
+    
+    return fatos
+
+
+def textos_busca(created_at: str, input_data: Dict[str, Any], output_data: Dict[str, Any]) -> Tuple[str, str, str]:
+    """
+    Textos indexados na busca de um resultado: (município, datas, tabelas).
+    
+    Datas: as da entrada mais a de criação (dd/mm/aaaa). Tabelas: nome curto
+    de cada título ("NT36 IPCA-E", ...), sem a descrição entre parênteses.
+    """
+    datas = [
+        input_data.get(campo) or ""
+        for campo in ("ajuizamento", "citação", "início_cálculo", "final_cálculo", "correção_até")
+    ]
+    try:
+        datas.append(datetime.fromisoformat(created_at).strftime("%d/%m/%Y"))
+    except ValueError:
+        pass
+    
+    tabelas = dict.fromkeys(
+        tabela["titulo"].split(" (")[0] for tabela in output_data.get("results_base") or []
+    )
+    return input_data.get("município") or "", " ".join(datas), " | ".join(tabelas)
+
+
+def _sem_acentos(texto: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", texto.lower()) if not unicodedata.combining(c))
+
+
+def _termos_busca(texto: str) -> List[List[str]]:
+    """Termos do texto digitado, cada um como a lista de palavras dele."""
+    return [tokens for tokens in (re.findall(r"\w+", termo) for termo in texto.split()) if tokens]
+
+
+def montar_consulta_fts(texto: str) -> str:
+    """
+    Converte o texto digitado em uma consulta FTS5 segura.
+    
+    Cada termo vira um prefixo ("fort" → fortaleza; com 1 caractere, termo
+    exato); termos com separadores (datas como 03/2010) viram frase ("03 2010").
+    Todos os termos são exigidos.
+    
+    Raises:
+        ValueError: texto sem nenhum termo pesquisável
+    """
+    termos = []
+    for tokens in _termos_busca(texto):
+        if len(tokens) > 1:
+            termos.append(f'"{" ".join(tokens)}"')
+        elif len(tokens[0]) > 1:
+            termos.append(f'"{tokens[0]}"*')
+        else:
+            termos.append(f'"{tokens[0]}"')
+    
+    if not termos:
+        raise ValueError("Consulta de busca vazia")
+    return " ".join(termos)
+
+
+def destacar_trecho(texto: str, textos: Tuple[str, str, str]) -> str:
+    """
+    Trecho para exibição: partes indexadas que contêm algum termo, com as
+    palavras encontradas entre colchetes (sem acentos/maiúsculas na comparação).
+    
+    Feito em Python: o snippet() do FTS5 relê a lista completa de ocorrências
+    do termo a cada linha, caro para termos presentes em todo o histórico.
+    """
+    prefixos = tuple(_sem_acentos(token) for tokens in _termos_busca(texto) for token in tokens)
+    
+    def marcar(parte: str) -> Tuple[str, bool]:
+        achou = False
+        
+        def trocar(m):
+            nonlocal achou
+            if _sem_acentos(m.group(0)).startswith(prefixos):
+                achou = True
+                return f"[{m.group(0)}]"
+            return m.group(0)
+        
+        return re.sub(r"\w+", trocar, parte), achou
+    
+    municipio, datas, tabelas = textos
+    partes = [municipio, datas] + tabelas.split(" | ")
+    marcadas = [marcada for marcada, achou in map(marcar, partes) if achou]
+    return " · ".join(marcadas) or municipio
+
 
 class Storage:
     """
     Gerencia a persistência dos cálculos no banco SQLite.
     """
     
-    def __init__(self, db_path: str = "./data/results.db"):
+    def __init__(
+        self,
+        db_path: str = "./data/results.db",
+        inicializar: bool = True,
+        arquivo_dir: Optional[str] = None
+    ):
+        """
+        Args:
+            db_path: Caminho do banco SQLite
+            inicializar: False adia a criação/migração do esquema para a primeira conexão
+            arquivo_dir: Diretório das partições de arquivo (padrão: <pasta do banco>/archive)
+        """
         self.db_path = Path(db_path)
-        self._init_db()
+        self.arquivo_dir = Path(arquivo_dir) if arquivo_dir else self.db_path.parent / "archive"
+        self._esquema_ok = False
+        self._lock_esquema = threading.Lock()
+        self._titulos: Dict[str, int] = {}  # título → id em result_titles
+        self._busca_fts = True  # False se o SQLite não tiver FTS5
+        if inicializar:
+            self.verificar_esquema()
+    
+    def verificar_esquema(self) -> None:
+        """Cria/migra as tabelas uma única vez por instância."""
+        if self._esquema_ok:
+            return
+        with self._lock_esquema:
+            if not self._esquema_ok:
+                self._init_db()
+                self._esquema_ok = True
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Abre uma conexão, garantindo antes o esquema do banco."""
+        self.verificar_esquema()
+        return sqlite3.connect(str(self.db_path))
     
     def _init_db(self) -> None:
-        """Cria a tabela 'results' se não existir."""
+        """Cria/migra as tabelas do banco (results, result_values, idempotency_keys, result_cache)."""
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         
         conn = sqlite3.connect(str(self.db_path))
         cursor = conn.cursor()
+        # Só vale em banco novo (antes da primeira tabela); os antigos são
+        # convertidos por vacuum_incremental()
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        cursor.execute("PRAGMA journal_mode = WAL")
         
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS results (
                 id TEXT PRIMARY KEY,
                 created_at TEXT NOT NULL,
                 input_data TEXT NOT NULL,
-                output_data TEXT NOT NULL
+                output_data TEXT NOT NULL,
+                content_hash TEXT,
+                workbook_version TEXT,
+                municipio TEXT,
+                arquivo TEXT,
+                origem_id TEXT
+            )
+        """)
+        
+        # Migração: bancos criados antes das colunas content_hash / workbook_version / municipio / arquivo / origem_id
+        colunas = {row[1] for row in cursor.execute("PRAGMA table_info(results)")}
+        if "content_hash" not in colunas:
+            cursor.execute("ALTER TABLE results ADD COLUMN content_hash TEXT")
+        if "workbook_version" not in colunas:
+            cursor.execute("ALTER TABLE results ADD COLUMN workbook_version TEXT")
+        if "municipio" not in colunas:
+            cursor.execute("ALTER TABLE results ADD COLUMN municipio TEXT")
+        if "arquivo" not in colunas:
+            cursor.execute("ALTER TABLE results ADD COLUMN arquivo TEXT")
+        if "origem_id" not in colunas:
+            cursor.execute("ALTER TABLE results ADD COLUMN origem_id TEXT")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_results_origem ON results (origem_id) WHERE origem_id IS NOT NULL")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_results_created_at ON results (created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_results_municipio ON results (municipio, created_at)")
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS result_titles (
+                id INTEGER PRIMARY KEY,
+                titulo TEXT NOT NULL UNIQUE,
+                header TEXT NOT NULL
+            )
+        """)
+        # Chave inteira crescente por resultado: inserções em ordem nos índices de
+        # result_values (o UUID aleatório espalharia as escritas pela árvore)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS result_keys (
+                n INTEGER PRIMARY KEY,
+                result_id TEXT NOT NULL UNIQUE
+            )
+        """)
+        # Agrupada pela chave das agregações (título, coluna, linha, série → resultados)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS result_values (
+                result_n INTEGER NOT NULL,
+                titulo_id INTEGER NOT NULL,
+                atualizado INTEGER NOT NULL,
+                linha INTEGER NOT NULL,
+                coluna INTEGER NOT NULL,
+                valor REAL NOT NULL,
+                PRIMARY KEY (titulo_id, coluna, linha, atualizado, result_n)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_result_values_result ON result_values (result_n)")
+        
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS results_fts USING fts5(
+                    municipio, datas, tabelas,
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '2 3'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ Busca textual indisponível (SQLite sem FTS5): {str(e)}")
+            self._busca_fts = False
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS idempotency_keys (
+                key TEXT PRIMARY KEY,
+                request_hash TEXT NOT NULL,
+                result_id TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                expires_at TEXT NOT NULL
+            )
+        """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys (expires_at)"
+        )
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS result_cache (
+                chave TEXT PRIMARY KEY,
+                result_id TEXT NOT NULL,
+                workbook_version TEXT,
+                created_at TEXT NOT NULL,
+                expires_at TEXT NOT NULL,
+                acertos INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS result_cache_consultas (
+                dia TEXT PRIMARY KEY,
+                acertos INTEGER NOT NULL DEFAULT 0,
+                falhas INTEGER NOT NULL DEFAULT 0
             )
         """)
         
         conn.commit()
+        
+        versao = cursor.execute("PRAGMA user_version").fetchone()[0]
+        # Sem FTS5 o esquema fica na versão 1: a busca é preenchida quando houver suporte
+        alvo = VERSAO_ESQUEMA if self._busca_fts else 1
+        if versao < alvo:
+            self._reindexar(conn, versao)
+            cursor.execute(f"PRAGMA user_version = {alvo}")
+            conn.commit()
+        
         conn.close()
     
-    def save_result(self, input_data: Dict[str, Any], output_data: Dict[str, Any]) -> str:
+    def _reindexar(self, conn: sqlite3.Connection, versao: int) -> None:
+        """
+        Migração: preenche os índices dos resultados já salvos - municipio,
+        result_values e busca (versão 0) ou apenas a busca (versão 1).
+        """
+        cursor = conn.cursor()
+        total = cursor.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if not total:
+            return
+        
+        print(f"🗂️ Indexando {total} resultados salvos (esquema {versao} → {VERSAO_ESQUEMA})...")
+        ultimo_id = ""
+        processados = 0
+        while True:
+            novos_titulos: Dict[str, int] = {}
+            rows = cursor.execute(
+                "SELECT r.id, r.created_at, r.input_data, r.output_data, k.n, r.arquivo FROM results r "
+                "LEFT JOIN result_keys k ON k.result_id = r.id "
+                "WHERE r.id > ? ORDER BY r.id LIMIT ?",
+                (ultimo_id, LOTE_MIGRACAO)
+            ).fetchall()
+            if not rows:
+                break
+            
+            for result_id, created_at, input_json, output_json, result_n, arquivo in rows:
+                input_data = loads(input_json)
+                output_data = loads(self._ler_arquivado(arquivo, result_id) if arquivo else output_json)
+                if versao < 1 or result_n is None:
+                    cursor.execute(
+                        "UPDATE results SET municipio = ? WHERE id = ?",
+                        (input_data.get("município"), result_id)
+                    )
+                    self._remover_indices(cursor, result_id)
+                    self._indexar(cursor, result_id, created_at, input_data, output_data, novos_titulos)
+                else:
+                    self._indexar_busca(cursor, result_n, created_at, input_data, output_data)
+            
+            conn.commit()
+            self._titulos.update(novos_titulos)
+            ultimo_id = rows[-1][0]
+            processados += len(rows)
+            print(f"   {processados}/{total}")
+    
+    def _id_titulo(
+        self,
+        cursor: sqlite3.Cursor,
+        titulo: str,
+        header: List[str],
+        novos: Dict[str, int]
+    ) -> int:
+        """
+        ID do título em result_titles (criado na primeira ocorrência).
+        
+        Títulos lidos/criados na transação vão para `novos`: o chamador só os
+        passa ao cache (self._titulos) depois do commit, senão um rollback
+        deixaria no cache IDs que não existem no banco.
+        """
+        titulo_id = self._titulos.get(titulo) or novos.get(titulo)
+        if titulo_id is None:
+            cursor.execute(
+                "INSERT OR IGNORE INTO result_titles (titulo, header) VALUES (?, ?)",
+                (titulo, dumps(header).decode("utf-8"))
+            )
+            titulo_id = cursor.execute("SELECT id FROM result_titles WHERE titulo = ?", (titulo,)).fetchone()[0]
+            novos[titulo] = titulo_id
+        return titulo_id
+    
+    def _indexar(
+        self,
+        cursor: sqlite3.Cursor,
+        result_id: str,
+        created_at: str,
+        input_data: Dict[str, Any],
+        output_data: Dict[str, Any],
+        novos_titulos: Dict[str, int]
+    ) -> None:
+        """Grava os índices de um resultado: chave, result_values e busca."""
+        cursor.execute("INSERT INTO result_keys (result_id) VALUES (?)", (result_id,))
+        result_n = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO result_values (result_n, titulo_id, atualizado, linha, coluna, valor) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (result_n, self._id_titulo(cursor, titulo, header, novos_titulos), atualizado, linha, coluna, valor)
+                for titulo, header, atualizado, linha, coluna, valor in extrair_valores(output_data)
+            ]
+        )
+        self._indexar_busca(cursor, result_n, created_at, input_data, output_data)
+    
+    def _indexar_busca(
+        self,
+        cursor: sqlite3.Cursor,
+        result_n: int,
+        created_at: str,
+        input_data: Dict[str, Any],
+        output_data: Dict[str, Any]
+    ) -> None:
+        if self._busca_fts:
+            cursor.execute(
+                "INSERT INTO results_fts (rowid, municipio, datas, tabelas) VALUES (?, ?, ?, ?)",
+                (result_n,) + textos_busca(created_at, input_data, output_data)
+            )
+    
+    def _remover_indices(self, cursor: sqlite3.Cursor, result_id: str) -> None:
+        row = cursor.execute("SELECT n FROM result_keys WHERE result_id = ?", (result_id,)).fetchone()
+        if row:
+            cursor.execute("DELETE FROM result_values WHERE result_n = ?", (row[0],))
+            if self._busca_fts:
+                cursor.execute("DELETE FROM results_fts WHERE rowid = ?", (row[0],))
+            cursor.execute("DELETE FROM result_keys WHERE n = ?", (row[0],))
+    
+    def save_result(
+        self,
+        input_data: Dict[str, Any],
+        output_data: Union[Dict[str, Any], bytes],
+        result_id: Optional[str] = None,
+        created_at: Optional[str] = None,
+        workbook_version: Optional[str] = None
+    ) -> str:
         """
         Salva um resultado de cálculo no banco.
         
         Args:
             input_data: Dados de entrada (conforme schema_input.json)
-            output_data: Dados de saída (conforme schema_output.json)
+            output_data: Dados de saída (conforme schema_output.json), como dict
+                ou já serializados em JSON (bytes)
+            result_id: ID já gerado pelo chamador (opcional; gera UUID se ausente)
+            created_at: Timestamp já gerado pelo chamador (opcional)
+            workbook_version: Versão da planilha que produziu o resultado
         
         Returns:
             ID único do registro
         """
-        result_id = str(uuid.uuid4())
+        result_id = result_id or str(uuid.uuid4())
         # Usar horário local do sistema ao invés de UTC
-        created_at = datetime.now().isoformat()
+        created_at = created_at or datetime.now().isoformat()
         
-        conn = sqlite3.connect(str(self.db_path))
-        cursor = conn.cursor()
+        self.save_results_batch([(result_id, created_at, input_data, output_data, workbook_version)])
         
-        cursor.execute(
-            "INSERT INTO results (id, created_at, input_data, output_data) VALUES (?, ?, ?, ?)",
-            (
+        return result_id
+    
+    def save_results_batch(
+        self,
+        rows: List[Tuple[str, str, Dict[str, Any], Any, Optional[str]]],
+        origens: Optional[Dict[str, str]] = None
+    ) -> None:
+        """
+        Salva vários resultados em uma única transação.
+        
+        Args:
+            rows: Lista de tuplas (id, created_at, input_data, output_data, workbook_version)
+            origens: ID do resultado → ID do resultado de origem (resultados derivados)
+        """
+        origens = origens or {}
+        valores = []
+        indices = []
+        for result_id, created_at, input_data, output_data, workbook_version in rows:
+            input_json = _como_texto(input_data)
+            output_json = _como_texto(output_data)
+            origem_id = origens.get(result_id)
+            content_hash = hash_conteudo(
+                montar_json_resultado(result_id, created_at, input_json, output_json, workbook_version, origem_id)
+            )
+            entrada = input_data if isinstance(input_data, dict) else loads(input_json)
+            valores.append((
+                result_id, created_at, input_json, output_json, content_hash, workbook_version,
+                entrada.get("município"), origem_id
+            ))
+            indices.append((
                 result_id,
                 created_at,
-                json.dumps(input_data, ensure_ascii=False),
-                json.dumps(output_data, ensure_ascii=False)
-            )
-        )
+                entrada,
+                output_data if isinstance(output_data, dict) else loads(output_json)
+            ))
         
-        conn.commit()
-        conn.close()
+        novos_titulos: Dict[str, int] = {}
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany(
+                "INSERT INTO results (id, created_at, input_data, output_data, content_hash, workbook_version, municipio, origem_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                valores
+            )
+            for indice in indices:
+                self._indexar(cursor, *indice, novos_titulos)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
         
-        return result_id
+        # Só depois do commit: títulos de uma transação desfeita não existem no banco
+        self._titulos.update(novos_titulos)
     
     def get_result(self, result_id: str) -> Optional[Dict[str, Any]]:
         """
         Recupera um resultado pelo ID.
         
         Returns:
-            Dicionário com id, created_at, input_data, output_data ou None
+            Dicionário com id, created_at, workbook_version, origem_id, input_data, output_data ou None
         """
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute(
-            "SELECT id, created_at, input_data, output_data FROM results WHERE id = ?",
+            "SELECT id, created_at, input_data, output_data, workbook_version, arquivo, origem_id FROM results WHERE id = ?",
             (result_id,)
         )
         
@@ -99,12 +627,140 @@ class Storage:
             return {
                 "id": row[0],
                 "created_at": row[1],
-                "input_data": json.loads(row[2]),
-                "output_data": json.loads(row[3])
+                "workbook_version": row[4],
+                "origem_id": row[6],
+                "input_data": loads(row[2]),
+                "output_data": loads(self._ler_arquivado(row[5], row[0]) if row[5] else row[3])
             }
         
         return None
     
+    def get_result_raw(self, result_id: str) -> Optional[bytes]:
+        """
+        Recupera um resultado já como JSON (bytes), sem decodificar/recodificar
+        input_data e output_data.
+        
+        Returns:
+            Bytes de {"id", "created_at", "input_data", "output_data"} ou None
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            "SELECT id, created_at, input_data, output_data, workbook_version, arquivo, origem_id FROM results WHERE id = ?",
+            (result_id,)
+        )
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        if not row:
+            return None
+        
+        output_json = self._ler_arquivado(row[5], row[0]) if row[5] else row[3]
+        return montar_json_resultado(row[0], row[1], row[2], output_json, row[4], row[6])
+    
+    def get_result_etag(self, result_id: str) -> Optional[str]:
+        """
+        Retorna o ETag de um resultado sem ler o conteúdo (via content_hash).
+        Registros antigos sem hash são calculados e atualizados na primeira consulta.
+        
+        Returns:
+            ETag (entre aspas) ou None se o resultado não existir
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT content_hash FROM results WHERE id = ?", (result_id,))
+        row = cursor.fetchone()
+        
+        if not row:
+            conn.close()
+            return None
+        
+        content_hash = row[0]
+        if content_hash is None:
+            raw = self.get_result_raw(result_id)
+            content_hash = hash_conteudo(raw)
+            cursor.execute("UPDATE results SET content_hash = ? WHERE id = ?", (content_hash, result_id))
+            conn.commit()
+        
+        conn.close()
+        return gerar_etag(result_id, content_hash)
+    
+    def iterar_resultados(
+        self,
+        desde: Optional[str] = None,
+        ate: Optional[str] = None,
+        municipio: Optional[str] = None,
+        lote: int = 200,
+        ids: Optional[Sequence[str]] = None
+    ) -> Iterator[Tuple[str, str, Optional[str], Dict[str, Any], Dict[str, Any]]]:
+        """
+        Percorre os resultados salvos (mais antigos primeiro) com um cursor no
+        servidor, decodificando um por vez: memória constante para qualquer
+        tamanho de histórico.
+        
+        Args:
+            desde, ate: datas YYYY-MM-DD (inclusivas) sobre created_at
+            municipio: filtrar um município
+            lote: linhas buscadas por vez no cursor
+            ids: apenas estes resultados (consultados em blocos de LOTE_IDS;
+                a ordem por created_at vale dentro de cada bloco)
+        
+        Yields:
+            (id, created_at, workbook_version, input_data, output_data)
+        """
+        condicoes = []
+        parametros: List[Any] = []
+        if desde:
+            condicoes.append("created_at >= ?")
+            parametros.append(desde)
+        if ate:
+            condicoes.append("created_at < date(?, '+1 day')")
+            parametros.append(ate)
+        if municipio:
+            condicoes.append("municipio = ?")
+            parametros.append(municipio)
+        
+        consultas = [(condicoes, parametros)]
+        if ids is not None:
+            ids = list(dict.fromkeys(ids))
+            consultas = [
+                (condicoes + [f"id IN ({', '.join('?' * len(bloco))})"], parametros + bloco)
+                for bloco in (ids[i:i + LOTE_IDS] for i in range(0, len(ids), LOTE_IDS))
+            ]
+        
+        self.verificar_esquema()
+        # O gerador pode ser consumido por threads diferentes (respostas em
+        # streaming), mas sempre uma de cada vez
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        particoes: Dict[str, sqlite3.Connection] = {}
+        try:
+            for condicoes_consulta, parametros_consulta in consultas:
+                where = f"WHERE {' AND '.join(condicoes_consulta)}" if condicoes_consulta else ""
+                cursor = conn.execute(
+                    "SELECT id, created_at, workbook_version, input_data, output_data, arquivo FROM results "
+                    f"{where} ORDER BY created_at, id",
+                    parametros_consulta
+                )
+                while True:
+                    rows = cursor.fetchmany(lote)
+                    if not rows:
+                        break
+                    for row in rows:
+                        output_json = row[4]
+                        if row[5]:
+                            # Em ordem de created_at: as partições (mensais) são lidas em sequência
+                            if row[5] not in particoes:
+                                particoes[row[5]] = self._abrir_particao(row[5], check_same_thread=False)
+                            output_json = self._ler_arquivado(row[5], row[0], particoes[row[5]])
+                        yield row[0], row[1], row[2], loads(row[3]), loads(output_json)
+        finally:
+            conn.close()
+            for particao in particoes.values():
+                particao.close()
+    
     def list_results(self, limit: int = 100) -> list:
         """
         Lista os últimos resultados salvos.
@@ -113,13 +769,14 @@ class Storage:
             limit: Número máximo de resultados a retornar
         
         Returns:
-            Lista de dicionários com id, created_at, input_data (resumido)
+            Lista de dicionários com id, created_at, input_data (resumido), workbook_version e origem_id
         """
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute(
-            "SELECT id, created_at, input_data FROM results ORDER BY created_at DESC LIMIT ?",
+            "SELECT id, created_at, input_data, workbook_version, origem_id FROM results "
+            "ORDER BY created_at DESC LIMIT ?",
             (limit,)
         )
         
@@ -128,12 +785,14 @@ class Storage:
         
         results = []
         for row in rows:
-            input_data = json.loads(row[2])
+            input_data = loads(row[2])
             results.append({
                 "id": row[0],
                 "created_at": row[1],
                 "município": input_data.get("município", "N/A"),
-                "correção_até": input_data.get("correção_até", "N/A")
+                "correção_até": input_data.get("correção_até", "N/A"),
+                "workbook_version": row[3],
+                "origem_id": row[4]
             })
         
         return results
@@ -148,13 +807,596 @@ class Storage:
         Returns:
             True se deletado com sucesso, False se não encontrado
         """
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self._connect()
         cursor = conn.cursor()
         
+        arquivo = cursor.execute("SELECT arquivo FROM results WHERE id = ?", (result_id,)).fetchone()
         cursor.execute("DELETE FROM results WHERE id = ?", (result_id,))
-        
         deleted = cursor.rowcount > 0
+        self._remover_indices(cursor, result_id)
+        
         conn.commit()
         conn.close()
         
+        if arquivo and arquivo[0]:
+            particao = self._abrir_particao(arquivo[0])
+            particao.execute("DELETE FROM results_arquivo WHERE id = ?", (result_id,))
+            particao.commit()
+            particao.close()
+        
         return deleted
+    
+    def _caminho_particao(self, particao: str) -> Path:
+        return self.arquivo_dir / f"results-{particao}.db"
+    
+    def _abrir_particao(self, particao: str, criar: bool = False, check_same_thread: bool = True) -> sqlite3.Connection:
+        """Conexão com uma partição de arquivo (AAAA-MM); criar=True cria o arquivo e a tabela."""
+        caminho = self._caminho_particao(particao)
+        if not criar:
+            if not caminho.exists():
+                raise RuntimeError(f"Partição de arquivo não encontrada: {caminho}")
+            return sqlite3.connect(str(caminho), check_same_thread=check_same_thread)
+        
+        self.arquivo_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(caminho), check_same_thread=check_same_thread)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS results_arquivo (
+                id TEXT PRIMARY KEY,
+                output_data BLOB NOT NULL
+            )
+        """)
+        return conn
+    
+    def _ler_arquivado(
+        self,
+        particao: str,
+        result_id: str,
+        conn: Optional[sqlite3.Connection] = None
+    ) -> str:
+        """output_data (texto JSON) de um resultado arquivado."""
+        propria = conn is None
+        if propria:
+            conn = self._abrir_particao(particao)
+        try:
+            row = conn.execute("SELECT output_data FROM results_arquivo WHERE id = ?", (result_id,)).fetchone()
+        finally:
+            if propria:
+                conn.close()
+        
+        if not row:
+            raise RuntimeError(f"Resultado {result_id} ausente da partição de arquivo {particao}")
+        return zlib.decompress(row[0]).decode("utf-8")
+    
+    def arquivar_antigos(self, antes_de: str, lote: int = LOTE_ARQUIVO) -> Dict[str, int]:
+        """
+        Move o output_data dos resultados criados antes de uma data para as
+        partições mensais comprimidas (a linha em results e os índices ficam).
+        
+        Args:
+            antes_de: data YYYY-MM-DD (exclusiva) sobre created_at
+            lote: resultados por transação
+        
+        Returns:
+            Resumo: arquivados, bytes_originais, bytes_comprimidos, particoes
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        resumo = {"arquivados": 0, "bytes_originais": 0, "bytes_comprimidos": 0, "particoes": 0}
+        particoes = set()
+        
+        while True:
+            rows = cursor.execute(
+                "SELECT id, created_at, output_data FROM results "
+                "WHERE created_at < ? AND arquivo IS NULL ORDER BY created_at LIMIT ?",
+                (antes_de, lote)
+            ).fetchall()
+            if not rows:
+                break
+            
+            por_particao: Dict[str, List[Tuple[str, bytes]]] = {}
+            for result_id, created_at, output_json in rows:
+                original = output_json.encode("utf-8")
+                comprimido = zlib.compress(original, NIVEL_COMPRESSAO)
+                por_particao.setdefault(created_at[:7], []).append((result_id, comprimido))
+                resumo["bytes_originais"] += len(original)
+                resumo["bytes_comprimidos"] += len(comprimido)
+            
+            for particao, itens in por_particao.items():
+                # Partição primeiro: se parar aqui, a linha ainda tem o output e
+                # a próxima execução regrava (INSERT OR REPLACE)
+                arquivo = self._abrir_particao(particao, criar=True)
+                arquivo.executemany("INSERT OR REPLACE INTO results_arquivo (id, output_data) VALUES (?, ?)", itens)
+                arquivo.commit()
+                arquivo.close()
+                
+                cursor.executemany(
+                    "UPDATE results SET output_data = '', arquivo = ? WHERE id = ? AND arquivo IS NULL",
+                    [(particao, result_id) for result_id, _ in itens]
+                )
+                particoes.add(particao)
+            
+            conn.commit()
+            resumo["arquivados"] += len(rows)
+        
+        conn.close()
+        resumo["particoes"] = len(particoes)
+        return resumo
+    
+    def vacuum_incremental(self, paginas: int = 0) -> Dict[str, Any]:
+        """
+        Devolve ao sistema de arquivos as páginas livres do banco e trunca o WAL.
+        
+        Bancos criados sem auto_vacuum=INCREMENTAL são convertidos aqui por um
+        VACUUM completo (reescreve o arquivo; só na primeira vez).
+        
+        Args:
+            paginas: máximo de páginas liberadas nesta execução (0 = todas)
+        
+        Returns:
+            Resumo: convertido, paginas_liberadas, bytes_antes, bytes_depois
+        """
+        conn = self._connect()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        bytes_antes = conn.execute("PRAGMA page_count").fetchone()[0] * page_size
+        
+        convertido = conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2
+        livres_antes = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if convertido:
+            print("🧹 Convertendo o banco para auto_vacuum=INCREMENTAL (VACUUM completo)...")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        else:
+            # executescript roda o pragma até o fim (execute libera uma página por passo)
+            conn.executescript(f"PRAGMA incremental_vacuum({int(paginas)});")
+        
+        livres_depois = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        bytes_depois = conn.execute("PRAGMA page_count").fetchone()[0] * page_size
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        conn.close()
+        
+        return {
+            "convertido": convertido,
+            "paginas_liberadas": livres_antes - livres_depois,
+            "bytes_antes": bytes_antes,
+            "bytes_depois": bytes_depois,
+        }
+    
+    def estatisticas_banco(self, detalhar: bool = False) -> Dict[str, Any]:
+        """
+        Tamanho e fragmentação do banco principal e das partições de arquivo.
+        
+        Args:
+            detalhar: incluir espaço usado/ocioso por tabela (dbstat; lê o banco inteiro)
+        
+        Returns:
+            Dicionário com páginas, bytes, fragmentação (páginas livres / total),
+            WAL, resultados ativos/arquivados e partições
+        """
+        conn = self._connect()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        total, arquivados = conn.execute(
+            "SELECT COUNT(*), COUNT(arquivo) FROM results"
+        ).fetchone()
+        
+        tabelas = None
+        if detalhar:
+            try:
+                tabelas = [
+                    {
+                        "nome": nome,
+                        "paginas": paginas,
+                        "bytes": tamanho,
+                        "bytes_ociosos": ociosos,
+                        "percentual_ocioso": round(100 * ociosos / tamanho, 1) if tamanho else 0.0,
+                    }
+                    for nome, paginas, tamanho, ociosos in conn.execute(
+                        "SELECT name, COUNT(*), SUM(pgsize), SUM(unused) FROM dbstat "
+                        "GROUP BY name ORDER BY SUM(pgsize) DESC"
+                    )
+                ]
+            except sqlite3.OperationalError:
+                pass  # SQLite compilado sem dbstat
+        conn.close()
+        
+        wal = Path(f"{self.db_path}-wal")
+        particoes = [
+            {"particao": caminho.stem[len("results-"):], "bytes": caminho.stat().st_size}
+            for caminho in sorted(self.arquivo_dir.glob("results-*.db"))
+        ] if self.arquivo_dir.exists() else []
+        
+        estatisticas = {
+            "banco": str(self.db_path),
+            "bytes": page_count * page_size,
+            "page_size": page_size,
+            "paginas": page_count,
+            "paginas_livres": freelist,
+            "fragmentacao": round(freelist / page_count, 4) if page_count else 0.0,
+            "auto_vacuum": {0: "none", 1: "full", 2: "incremental"}.get(auto_vacuum, str(auto_vacuum)),
+            "wal_bytes": wal.stat().st_size if wal.exists() else 0,
+            "resultados": {"total": total, "ativos": total - arquivados, "arquivados": arquivados},
+            "arquivo_dir": str(self.arquivo_dir),
+            "particoes": particoes,
+            "particoes_bytes": sum(p["bytes"] for p in particoes),
+        }
+        if tabelas is not None:
+            estatisticas["tabelas"] = tabelas
+        return estatisticas
+    
+    def get_idempotency_key(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Recupera o registro de uma Idempotency-Key ainda válida.
+        
+        Returns:
+            Dicionário com key, request_hash, result_id, created_at, expires_at ou None
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            "SELECT key, request_hash, result_id, created_at, expires_at "
+            "FROM idempotency_keys WHERE key = ? AND expires_at > ?",
+            (key, datetime.now().isoformat())
+        )
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        if row:
+            return {
+                "key": row[0],
+                "request_hash": row[1],
+                "result_id": row[2],
+                "created_at": row[3],
+                "expires_at": row[4]
+            }
+        
+        return None
+    
+    def save_idempotency_key(self, key: str, request_hash: str, result_id: str, ttl_seconds: int) -> None:
+        """
+        Registra (ou substitui, se expirada) uma Idempotency-Key e remove as chaves vencidas.
+        
+        Args:
+            key: Valor do header Idempotency-Key
+            request_hash: Hash normalizado da entrada (para detectar reuso da chave com outro corpo)
+            result_id: ID do resultado gerado
+            ttl_seconds: Validade da chave em segundos
+        """
+        agora = datetime.now()
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (agora.isoformat(),))
+        cursor.execute(
+            "INSERT OR REPLACE INTO idempotency_keys (key, request_hash, result_id, created_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                key,
+                request_hash,
+                result_id,
+                agora.isoformat(),
+                (agora + timedelta(seconds=ttl_seconds)).isoformat()
+            )
+        )
+        
+        conn.commit()
+        conn.close()
+    
+    def consultar_cache(self, chave: str) -> Optional[str]:
+        """
+        Procura um resultado pré-calculado válido (somente leitura: a contagem
+        de acertos/falhas é gravada em lote por registrar_consultas_cache).
+        
+        Returns:
+            ID do resultado ou None
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            "SELECT result_id FROM result_cache WHERE chave = ? AND expires_at > ?",
+            (chave, datetime.now().isoformat())
+        )
+        row = cursor.fetchone()
+        conn.close()
+        
+        return row[0] if row else None
+    
+    def registrar_consultas_cache(
+        self,
+        acertos_por_chave: Dict[str, int],
+        por_dia: Dict[str, Tuple[int, int]]
+    ) -> None:
+        """
+        Soma consultas acumuladas do cache em uma única transação.
+        
+        Args:
+            acertos_por_chave: chave do cache → acertos
+            por_dia: dia (YYYY-MM-DD) → (acertos, falhas)
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.executemany(
+            "UPDATE result_cache SET acertos = acertos + ? WHERE chave = ?",
+            [(acertos, chave) for chave, acertos in acertos_por_chave.items()]
+        )
+        cursor.executemany(
+            "INSERT INTO result_cache_consultas (dia, acertos, falhas) VALUES (?, ?, ?) "
+            "ON CONFLICT(dia) DO UPDATE SET acertos = acertos + excluded.acertos, falhas = falhas + excluded.falhas",
+            [(dia, acertos, falhas) for dia, (acertos, falhas) in por_dia.items()]
+        )
+        
+        conn.commit()
+        conn.close()
+    
+    def save_cache_entry(
+        self,
+        chave: str,
+        result_id: str,
+        workbook_version: Optional[str],
+        ttl_seconds: int
+    ) -> None:
+        """
+        Registra (ou substitui) o resultado pré-calculado de uma chave e remove
+        as entradas vencidas.
+        """
+        agora = datetime.now()
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("DELETE FROM result_cache WHERE expires_at <= ?", (agora.isoformat(),))
+        cursor.execute(
+            "INSERT OR REPLACE INTO result_cache (chave, result_id, workbook_version, created_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                chave,
+                result_id,
+                workbook_version,
+                agora.isoformat(),
+                (agora + timedelta(seconds=ttl_seconds)).isoformat()
+            )
+        )
+        
+        conn.commit()
+        conn.close()
+    
+    def get_cache_entries(self, chaves: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Entradas válidas do cache para as chaves informadas.
+        
+        Returns:
+            {chave: {"result_id", "created_at", "expires_at", "acertos"}}
+        """
+        agora = datetime.now().isoformat()
+        entradas: Dict[str, Dict[str, Any]] = {}
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        # Em lotes: limite de parâmetros por consulta do SQLite
+        for inicio in range(0, len(chaves), 500):
+            lote = chaves[inicio:inicio + 500]
+            cursor.execute(
+                "SELECT chave, result_id, created_at, expires_at, acertos FROM result_cache "
+                f"WHERE expires_at > ? AND chave IN ({','.join('?' * len(lote))})",
+                [agora] + lote
+            )
+            for row in cursor.fetchall():
+                entradas[row[0]] = {
+                    "result_id": row[1],
+                    "created_at": row[2],
+                    "expires_at": row[3],
+                    "acertos": row[4]
+                }
+        
+        conn.close()
+        return entradas
+    
+    def get_cache_stats(self, dias: int = 7) -> List[Dict[str, Any]]:
+        """
+        Acertos e falhas do cache de resultados nos últimos `dias` dias.
+        
+        Returns:
+            Lista de {"dia", "acertos", "falhas"} (mais recente primeiro)
+        """
+        desde = (datetime.now().date() - timedelta(days=dias - 1)).isoformat()
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            "SELECT dia, acertos, falhas FROM result_cache_consultas WHERE dia >= ? ORDER BY dia DESC",
+            (desde,)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [{"dia": row[0], "acertos": row[1], "falhas": row[2]} for row in rows]
+    
+    def listar_titulos(self) -> List[Dict[str, Any]]:
+        """
+        Títulos de tabela conhecidos em result_values.
+        
+        Returns:
+            Lista de {"id", "titulo", "header"}
+        """
+        conn = self._connect()
+        rows = conn.execute("SELECT id, titulo, header FROM result_titles ORDER BY id").fetchall()
+        conn.close()
+        
+        return [{"id": row[0], "titulo": row[1], "header": loads(row[2])} for row in rows]
+    
+    def agregar_valores(
+        self,
+        coluna: Union[int, str],
+        titulo: Optional[str] = None,
+        linha: Optional[int] = LINHA_TOTAL,
+        atualizado: bool = False,
+        agrupar: str = "municipio",
+        municipio: Optional[str] = None,
+        desde: Optional[str] = None,
+        ate: Optional[str] = None,
+        limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """
+        Agrega (soma, média, mínimo, máximo) um valor das tabelas em SQL, sobre result_values.
+        
+        Args:
+            coluna: índice da coluna no header (1 em diante) ou o nome dela
+            titulo: título exato da tabela (None = todas as tabelas)
+            linha: índice da linha (LINHA_TOTAL = total; None = todas as linhas)
+            atualizado: usar results_atualizados em vez de results_base
+            agrupar: chave de AGRUPAMENTOS
+            municipio: filtrar um município
+            desde, ate: datas YYYY-MM-DD (inclusivas) sobre created_at
+        
+        Returns:
+            Lista de {"grupo", "resultados", "soma", "media", "minimo", "maximo"} (maior soma primeiro)
+        
+        Raises:
+            ValueError: agrupamento, título ou coluna desconhecidos
+        """
+        if agrupar not in AGRUPAMENTOS:
+            raise ValueError(f"Agrupamento inválido: {agrupar} (use {', '.join(AGRUPAMENTOS)})")
+        
+        titulos = [t for t in self.listar_titulos() if titulo is None or t["titulo"] == titulo]
+        if titulo is not None and not titulos:
+            raise ValueError(f"Título de tabela desconhecido: {titulo}")
+        
+        # (título, coluna) a agregar: o nome da coluna é resolvido pelo header de cada título
+        pares = [
+            (t["id"], coluna if isinstance(coluna, int) else t["header"].index(coluna))
+            for t in titulos
+            if (isinstance(coluna, int) and 0 < coluna < len(t["header"])) or coluna in t["header"][1:]
+        ]
+        if not pares:
+            raise ValueError(f"Coluna desconhecida: {coluna}")
+        
+        condicoes = [
+            f"(v.titulo_id, v.coluna) IN (VALUES {', '.join('(?, ?)' for _ in pares)})",
+            "v.atualizado = ?",
+        ]
+        parametros: List[Any] = [valor for par in pares for valor in par] + [int(atualizado)]
+        if linha is not None:
+            condicoes.append("v.linha = ?")
+            parametros.append(linha)
+        if municipio:
+            condicoes.append("r.municipio = ?")
+            parametros.append(municipio)
+        if desde:
+            condicoes.append("r.created_at >= ?")
+            parametros.append(desde)
+        if ate:
+            condicoes.append("r.created_at < date(?, '+1 day')")
+            parametros.append(ate)
+        
+        conn = self._connect()
+        rows = conn.execute(
+            f"""
+            SELECT {AGRUPAMENTOS[agrupar]} AS grupo, COUNT(DISTINCT v.result_n),
+                SUM(v.valor), AVG(v.valor), MIN(v.valor), MAX(v.valor)
+            FROM result_values v
+            JOIN result_keys k ON k.n = v.result_n
+            JOIN results r ON r.id = k.result_id
+            JOIN result_titles t ON t.id = v.titulo_id
+            WHERE {' AND '.join(condicoes)}
+            GROUP BY grupo
+            ORDER BY 3 DESC
+            LIMIT ?
+            """,
+            parametros + [limit]
+        ).fetchall()
+        conn.close()
+        
+        return [
+            {
+                "grupo": row[0],
+                "resultados": row[1],
+                "soma": row[2],
+                "media": row[3],
+                "minimo": row[4],
+                "maximo": row[5]
+            }
+            for row in rows
+        ]
+    
+    def buscar_resultados(self, texto: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """
+        Busca textual no histórico (município, datas, tabelas), ordenada por relevância.
+        
+        Returns:
+            {"total", "ordem", "resultados": [{"id", "created_at", "município",
+            "correção_até", "workbook_version", "trecho", "relevancia"}]}
+        
+        Raises:
+            ValueError: consulta vazia
+            RuntimeError: SQLite sem FTS5
+        """
+        consulta = montar_consulta_fts(texto)
+        conn = self._connect()
+        if not self._busca_fts:
+            conn.close()
+            raise RuntimeError("Busca textual indisponível: SQLite sem FTS5")
+        
+        cursor = conn.cursor()
+        total = cursor.execute(
+            "SELECT COUNT(*) FROM results_fts WHERE results_fts MATCH ?", (consulta,)
+        ).fetchone()[0]
+        
+        # 1) Página de rowids. bm25 pontua todos os acertos: em consultas muito
+        # amplas (todas as linhas casam "NT36") ordena pelos mais recentes, que o
+        # FTS5 percorre em ordem de rowid e interrompe no LIMIT
+        if total <= LIMIAR_RANKING_BUSCA:
+            # Peso das colunas no bm25: município > datas > tabelas; empate → mais recente
+            pagina = cursor.execute(
+                "SELECT rowid, bm25(results_fts, 10.0, 4.0, 1.0) AS relevancia FROM results_fts "
+                "WHERE results_fts MATCH ? ORDER BY relevancia, rowid DESC LIMIT ? OFFSET ?",
+                (consulta, limit, offset)
+            ).fetchall()
+        else:
+            pagina = cursor.execute(
+                "SELECT rowid, NULL FROM results_fts WHERE results_fts MATCH ? ORDER BY rowid DESC LIMIT ? OFFSET ?",
+                (consulta, limit, offset)
+            ).fetchall()
+        
+        # 2) Dados das linhas da página (acesso direto por rowid, sem MATCH)
+        detalhes = {}
+        if pagina:
+            cursor.execute(
+                f"""
+                SELECT f.rowid, r.id, r.created_at, r.municipio, r.input_data, r.workbook_version,
+                    f.municipio, f.datas, f.tabelas
+                FROM results_fts f
+                JOIN result_keys k ON k.n = f.rowid
+                JOIN results r ON r.id = k.result_id
+                WHERE f.rowid IN ({','.join('?' * len(pagina))})
+                """,
+                [n for n, _ in pagina]
+            )
+            detalhes = {row[0]: row[1:] for row in cursor.fetchall()}
+        conn.close()
+        
+        return {
+            "total": total,
+            "ordem": "relevancia" if total <= LIMIAR_RANKING_BUSCA else "recentes",
+            "resultados": [
+                {
+                    "id": detalhes[n][0],
+                    "created_at": detalhes[n][1],
+                    "município": detalhes[n][2] or "N/A",
+                    "correção_até": loads(detalhes[n][3]).get("correção_até", "N/A"),
+                    "workbook_version": detalhes[n][4],
+                    "trecho": destacar_trecho(texto, detalhes[n][5:8]),
+                    # bm25 do SQLite é negativo (menor = melhor)
+                    "relevancia": round(-relevancia, 4) if relevancia is not None else None
+                }
+                for n, relevancia in pagina
+                if n in detalhes
+            ]
+        }
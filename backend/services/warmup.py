@@ -0,0 +1,82 @@
+"""
+Aquecimento da API em segundo plano.
+
+O import de main.py só monta objetos baratos; o trabalho caro de partida
+(abrir as sessões do Excel, carregar o índice SELIC, verificar o esquema do
+banco) roda em fases numa thread de fundo, iniciada no startup do FastAPI.
+Enquanto isso a API já responde /healthz (processo vivo), e /readyz só
+retorna 200 quando todas as fases terminaram — em um rolling restart, o
+balanceador não envia tráfego para uma instância fria.
+
+DECISÕES TÉCNICAS:
+- Fases em ordem, cada uma com estado pendente → executando → ok | erro
+- Fase com erro deixa a instância não pronta (o orquestrador decide reiniciar)
+- Requisições que chegarem antes do fim não falham: cada recurso também se
+  inicializa sob demanda (pool do Excel, esquema do banco)
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class Warmup:
+    """
+    Executa as fases de aquecimento numa thread de fundo e expõe o estado.
+    """
+
+    def __init__(self):
+        self._fases: List[Tuple[str, Callable[[], Any]]] = []
+        self._estado: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._concluido = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def fase(self, nome: str, funcao: Callable[[], Any]) -> None:
+        """Registra uma fase (executadas na ordem de registro)."""
+        self._fases.append((nome, funcao))
+        self._estado[nome] = {"status": "pendente"}
+
+    def iniciar(self) -> None:
+        """Dispara o aquecimento em segundo plano (idempotente)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._executar, name="warmup", daemon=True)
+            self._thread.start()
+
+    def aguardar(self, timeout: Optional[float] = None) -> bool:
+        """Bloqueia até o fim do aquecimento; retorna True se a instância está pronta."""
+        self._concluido.wait(timeout)
+        return self.pronto
+
+    @property
+    def pronto(self) -> bool:
+        with self._lock:
+            return self._concluido.is_set() and all(e["status"] == "ok" for e in self._estado.values())
+
+    def estado(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {nome: dict(e) for nome, e in self._estado.items()}
+
+    def _atualizar(self, nome: str, **campos: Any) -> None:
+        with self._lock:
+            self._estado[nome] = campos
+
+    def _executar(self) -> None:
+        inicio_total = time.perf_counter()
+        for nome, funcao in self._fases:
+            self._atualizar(nome, status="executando")
+            inicio = time.perf_counter()
+            try:
+                funcao()
+                duracao = round(time.perf_counter() - inicio, 3)
+                self._atualizar(nome, status="ok", segundos=duracao)
+                print(f"🔥 Aquecimento: {nome} pronto em {duracao}s")
+            except Exception as e:
+                self._atualizar(nome, status="erro", erro=str(e))
+                print(f"Erro no aquecimento ({nome}): {str(e)}")
+
+        self._concluido.set()
+        if self.pronto:
+            print(f"✅ API pronta em {time.perf_counter() - inicio_total:.2f}s")
@@ -0,0 +1,97 @@
+"""
+Observação da planilha-mãe (planilhamae.xlsx) para recarga a quente.
+
+Quando o jurídico publica uma nova versão da planilha em EXCEL_FILE_PATH, o
+observador detecta a troca e pede ao motor que suba sessões novas com ela;
+as sessões antigas terminam os cálculos em andamento e são fechadas. A API
+não reinicia, nem perde as sessões aquecidas durante a troca.
+
+DECISÕES TÉCNICAS:
+- Versão da planilha = SHA-256 (12 primeiros hex) do conteúdo do arquivo:
+  copiar de volta o mesmo arquivo (só mtime novo) não dispara recarga
+- Polling de os.stat (mtime + tamanho) numa thread: sem dependência nova e
+  funciona em compartilhamentos de rede, onde eventos do SO não chegam
+- A recarga só dispara depois que o arquivo fica estável por um intervalo
+  inteiro (cópia ainda em andamento não é aberta pela metade)
+- Erro na recarga não derruba o observador: a versão antiga segue atendendo
+"""
+
+import hashlib
+import os
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+
+def versao_planilha(path: str) -> Optional[str]:
+    """
+    Identificador da versão da planilha (hash do conteúdo).
+
+    Returns:
+        12 primeiros caracteres do SHA-256, ou None se o arquivo não existir
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for bloco in iter(lambda: f.read(1 << 20), b''):
+                digest.update(bloco)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()[:12]
+
+
+def _assinatura(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return info.st_mtime_ns, info.st_size
+
+
+class WorkbookWatcher:
+    """
+    Observa um arquivo e chama `ao_mudar()` quando ele é substituído.
+    """
+
+    def __init__(self, path: str, intervalo: float, ao_mudar: Callable[[], Any]):
+        self.path = path
+        self.intervalo = intervalo
+        self.ao_mudar = ao_mudar
+
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def iniciar(self) -> None:
+        """Sobe a thread de observação (idempotente; intervalo <= 0 desliga)."""
+        if self.intervalo <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="workbook-watcher", daemon=True)
+        self._thread.start()
+        print(f"👀 Observando {self.path} (a cada {self.intervalo:g}s)")
+
+    def parar(self) -> None:
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _loop(self) -> None:
+        vista = _assinatura(self.path)
+        candidata = None
+
+        while not self._parar.wait(self.intervalo):
+            atual = _assinatura(self.path)
+
+            if atual == vista or atual is None:
+                candidata = None
+                continue
+
+            if atual != candidata:
+                # Mudou desde a última leitura: esperar estabilizar
+                candidata = atual
+                continue
+
+            vista, candidata = atual, None
+            try:
+                self.ao_mudar()
+            except Exception as e:
+                print(f"Erro ao recarregar a planilha: {str(e)}")
@@ -0,0 +1,391 @@
+"""
+Persistência assíncrona (write-behind) dos resultados.
+
+Com o modo ativado, POST /calculate não espera o INSERT/commit no SQLite:
+o ID é gerado na hora, o resultado vai para uma fila limitada em memória e
+uma única thread gravadora o persiste, agrupando várias linhas por transação.
+
+DECISÕES TÉCNICAS:
+- Fila limitada (queue.Queue(maxsize)); com a fila cheia, save_result bloqueia
+  até haver espaço (contrapressão em vez de perder resultados)
+- Uma única thread gravadora: o SQLite só aceita um escritor por vez
+- Lotes de até `tamanho_lote` linhas em uma transação (executemany)
+- Leitura consistente: get_result/list_results/delete_result enxergam os
+  resultados ainda pendentes na fila; buscar_resultados (índice FTS, que só
+  existe no banco) drena a fila antes de consultar. Resultados recusados pelo
+  banco (arquivo de falhas) só aparecem na busca depois de regravados
+- Linha que falha mesmo na tentativa individual continua pendente (o cliente
+  já tem o ID): é regravada com espera exponencial (RETENTATIVA_INICIAL até
+  RETENTATIVA_MAXIMA) e espelhada no arquivo de falhas (JSON lines, ao lado do
+  banco), relido quando a thread gravadora inicia. Ao ser regravada, a linha
+  que já estiver no banco (queda entre o commit e a atualização do arquivo)
+  conta como gravada
+- Demais métodos do Storage são delegados sem alteração
+
+GARANTIA DE DURABILIDADE:
+- O cliente recebe o ID ANTES de o resultado estar gravado em disco
+- Desligamento normal (lifespan do FastAPI → close()) drena a fila inteira;
+  linhas que o banco continua recusando ficam no arquivo de falhas e voltam
+  à fila na próxima inicialização
+- Em queda abrupta do processo (kill -9, falta de energia) perdem-se no máximo
+  os resultados ainda na fila (até `tamanho_fila` itens + o lote em gravação)
+- Sem o modo ativado (padrão), o comportamento continua síncrono
+"""
+
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .metrics import Metrics
+from .serialization import dumps, loads
+from .http_cache import gerar_etag, hash_conteudo
+from .storage import Storage, montar_json_resultado
+
+
+_ENCERRAR = object()
+
+# Espera entre regravações das linhas que falharam (dobra a cada falha)
+RETENTATIVA_INICIAL = 1.0
+RETENTATIVA_MAXIMA = 60.0
+
+Linha = Tuple[str, str, Dict[str, Any], Any, Optional[str]]
+
+
+class WriteBehindStorage:
+    """
+    Envoltório do Storage com gravação assíncrona de resultados.
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        tamanho_fila: int = 1000,
+        tamanho_lote: int = 50,
+        metrics: Optional[Metrics] = None,
+        arquivo_falhas: Optional[str] = None,
+        retentativa_inicial: float = RETENTATIVA_INICIAL
+    ):
+        """
+        Args:
+            arquivo_falhas: linhas que o banco recusou (padrão: <pasta do banco>/write_behind_falhas.jsonl)
+            retentativa_inicial: espera (s) antes da primeira regravação de uma linha recusada
+        """
+        self.storage = storage
+        self.tamanho_lote = tamanho_lote
+        self.metrics = metrics
+        self.arquivo_falhas = (
+            Path(arquivo_falhas) if arquivo_falhas
+            else Path(storage.db_path).parent / "write_behind_falhas.jsonl"
+        )
+        self.retentativa_inicial = retentativa_inicial
+
+        self._fila: "queue.Queue[Any]" = queue.Queue(maxsize=tamanho_fila)
+        self._pendentes: Dict[str, Linha] = {}
+        self._lock = threading.Lock()
+
+        # Linhas recusadas pelo banco (só a thread gravadora mexe)
+        self._falhas: List[Linha] = []
+        self._espera_falhas = retentativa_inicial
+        self._proxima_tentativa = 0.0
+
+        self._thread = threading.Thread(target=self._gravar, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def __getattr__(self, nome: str) -> Any:
+        # Métodos sem tratamento especial (ex.: idempotency keys) vão direto ao Storage
+        return getattr(self.storage, nome)
+
+    def save_result(
+        self,
+        input_data: Dict[str, Any],
+        output_data: Union[Dict[str, Any], bytes],
+        workbook_version: Optional[str] = None,
+        created_at: Optional[str] = None
+    ) -> str:
+        """
+        Enfileira um resultado para gravação e retorna o ID imediatamente.
+        """
+        result_id = str(uuid.uuid4())
+        created_at = created_at or datetime.now().isoformat()
+        linha = (result_id, created_at, input_data, output_data, workbook_version)
+
+        with self._lock:
+            self._pendentes[result_id] = linha
+
+        self._fila.put(linha)
+
+        if self.metrics:
+            self.metrics.incr("write_behind_enfileirados")
+
+        return result_id
+
+    def get_result(self, result_id: str) -> Optional[Dict[str, Any]]:
+        """Recupera um resultado, consultando primeiro a fila pendente."""
+        with self._lock:
+            linha = self._pendentes.get(result_id)
+
+        if linha:
+            output_data = linha[3]
+            return {
+                "id": linha[0],
+                "created_at": linha[1],
+                "workbook_version": linha[4],
+                "origem_id": None,
+                "input_data": linha[2],
+                "output_data": loads(output_data) if isinstance(output_data, bytes) else output_data
+            }
+
+        return self.storage.get_result(result_id)
+
+    def get_result_raw(self, result_id: str) -> Optional[bytes]:
+        """Recupera um resultado como JSON (bytes), consultando primeiro a fila pendente."""
+        with self._lock:
+            linha = self._pendentes.get(result_id)
+
+        if linha:
+            output_data = linha[3]
+            return montar_json_resultado(
+                linha[0],
+                linha[1],
+                dumps(linha[2]).decode("utf-8"),
+                (output_data if isinstance(output_data, bytes) else dumps(output_data)).decode("utf-8"),
+                linha[4]
+            )
+
+        return self.storage.get_result_raw(result_id)
+
+    def get_result_etag(self, result_id: str) -> Optional[str]:
+        """ETag de um resultado, calculado na hora se ainda estiver pendente."""
+        with self._lock:
+            pendente = result_id in self._pendentes
+
+        if pendente:
+            raw = self.get_result_raw(result_id)
+            if raw is not None:
+                return gerar_etag(result_id, hash_conteudo(raw))
+
+        return self.storage.get_result_etag(result_id)
+
+    def list_results(self, limit: int = 100) -> list:
+        """Lista os últimos resultados, incluindo os ainda pendentes."""
+        with self._lock:
+            pendentes = sorted(self._pendentes.values(), key=lambda linha: linha[1], reverse=True)
+
+        results = [
+            {
+                "id": result_id,
+                "created_at": created_at,
+                "município": input_data.get("município", "N/A"),
+                "correção_até": input_data.get("correção_até", "N/A"),
+                "workbook_version": workbook_version,
+                "origem_id": None
+            }
+            for result_id, created_at, input_data, _, workbook_version in pendentes[:limit]
+        ]
+
+        ids_pendentes = {r["id"] for r in results}
+        for r in self.storage.list_results(limit=limit):
+            if len(results) >= limit:
+                break
+            if r["id"] not in ids_pendentes:
+                results.append(r)
+
+        return results
+
+    def delete_result(self, result_id: str) -> bool:
+        """Deleta um resultado; se ainda estiver pendente, drena a fila antes."""
+        with self._lock:
+            pendente = result_id in self._pendentes
+
+        if pendente:
+            self.flush()
+
+        return self.storage.delete_result(result_id)
+
+    def buscar_resultados(self, texto: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """Busca textual; drena a fila antes para incluir os resultados recentes."""
+        with self._lock:
+            pendente = bool(self._pendentes)
+
+        if pendente:
+            self.flush()
+
+        return self.storage.buscar_resultados(texto, limit, offset)
+
+    def flush(self) -> None:
+        """
+        Bloqueia até que todos os resultados enfileirados tenham passado pela
+        gravação (linhas recusadas pelo banco continuam pendentes; ver falhas_pendentes).
+        """
+        self._fila.join()
+
+    def falhas_pendentes(self) -> int:
+        """Quantos resultados o banco recusou e aguardam nova tentativa."""
+        return len(self._falhas)
+
+    def close(self) -> None:
+        """Drena a fila e encerra a thread gravadora (chamar no desligamento)."""
+        self._fila.put(_ENCERRAR)
+        self._thread.join()
+
+    def _gravar(self) -> None:
+        """Loop da thread gravadora: agrupa itens da fila em transações."""
+        self._recuperar_falhas()
+        encerrar = False
+
+        while not encerrar:
+            try:
+                lote: List[Any] = [self._fila.get(timeout=self._espera_retentativa())]
+            except queue.Empty:
+                self._retentar_falhas()
+                continue
+
+            while len(lote) < self.tamanho_lote:
+                try:
+                    lote.append(self._fila.get_nowait())
+                except queue.Empty:
+                    break
+
+            linhas = [item for item in lote if item is not _ENCERRAR]
+            encerrar = len(linhas) != len(lote)
+
+            try:
+                if linhas:
+                    self._gravar_lote(linhas)
+                if self._falhas and (encerrar or time.monotonic() >= self._proxima_tentativa):
+                    self._retentar_falhas()
+            finally:
+                for _ in lote:
+                    self._fila.task_done()
+
+        if self._falhas:
+            print(f"⚠️ {len(self._falhas)} resultados não gravados ficam em {self.arquivo_falhas} (regravados na próxima inicialização)")
+
+    def _gravar_lote(self, linhas: List[Linha]) -> None:
+        """Grava um lote; linhas recusadas continuam pendentes para nova tentativa."""
+        gravadas, recusadas = self._tentar_gravar(linhas)
+
+        with self._lock:
+            for linha in gravadas:
+                self._pendentes.pop(linha[0], None)
+
+        if recusadas:
+            self._falhas.extend(recusadas)
+            self._salvar_falhas()
+            if len(self._falhas) == len(recusadas):
+                self._espera_falhas = self.retentativa_inicial
+                self._proxima_tentativa = time.monotonic() + self._espera_falhas
+
+        if self.metrics:
+            self.metrics.incr("write_behind_gravados", len(gravadas))
+            self.metrics.incr("write_behind_lotes")
+
+    def _tentar_gravar(self, linhas: List[Linha]) -> Tuple[List[Linha], List[Linha]]:
+        """Grava em uma transação; se ela falhar, linha a linha. Retorna (gravadas, recusadas)."""
+        try:
+            self.storage.save_results_batch(linhas)
+            return linhas, []
+        except Exception as e:
+            print(f"⚠️ Falha ao gravar lote de {len(linhas)} resultados: {str(e)}")
+
+        gravadas, recusadas = [], []
+        for linha in linhas:
+            try:
+                self.storage.save_results_batch([linha])
+                gravadas.append(linha)
+            except Exception as erro_linha:
+                if self._ja_gravada(linha[0]):
+                    gravadas.append(linha)
+                    continue
+                print(f"Erro ao gravar resultado {linha[0]}: {str(erro_linha)}")
+                recusadas.append(linha)
+                if self.metrics:
+                    self.metrics.incr("write_behind_erros")
+        return gravadas, recusadas
+
+    def _ja_gravada(self, result_id: str) -> bool:
+        try:
+            return self.storage.get_result_etag(result_id) is not None
+        except Exception:
+            return False
+
+    def _espera_retentativa(self) -> Optional[float]:
+        """Timeout da espera na fila: até a próxima regravação (None = sem falhas)."""
+        if not self._falhas:
+            return None
+        return max(0.0, self._proxima_tentativa - time.monotonic())
+
+    def _retentar_falhas(self) -> None:
+        """Regrava as linhas recusadas; as que falharem de novo esperam o dobro."""
+        if not self._falhas:
+            return
+
+        gravadas, recusadas = self._tentar_gravar(self._falhas)
+        with self._lock:
+            for linha in gravadas:
+                self._pendentes.pop(linha[0], None)
+
+        self._falhas = recusadas
+        self._salvar_falhas()
+        if recusadas:
+            self._espera_falhas = min(self._espera_falhas * 2, RETENTATIVA_MAXIMA)
+            self._proxima_tentativa = time.monotonic() + self._espera_falhas
+            print(f"⚠️ {len(recusadas)} resultados ainda não gravados; nova tentativa em {self._espera_falhas:g}s")
+        else:
+            self._espera_falhas = self.retentativa_inicial
+            print(f"✅ {len(gravadas)} resultados pendentes gravados")
+
+        if self.metrics:
+            self.metrics.incr("write_behind_gravados", len(gravadas))
+
+    def _salvar_falhas(self) -> None:
+        """Espelha as linhas recusadas no arquivo de falhas (removido quando vazio)."""
+        try:
+            if not self._falhas:
+                if self.arquivo_falhas.exists():
+                    self.arquivo_falhas.unlink()
+                return
+
+            temporario = self.arquivo_falhas.with_name(self.arquivo_falhas.name + ".tmp")
+            with open(temporario, "wb") as f:
+                for result_id, created_at, input_data, output_data, workbook_version in self._falhas:
+                    f.write(dumps({
+                        "id": result_id,
+                        "created_at": created_at,
+                        "input_data": input_data,
+                        "output_data": loads(output_data) if isinstance(output_data, bytes) else output_data,
+                        "workbook_version": workbook_version,
+                    }) + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, self.arquivo_falhas)
+        except Exception as e:
+            print(f"⚠️ Erro ao salvar arquivo de falhas {self.arquivo_falhas}: {str(e)}")
+
+    def _recuperar_falhas(self) -> None:
+        """Recoloca como pendentes as linhas do arquivo de falhas de uma execução anterior."""
+        if not self.arquivo_falhas.exists():
+            return
+
+        try:
+            with open(self.arquivo_falhas, "rb") as f:
+                registros = [loads(linha) for linha in f if linha.strip()]
+        except Exception as e:
+            print(f"⚠️ Erro ao ler arquivo de falhas {self.arquivo_falhas}: {str(e)}")
+            return
+
+        linhas = [
+            (r["id"], r["created_at"], r["input_data"], r["output_data"], r.get("workbook_version"))
+            for r in registros
+        ]
+        with self._lock:
+            for linha in linhas:
+                self._pendentes[linha[0]] = linha
+        self._falhas = linhas
+        self._proxima_tentativa = 0.0
+        print(f"♻️ {len(linhas)} resultados não gravados na execução anterior voltam à fila ({self.arquivo_falhas})")
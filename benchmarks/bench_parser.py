@@ -0,0 +1,20 @@
+"""
+Benchmark do parser de blocos de ExcelRunner.read_results sobre um snapshot de células.
+"""
+
+import re
+
+from conftest import ROOT_DIR
+from services.excel_runner import ExcelRunner
+
+
+def bench_read_results_snapshot(benchmark, snapshot_resumo, results_base):
+    runner = ExcelRunner(str(ROOT_DIR / "data" / "planilhamae.xlsx"), str(ROOT_DIR / "data" / "mapa_celulas.json"))
+    runner.sheet = snapshot_resumo
+
+    # O snapshot sintético pode passar da linha final do mapa: varrer até a última célula
+    ultima_linha = max(int(re.sub(r"\D", "", celula)) for celula in snapshot_resumo.celulas)
+    runner.mapa["tabelas"]["fim"] = max(runner.mapa["tabelas"]["fim"], ultima_linha)
+
+    resultado = benchmark(runner.read_results)
+    assert [bloco["titulo"] for bloco in resultado] == [bloco["titulo"] for bloco in results_base]
@@ -0,0 +1,15 @@
+"""
+Benchmarks do ResultSet: montagem a partir das tabelas do leitor e conversão
+para o formato JSON na borda da API.
+"""
+
+from services.result_set import ResultSet
+
+
+def bench_de_tabelas(benchmark, results_base):
+    resultado = benchmark(ResultSet.de_tabelas, results_base)
+    assert len(resultado) == len(results_base)
+
+
+def bench_para_tabelas(benchmark, result_set, results_base):
+    assert benchmark(result_set.para_tabelas) == results_base
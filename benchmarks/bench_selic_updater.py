@@ -0,0 +1,34 @@
+"""
+Benchmarks de SelicUpdater.atualizar_resultados (listas de dicts) e
+atualizar_result_set (ResultSet) sobre resultados de 17 tabelas.
+"""
+
+import pytest
+
+from services.selic_updater import SelicUpdater
+
+
+# Datas de correção: 3 meses, 1 ano, 5 anos e 20 anos após a base (01/01/2025)
+DATAS_CORRECAO = ["01/04/2025", "01/01/2026", "01/01/2030", "01/01/2045"]
+
+
+@pytest.fixture(scope="module")
+def updater(selic_cache_path):
+    return SelicUpdater(selic_cache_path)
+
+
+@pytest.mark.parametrize("correcao_ate", DATAS_CORRECAO)
+def bench_atualizar_resultados(benchmark, updater, results_base, correcao_ate):
+    resultado = benchmark(updater.atualizar_resultados, results_base, correcao_ate)
+    assert len(resultado) == len(results_base)
+
+
+@pytest.mark.parametrize("correcao_ate", DATAS_CORRECAO)
+def bench_atualizar_result_set(benchmark, updater, result_set, correcao_ate):
+    resultado = benchmark(updater.atualizar_result_set, result_set, correcao_ate)
+    assert len(resultado) == len(result_set)
+
+
+@pytest.mark.parametrize("correcao_ate", DATAS_CORRECAO)
+def bench_fator_acumulado(benchmark, updater, correcao_ate):
+    assert benchmark(updater.fator_acumulado, correcao_ate) > 1
@@ -0,0 +1,38 @@
+"""
+Benchmarks de codificação/decodificação JSON do output completo
+(orjson quando instalado e json da stdlib).
+"""
+
+import pytest
+
+from services import serialization
+from services.selic_updater import SelicUpdater
+
+
+BACKENDS = ["stdlib"] + (["orjson"] if serialization.orjson is not None else [])
+
+
+@pytest.fixture(scope="module")
+def output_completo(results_base, selic_cache_path):
+    updater = SelicUpdater(selic_cache_path)
+    return {
+        "results_base": results_base,
+        "results_atualizados": updater.atualizar_resultados(results_base, "01/06/2025"),
+        "correcao_ate": "01/06/2025",
+    }
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+
+def bench_dumps(benchmark, backend, output_completo):
+    assert benchmark(serialization.dumps, output_completo)
+
+
+def bench_loads(benchmark, backend, output_completo):
+    dados = serialization.dumps(output_completo)
+    assert benchmark(serialization.loads, dados) == serialization.loads(dados)
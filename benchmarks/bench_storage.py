@@ -0,0 +1,60 @@
+"""
+Benchmarks de Storage (save/get/list) com o banco já populado.
+
+Tamanhos via BENCH_STORAGE_LINHAS (padrão 10000). Exemplo para a faixa completa:
+    BENCH_STORAGE_LINHAS=10000,100000,1000000 pytest benchmarks/bench_storage.py
+"""
+
+import itertools
+import os
+import random
+import uuid
+
+import pytest
+
+from services.serialization import dumps
+from services.storage import Storage
+
+
+TAMANHOS = [int(n) for n in os.getenv("BENCH_STORAGE_LINHAS", "10000").split(",")]
+LOTE_POPULACAO = 5000
+
+
+@pytest.fixture(scope="module", params=TAMANHOS, ids=lambda n: f"{n}_linhas")
+def banco(request, tmp_path_factory, entrada, results_base):
+    """Banco populado com N resultados (mesmo output, IDs e datas distintos)."""
+    storage = Storage(str(tmp_path_factory.mktemp("storage") / "results.db"))
+    output_json = dumps({"results_base": results_base, "results_atualizados": None, "correcao_ate": entrada["correção_até"]})
+
+    ids = []
+    for inicio in range(0, request.param, LOTE_POPULACAO):
+        lote = []
+        for i in range(inicio, min(inicio + LOTE_POPULACAO, request.param)):
+            result_id = str(uuid.uuid4())
+            ids.append(result_id)
+            lote.append((result_id, f"2025-01-01T00:00:00.{i:06d}", entrada, output_json, None))
+        storage.save_results_batch(lote)
+
+    return storage, ids, output_json
+
+
+def bench_save_result(benchmark, banco, entrada):
+    storage, _, output_json = banco
+    benchmark(storage.save_result, entrada, output_json)
+
+
+def bench_get_result(benchmark, banco):
+    storage, ids, _ = banco
+    sorteio = itertools.cycle(random.Random(0).sample(ids, min(len(ids), 1000)))
+    assert benchmark(lambda: storage.get_result(next(sorteio)))
+
+
+def bench_get_result_raw(benchmark, banco):
+    storage, ids, _ = banco
+    sorteio = itertools.cycle(random.Random(0).sample(ids, min(len(ids), 1000)))
+    assert benchmark(lambda: storage.get_result_raw(next(sorteio)))
+
+
+def bench_list_results(benchmark, banco):
+    storage, _, _ = banco
+    assert len(benchmark(storage.list_results, 100)) == 100
@@ -0,0 +1,96 @@
+"""
+Fixtures compartilhadas dos micro-benchmarks (caminhos quentes sem Excel).
+
+Os dados são gerados pelo FakeEngine com o layout real das 17 tabelas
+(data/selic_mapping.json), ou lidos de arquivos gravados quando indicados
+por variável de ambiente:
+
+- BENCH_SNAPSHOT: snapshot da aba RESUMO (ExcelRunner.snapshot().salvar(...))
+- BENCH_STORAGE_LINHAS: tamanhos do banco para Storage (ex.: "10000,100000,1000000")
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+
+from services.engine import FakeEngine  # noqa: E402
+from services.excel_runner import SheetSnapshot  # noqa: E402
+
+MAPEAMENTO_PATH = ROOT_DIR / "data" / "selic_mapping.json"
+
+ENTRADA_PADRAO = {
+    "município": "Fortaleza",
+    "ajuizamento": "01/03/2010",
+    "citação": "01/06/2010",
+    "início_cálculo": "01/01/1998",
+    "final_cálculo": "31/12/2006",
+    "honorários_s_valor_da_condenação": 10,
+    "honorários_em_valor_fixo": 0,
+    "deságio_a_aplicar_sobre_o_principal": 20,
+    "deságio_em_a_aplicar_em_honorários": 0,
+    "correção_até": "01/06/2025",
+}
+
+
+@pytest.fixture(scope="session")
+def entrada():
+    return dict(ENTRADA_PADRAO)
+
+
+@pytest.fixture(scope="session")
+def result_set(entrada):
+    """Resultado completo (17 tabelas + ACORDO) como sai do motor (ResultSet)."""
+    return FakeEngine(str(MAPEAMENTO_PATH)).executar(entrada)
+
+
+@pytest.fixture(scope="session")
+def results_base(result_set):
+    """Resultado completo no formato de read_results()."""
+    return result_set.para_tabelas()
+
+
+@pytest.fixture(scope="session")
+def selic_cache_path(tmp_path_factory):
+    """Cache SELIC mensal sintético de 2025-01 a 2045-12 (sem acesso à rede)."""
+    cache = {}
+    for ano in range(2025, 2046):
+        for mes in range(1, 13):
+            cache[f"{ano:04d}-{mes:02d}"] = round(0.8 + (ano * 12 + mes) % 7 * 0.05, 2)
+
+    diretorio = tmp_path_factory.mktemp("selic")
+    path = diretorio / "selic_cache.json"
+    path.write_text(json.dumps(cache), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def snapshot_resumo(results_base):
+    """
+    Snapshot de células da aba RESUMO: gravado (BENCH_SNAPSHOT) ou montado a
+    partir do resultado sintético, com o layout de blocos da planilha (título,
+    cabeçalho, valores, TOTAL, linha vazia) a partir da linha 21.
+    """
+    if os.getenv("BENCH_SNAPSHOT"):
+        return SheetSnapshot.carregar(os.environ["BENCH_SNAPSHOT"])
+
+    colunas = ["A", "B", "C", "D", "E", "F", "AB"]
+    celulas = {}
+    linha = 21
+    for bloco in results_base:
+        celulas[f"A{linha}"] = (bloco["titulo"], "General")
+        for col, valor in zip(colunas, bloco["header"]):
+            celulas[f"{col}{linha + 1}"] = (valor, "General")
+        linha += 2
+        for row in bloco["rows"] + [bloco["total"]]:
+            for col, valor in zip(colunas, row):
+                if valor is not None:
+                    celulas[f"{col}{linha}"] = (valor, "#,##0.00")
+            linha += 1
+        linha += 1
+    return SheetSnapshot(celulas)
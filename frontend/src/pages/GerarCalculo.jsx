@@ -1,5 +1,6 @@
 import React, { useState } from 'react';
 import ResultTable from '../components/ResultTable';
+import { COMPACT_MEDIA_TYPE, decodeCompactCalculation } from '../utils/compactResult';
 
 function GerarCalculo() {
   const [formData, setFormData] = useState({
@@ -38,6 +39,7 @@ function GerarCalculo() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          Accept: COMPACT_MEDIA_TYPE,
         },
         body: JSON.stringify(formData),
       });
@@ -48,7 +50,7 @@ function GerarCalculo() {
       }
 
       const data = await response.json();
-      setResults(data);
+      setResults(decodeCompactCalculation(data));
     } catch (err) {
       setError(err.message);
     } finally {
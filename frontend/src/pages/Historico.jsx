@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import ResultTable from '../components/ResultTable';
+import { COMPACT_MEDIA_TYPE, decodeCompactStoredResult } from '../utils/compactResult';
 
 function Historico() {
   const [calculos, setCalculos] = useState([]);
@@ -7,25 +8,39 @@ function Historico() {
   const [error, setError] = useState(null);
   const [selectedCalculo, setSelectedCalculo] = useState(null);
   const [viewMode, setViewMode] = useState('list'); // 'list' ou 'details'
+  const [textoBusca, setTextoBusca] = useState('');
+  const [busca, setBusca] = useState(''); // consulta aplicada ('' = últimos cálculos)
+  const [pagina, setPagina] = useState(0);
+  const [totalBusca, setTotalBusca] = useState(0);
 
-  // Carregar lista de cálculos ao montar o componente
+  const POR_PAGINA = 20;
+
+  // Carregar lista (ou busca) ao montar o componente e ao mudar consulta/página
   useEffect(() => {
     fetchCalculos();
-  }, []);
+  }, [busca, pagina]);
 
   const fetchCalculos = async () => {
     setLoading(true);
     setError(null);
 
     try {
-      const response = await fetch('/api/results');
+      const url = busca
+        ? `/api/results/search?q=${encodeURIComponent(busca)}&limit=${POR_PAGINA}&offset=${pagina * POR_PAGINA}`
+        : '/api/results';
+      const response = await fetch(url);
       
       if (!response.ok) {
-        throw new Error('Erro ao carregar histórico');
+        throw new Error(busca ? 'Erro ao buscar no histórico' : 'Erro ao carregar histórico');
       }
 
       const data = await response.json();
-      setCalculos(data.results || []);
+      if (busca) {
+        setCalculos(data.resultados || []);
+        setTotalBusca(data.total || 0);
+      } else {
+        setCalculos(data.results || []);
+      }
     } catch (err) {
       setError(err.message);
     } finally {
@@ -33,16 +48,32 @@ function Historico() {
     }
   };
 
+  const handleBuscar = (event) => {
+    event.preventDefault();
+    setPagina(0);
+    setBusca(textoBusca.trim());
+  };
+
+  const handleLimparBusca = () => {
+    setTextoBusca('');
+    setPagina(0);
+    setBusca('');
+  };
+
+  const totalPaginas = Math.ceil(totalBusca / POR_PAGINA);
+
   const handleVerDetalhes = async (calculoId) => {
     try {
-      const response = await fetch(`/api/results/${calculoId}`);
+      const response = await fetch(`/api/results/${calculoId}`, {
+        headers: { Accept: COMPACT_MEDIA_TYPE },
+      });
       
       if (!response.ok) {
         throw new Error('Erro ao carregar detalhes');
       }
 
       const data = await response.json();
-      setSelectedCalculo(data);
+      setSelectedCalculo(decodeCompactStoredResult(data));
       setViewMode('details');
     } catch (err) {
       alert(`Erro: ${err.message}`);
@@ -172,6 +203,32 @@ function Historico() {
         </p>
       </div>
 
+      {/* Busca */}
+      <form onSubmit={handleBuscar} className="flex gap-3 mb-6">
+        <input
+          type="search"
+          value={textoBusca}
+          onChange={(e) => setTextoBusca(e.target.value)}
+          placeholder="Buscar por município, data (ex.: 03/2010) ou tabela (ex.: NT36)"
+          className="flex-1 px-4 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-amber-500"
+        />
+        <button
+          type="submit"
+          className="px-4 py-2 rounded-md text-white bg-slate-700 hover:bg-slate-800 transition-colors"
+        >
+          Buscar
+        </button>
+        {busca && (
+          <button
+            type="button"
+            onClick={handleLimparBusca}
+            className="px-4 py-2 border border-slate-300 rounded-md text-slate-700 bg-slate-50 hover:bg-slate-100 transition-colors"
+          >
+            Limpar
+          </button>
+        )}
+      </form>
+
       {/* Loading */}
       {loading && (
         <div className="flex justify-center items-center py-12">
@@ -218,7 +275,9 @@ function Historico() {
                 Nenhum cálculo encontrado
               </h3>
               <p className="mt-2 text-sm text-gray-500">
-                Comece gerando um novo cálculo na página inicial.
+                {busca
+                  ? 'Tente outro município, data ou nome de tabela.'
+                  : 'Comece gerando um novo cálculo na página inicial.'}
               </p>
             </div>
           ) : (
@@ -251,6 +310,11 @@ function Historico() {
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
                       {calculo.município}
+                      {calculo.trecho && (
+                        <p className="text-xs text-gray-500 truncate max-w-xs" title={calculo.trecho}>
+                          {calculo.trecho}
+                        </p>
+                      )}
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
                       {calculo.correção_até}
@@ -302,11 +366,39 @@ function Historico() {
       )}
 
       {/* Info Footer */}
-      {!loading && !error && calculos.length > 0 && (
+      {!loading && !error && calculos.length > 0 && !busca && (
         <div className="mt-4 text-center text-sm text-gray-500">
           Total de cálculos: {calculos.length}
         </div>
       )}
+
+      {/* Paginação da busca */}
+      {!loading && !error && busca && totalBusca > 0 && (
+        <div className="mt-4 flex items-center justify-between text-sm text-gray-500">
+          <span>
+            {totalBusca} resultado(s) para "{busca}"
+          </span>
+          <div className="flex items-center gap-3">
+            <button
+              onClick={() => setPagina(pagina - 1)}
+              disabled={pagina === 0}
+              className="px-3 py-1.5 border border-slate-300 rounded-md text-slate-700 bg-slate-50 hover:bg-slate-100 disabled:opacity-50"
+            >
+              Anterior
+            </button>
+            <span>
+              Página {pagina + 1} de {totalPaginas}
+            </span>
+            <button
+              onClick={() => setPagina(pagina + 1)}
+              disabled={pagina + 1 >= totalPaginas}
+              className="px-3 py-1.5 border border-slate-300 rounded-md text-slate-700 bg-slate-50 hover:bg-slate-100 disabled:opacity-50"
+            >
+              Próxima
+            </button>
+          </div>
+        </div>
+      )}
     </div>
   );
 }
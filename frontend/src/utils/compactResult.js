@@ -0,0 +1,103 @@
+// Decodificador do formato compacto (colunar) de resultados - "compact-v1".
+// Espelha backend/services/result_codec.py (decodificar_output).
+
+export const COMPACT_MEDIA_TYPE = 'application/vnd.servfaz.compact+json';
+
+const decodeTable = (table, headers) => {
+  const cols = table.cols;
+  const rowCount = cols.length > 0 ? cols[0].length : 0;
+  const rows = [];
+
+  for (let i = 0; i < rowCount; i++) {
+    rows.push(cols.map((col) => col[i]));
+  }
+
+  const block = {
+    titulo: table.titulo,
+    header: [...headers[table.h]],
+    rows,
+  };
+
+  if (table.total) {
+    block.total = table.total;
+  }
+
+  return block;
+};
+
+// Converte o output compacto para { results_base, results_atualizados, correcao_ate }
+export const decodeCompactOutput = (compact) => {
+  if (!compact || compact.formato !== 'compact-v1') {
+    return compact;
+  }
+
+  const { headers } = compact;
+  const base = compact.results_base.map((table) => decodeTable(table, headers));
+  let atualizados = null;
+
+  if (compact.results_atualizados) {
+    const { sufixo, tabelas } = compact.results_atualizados;
+
+    atualizados = tabelas.map((delta, index) => {
+      if (delta.tabela) {
+        return decodeTable(delta.tabela, headers);
+      }
+
+      const baseTable = base[index];
+      const rows = baseTable.rows.map((row) => [...row]);
+      const total = baseTable.total ? [...baseTable.total] : null;
+
+      delta.c.forEach((coluna, j) => {
+        rows.forEach((row, i) => {
+          row[coluna] = delta.v[j][i];
+        });
+        if (total && delta.t) {
+          total[coluna] = delta.t[j];
+        }
+      });
+
+      const block = {
+        titulo: baseTable.titulo + sufixo,
+        header: [...baseTable.header],
+        rows,
+      };
+
+      if (total) {
+        block.total = total;
+      }
+
+      return block;
+    });
+  }
+
+  return {
+    results_base: base,
+    results_atualizados: atualizados,
+    correcao_ate: compact.correcao_ate,
+  };
+};
+
+// Resposta de POST /calculate no formato compacto → formato padrão
+export const decodeCompactCalculation = (data) => {
+  if (!data || data.formato !== 'compact-v1') {
+    return data;
+  }
+
+  return {
+    id: data.id,
+    created_at: data.created_at,
+    ...decodeCompactOutput(data),
+  };
+};
+
+// Resposta de GET /results/{id} no formato compacto → formato padrão
+export const decodeCompactStoredResult = (data) => {
+  if (!data || !data.output_data) {
+    return data;
+  }
+
+  return {
+    ...data,
+    output_data: decodeCompactOutput(data.output_data),
+  };
+};
@@ -0,0 +1,264 @@
+"""
+Teste de carga ponta a ponta da API com motor de cálculo falso.
+
+Sobe, no mesmo processo:
+- um servidor BCB local (mock da série SGS 4390 - SELIC mensal)
+- a API FastAPI (uvicorn) com CALC_ENGINE=fake e banco/cache temporários
+
+e dispara tráfego concorrente de calculate / list / get, reportando por
+etapa: vazão, latência p50/p95/p99 e taxa de erro.
+
+Uso:
+    python scripts/load_test.py --usuarios 16 --duracao 30 --latencia-ms 800
+    python scripts/load_test.py --gravacoes data/gravacoes --saida relatorio.json
+    python scripts/load_test.py --workers 3       # via fila de jobs + 3 processos worker
+
+Com --gravacoes, o FakeEngine reproduz saídas reais gravadas pelo ExcelEngine
+(ENGINE_GRAVACOES_DIR); sem elas, usa tabelas sintéticas com o layout real.
+"""
+
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+
+MUNICIPIOS = [
+    "Fortaleza", "Caucaia", "Maracanaú", "Sobral", "Juazeiro do Norte",
+    "Crato", "Itapipoca", "Maranguape", "Iguatu", "Quixadá",
+]
+
+
+def porta_livre() -> int:
+    """Retorna uma porta TCP livre em 127.0.0.1."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class MockBCBHandler(BaseHTTPRequestHandler):
+    """Responde como a API SGS do BCB com uma série SELIC mensal sintética."""
+
+    def do_GET(self):
+        gerador = random.Random(4390)
+        serie = []
+        hoje = date.today()
+        for ano in range(2000, hoje.year + 1):
+            for mes in range(1, 13):
+                if (ano, mes) > (hoje.year, hoje.month):
+                    break
+                serie.append({"data": f"01/{mes:02d}/{ano}", "valor": f"{gerador.uniform(0.4, 1.4):.2f}"})
+
+        corpo = json.dumps(serie).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def iniciar_mock_bcb() -> str:
+    """Sobe o mock do BCB em uma thread e retorna a URL da série."""
+    porta = porta_livre()
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), MockBCBHandler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{porta}/dados/serie/bcdata.sgs.4390/dados?formato=json"
+
+
+def iniciar_api(args, diretorio: Path) -> str:
+    """Configura o ambiente, sobe a API com uvicorn em uma thread e retorna a URL base."""
+    os.environ["CALC_ENGINE"] = "fake"
+    os.environ["FAKE_ENGINE_LATENCIA_MS"] = str(args.latencia_ms)
+    os.environ["FAKE_ENGINE_JITTER_MS"] = str(args.jitter_ms)
+    os.environ["DATABASE_URL"] = str(diretorio / "results.db")
+    os.environ["SELIC_CACHE_PATH"] = str(diretorio / "selic_cache.json")
+    os.environ["SELIC_API_URL"] = iniciar_mock_bcb()
+    if args.gravacoes:
+        os.environ["ENGINE_GRAVACOES_DIR"] = str(Path(args.gravacoes).absolute())
+    if args.workers:
+        os.environ["CALC_DISPATCH"] = "fila"
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    import uvicorn
+    import main
+
+    porta = porta_livre()
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=porta, log_level="warning")
+    servidor = uvicorn.Server(config)
+    threading.Thread(target=servidor.run, daemon=True).start()
+
+    url = f"http://127.0.0.1:{porta}"
+    for _ in range(100):
+        try:
+            # /readyz: só mede depois do aquecimento (banco, SELIC, motor)
+            if httpx.get(url + "/readyz", timeout=1.0).status_code == 200:
+                return url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("API não ficou pronta a tempo")
+
+
+def gerar_entrada(gerador: random.Random, repeticao: float) -> dict:
+    """Entrada aleatória; com probabilidade `repeticao`, um caso padrão repetido."""
+    if gerador.random() < repeticao:
+        gerador = random.Random(0)
+
+    ano = gerador.randint(2005, 2015)
+    return {
+        "município": gerador.choice(MUNICIPIOS),
+        "ajuizamento": f"01/{gerador.randint(1, 12):02d}/{ano}",
+        "citação": f"01/{gerador.randint(1, 12):02d}/{ano + 1}",
+        "início_cálculo": "01/01/1998",
+        "final_cálculo": "31/12/2006",
+        "honorários_s_valor_da_condenação": gerador.choice([5, 10, 15, 20]),
+        "honorários_em_valor_fixo": 0,
+        "deságio_a_aplicar_sobre_o_principal": gerador.choice([0, 10, 20, 30]),
+        "deságio_em_a_aplicar_em_honorários": gerador.choice([0, 10]),
+        "correção_até": gerador.choice(["01/01/2025", "01/03/2025", "01/06/2025"]),
+    }
+
+
+class Coletor:
+    """Acumula latências e erros por etapa (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.amostras = {}
+
+    def registrar(self, etapa: str, segundos: float, ok: bool) -> None:
+        with self._lock:
+            self.amostras.setdefault(etapa, []).append((segundos, ok))
+
+    def relatorio(self, duracao: float) -> dict:
+        resultado = {}
+        for etapa, amostras in sorted(self.amostras.items()):
+            latencias = sorted(s for s, _ in amostras)
+            erros = sum(1 for _, ok in amostras if not ok)
+
+            def percentil(p: float) -> float:
+                indice = min(len(latencias) - 1, max(0, round(p / 100 * len(latencias)) - 1))
+                return latencias[indice] * 1000
+
+            resultado[etapa] = {
+                "requisicoes": len(amostras),
+                "vazao_rps": round(len(amostras) / duracao, 2),
+                "p50_ms": round(percentil(50), 1),
+                "p95_ms": round(percentil(95), 1),
+                "p99_ms": round(percentil(99), 1),
+                "taxa_erro": round(erros / len(amostras), 4),
+            }
+        return resultado
+
+
+def usuario(url: str, args, indice: int, fim: float, coletor: Coletor, ids: list) -> None:
+    """Loop de um usuário virtual: sorteia a etapa conforme o mix e dispara."""
+    gerador = random.Random(indice)
+    etapas = ["calculate", "list", "get"]
+    pesos = [args.mix_calculate, args.mix_list, args.mix_get]
+
+    with httpx.Client(base_url=url, timeout=args.timeout) as cliente:
+        while time.monotonic() < fim:
+            etapa = gerador.choices(etapas, pesos)[0]
+            if etapa == "get" and not ids:
+                etapa = "calculate"
+
+            inicio = time.perf_counter()
+            try:
+                if etapa == "calculate":
+                    resposta = cliente.post("/calculate", json=gerar_entrada(gerador, args.repeticao))
+                    if resposta.status_code == 200:
+                        ids.append(resposta.json()["id"])
+                elif etapa == "list":
+                    resposta = cliente.get("/results")
+                else:
+                    resposta = cliente.get(f"/results/{gerador.choice(ids)}")
+                ok = resposta.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+
+            coletor.registrar(etapa, time.perf_counter() - inicio, ok)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da API com motor falso")
+    parser.add_argument("--usuarios", type=int, default=8, help="Usuários virtuais concorrentes")
+    parser.add_argument("--duracao", type=float, default=20, help="Duração em segundos")
+    parser.add_argument("--latencia-ms", type=float, default=500, help="Latência simulada do motor")
+    parser.add_argument("--jitter-ms", type=float, default=200, help="Variação aleatória da latência")
+    parser.add_argument("--mix-calculate", type=float, default=2)
+    parser.add_argument("--mix-list", type=float, default=1)
+    parser.add_argument("--mix-get", type=float, default=3)
+    parser.add_argument("--repeticao", type=float, default=0.2, help="Fração de casos repetidos")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--gravacoes", help="Diretório com gravações do ExcelEngine")
+    parser.add_argument("--saida", help="Arquivo JSON para salvar o relatório")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Despachar os cálculos pela fila de jobs para N processos worker")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        url = iniciar_api(args, Path(diretorio))
+        workers = None
+        if args.workers:
+            # Herdam o ambiente configurado em iniciar_api (motor fake, banco temporário)
+            workers = subprocess.Popen(
+                [sys.executable, str(Path(__file__).parent / "worker.py"), "--processos", str(args.workers)],
+                stdout=subprocess.DEVNULL
+            )
+        print(f"🚀 API em {url} | {args.usuarios} usuários por {args.duracao}s"
+              + (f" | {args.workers} workers" if args.workers else ""))
+
+        coletor = Coletor()
+        ids: list = []
+        fim = time.monotonic() + args.duracao
+        threads = [
+            threading.Thread(target=usuario, args=(url, args, i, fim, coletor, ids))
+            for i in range(args.usuarios)
+        ]
+        inicio = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        duracao = time.monotonic() - inicio
+
+        relatorio = coletor.relatorio(duracao)
+        metricas = httpx.get(url + "/metrics").json()
+
+        if workers:
+            workers.send_signal(signal.SIGINT)
+            workers.wait()
+
+    print(f"\n{'etapa':<12}{'req':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erro':>8}")
+    for etapa, r in relatorio.items():
+        print(
+            f"{etapa:<12}{r['requisicoes']:>8}{r['vazao_rps']:>9}{r['p50_ms']:>10}"
+            f"{r['p95_ms']:>10}{r['p99_ms']:>10}{r['taxa_erro']:>8.2%}"
+        )
+    print(f"\nMétricas da API: {metricas}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({"parametros": vars(args), "etapas": relatorio, "metricas": metricas}, f, indent=2)
+        print(f"💾 Relatório salvo em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
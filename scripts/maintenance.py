@@ -0,0 +1,52 @@
+"""
+Manutenção do banco de resultados: arquivamento, vacuum incremental e métricas.
+
+Usa o mesmo banco da API (DATABASE_URL, ARCHIVE_DIR) sem carregar o motor de
+cálculo: pode rodar com a API no ar (o SQLite em WAL serializa as escritas).
+
+Uso:
+    python scripts/maintenance.py --arquivar-dias 365
+    python scripts/maintenance.py --arquivar-dias 365 --vacuum-paginas 20000
+    python scripts/maintenance.py --relatorio --detalhar
+
+Agendamento (ex.: 03:30 todo dia):
+    cron:     30 3 * * *  cd /srv/servfaz && python scripts/maintenance.py --arquivar-dias 365
+    Windows:  schtasks /Create /SC DAILY /ST 03:30 /TN servfaz-manutencao /TR "python scripts\\maintenance.py --arquivar-dias 365"
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manutenção do banco de resultados")
+    parser.add_argument("--arquivar-dias", type=int, default=int(os.getenv("RETENTION_ARCHIVE_DAYS", "0")),
+                        help="Arquivar resultados com mais de N dias (0 = não arquivar)")
+    parser.add_argument("--vacuum-paginas", type=int, default=int(os.getenv("VACUUM_MAX_PAGINAS", "0")),
+                        help="Máximo de páginas liberadas (0 = todas)")
+    parser.add_argument("--relatorio", action="store_true", help="Apenas mostrar tamanho e fragmentação")
+    parser.add_argument("--detalhar", action="store_true", help="Incluir espaço por tabela no relatório")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from database import init_database
+    from services.maintenance import Manutencao
+
+    db_path = os.getenv(
+        "DATABASE_URL", str(BACKEND_DIR.parent / "data" / "results.db")
+    ).replace("sqlite:///", "")
+    manutencao = Manutencao(init_database(db_path, arquivo_dir=os.getenv("ARCHIVE_DIR")),
+                            args.arquivar_dias, args.vacuum_paginas)
+
+    if not args.relatorio:
+        manutencao.executar()
+    print(json.dumps(manutencao.relatorio(args.detalhar), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
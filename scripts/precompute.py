@@ -0,0 +1,67 @@
+"""
+Pré-cálculo dos cenários padrão (municípios × presets) fora do horário de pico.
+
+Carrega a mesma configuração da API (variáveis de ambiente: CALC_ENGINE,
+EXCEL_FILE_PATH, DATABASE_URL, CALC_DISPATCH, ...), aquece o motor, calcula os
+casos do plano ainda não cobertos pelo cache de resultados e imprime o resumo.
+Com CALC_DISPATCH=fila, os casos são enfileirados e os workers calculam em
+paralelo (use --paralelo com o número de workers).
+
+Uso:
+    python scripts/precompute.py --plano data/precompute.example.json
+    python scripts/precompute.py --plano meu_plano.json --paralelo 4 --forcar
+    python scripts/precompute.py --plano meu_plano.json --relatorio
+
+Agendamento (ex.: 02:00 todo dia):
+    cron:     0 2 * * *  cd /srv/servfaz && python scripts/precompute.py --plano data/precompute.json
+    Windows:  schtasks /Create /SC DAILY /ST 02:00 /TN servfaz-precompute /TR "python scripts\\precompute.py --plano data\\precompute.json"
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-cálculo dos cenários padrão")
+    parser.add_argument("--plano", default=os.getenv("PRECOMPUTE_PLANO"), help="Plano JSON (municípios × presets)")
+    parser.add_argument("--paralelo", type=int, default=int(os.getenv("PRECOMPUTE_PARALELO", "1")),
+                        help="Casos calculados ao mesmo tempo")
+    parser.add_argument("--forcar", action="store_true", help="Recalcular casos já cobertos pelo cache")
+    parser.add_argument("--relatorio", action="store_true", help="Apenas mostrar cobertura e taxa de acerto")
+    args = parser.parse_args()
+
+    if not args.plano:
+        parser.error("informe --plano (ou PRECOMPUTE_PLANO)")
+
+    # Resultados gravados antes de registrá-los no cache
+    os.environ["STORAGE_WRITE_BEHIND"] = "0"
+    os.environ["PRECOMPUTE_PLANO"] = args.plano
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    import main as api
+    from services.precompute import carregar_plano, gerar_casos
+
+    api.warmup.iniciar()
+    if not api.warmup.aguardar():
+        print(f"⚠️ Aquecimento incompleto: {api.warmup.estado()}")
+
+    try:
+        if args.relatorio:
+            resultado = api.precomputador.relatorio(gerar_casos(carregar_plano(args.plano)))
+        else:
+            resultado = api.executar_precompute(args.plano, args.paralelo, args.forcar)
+    finally:
+        api.engine.encerrar()
+
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    if not args.relatorio and resultado["erros"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Recorreção em lote de resultados salvos para uma nova data, sem Excel.
+
+Aplica só a camada SELIC sobre os resultados base já salvos e grava novos
+resultados ligados aos originais (origem_id). Usa o mesmo banco e cache da
+SELIC da API (DATABASE_URL, ARCHIVE_DIR, SELIC_CACHE_PATH, SELIC_PRECISAO)
+sem carregar o motor de cálculo.
+
+Uso:
+    python scripts/recorrecao.py --correcao-ate 01/11/2025 --desde 2025-10-01
+    python scripts/recorrecao.py --correcao-ate 01/11/2025 --ids 3f2a...,9b1c...
+    python scripts/recorrecao.py --correcao-ate 01/11/2025 --ids-arquivo ids.txt --municipio Niterói
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recorreção em lote (só SELIC) de resultados salvos")
+    parser.add_argument("--correcao-ate", required=True, help="Nova data de correção (DD/MM/AAAA)")
+    parser.add_argument("--ids", help="IDs separados por vírgula")
+    parser.add_argument("--ids-arquivo", help="Arquivo com um ID por linha")
+    parser.add_argument("--desde", help="Criados a partir de (YYYY-MM-DD)")
+    parser.add_argument("--ate", help="Criados até (YYYY-MM-DD)")
+    parser.add_argument("--municipio", help="Filtrar um município")
+    parser.add_argument("--detalhar", action="store_true", help="Listar os resultados criados e ignorados")
+    args = parser.parse_args()
+
+    ids = [i.strip() for i in (args.ids or "").split(",") if i.strip()]
+    if args.ids_arquivo:
+        ids += [linha.strip() for linha in Path(args.ids_arquivo).read_text(encoding="utf-8").splitlines() if linha.strip()]
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from database import init_database
+    from services.recorrecao import Recorretor
+    from services.selic_updater import SelicUpdater
+
+    db_path = os.getenv(
+        "DATABASE_URL", str(BACKEND_DIR.parent / "data" / "results.db")
+    ).replace("sqlite:///", "")
+    updater = SelicUpdater(
+        os.getenv("SELIC_CACHE_PATH", str(BACKEND_DIR.parent / "data" / "selic_cache.json")),
+        os.getenv("SELIC_PRECISAO", "mensal")
+    )
+    recorretor = Recorretor(init_database(db_path, arquivo_dir=os.getenv("ARCHIVE_DIR")), updater)
+
+    try:
+        resumo = recorretor.recorrigir(args.correcao_ate, ids or None, args.desde, args.ate, args.municipio)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if not args.detalhar:
+        resumo = {**resumo, "criados": len(resumo["criados"]), "ignorados": len(resumo["ignorados"])}
+    print(json.dumps(resumo, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
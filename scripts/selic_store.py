@@ -0,0 +1,60 @@
+"""
+Importa/exporta o cache SELIC entre o JSON antigo e o formato binário.
+
+Uso:
+    python scripts/selic_store.py importar data/selic_cache.json data/selic_cache.bin
+    python scripts/selic_store.py exportar data/selic_cache.bin data/selic_cache.json
+    python scripts/selic_store.py info data/selic_cache.bin
+"""
+
+import argparse
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from services.selic_store import SelicStore, exportar_json, importar_json
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversão do cache SELIC (JSON ↔ binário)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    importar = sub.add_parser("importar", help="JSON → binário")
+    importar.add_argument("json_path")
+    importar.add_argument("bin_path")
+
+    exportar = sub.add_parser("exportar", help="binário → JSON")
+    exportar.add_argument("bin_path")
+    exportar.add_argument("json_path")
+
+    info = sub.add_parser("info", help="Resumo do arquivo binário")
+    info.add_argument("bin_path")
+
+    args = parser.parse_args()
+
+    if args.comando == "importar":
+        meses = importar_json(args.json_path, args.bin_path)
+        print(f"✅ {meses} meses importados para {args.bin_path}")
+    elif args.comando == "exportar":
+        meses = exportar_json(args.bin_path, args.json_path)
+        print(f"✅ {meses} meses exportados para {args.json_path}")
+    else:
+        store = SelicStore.abrir(args.bin_path)
+        serie = store.para_dict()
+        if not serie:
+            print("Arquivo vazio ou inexistente")
+            return
+        if store.diaria:
+            fator = store.fator_periodo(store.primeiro_dia(), store.ultimo_dia() + timedelta(days=1))
+            print(f"Série diária: {min(serie)} a {max(serie)} ({len(serie)} dias com taxa, {store.n_lacunas} sem taxa)")
+        else:
+            fator = store.fator_composto(min(serie), max(serie))
+            print(f"Série mensal: {min(serie)} a {max(serie)} ({len(serie)} meses com taxa, {store.n_lacunas} lacunas)")
+        print(f"Fator acumulado do período: {fator:.6f}" if fator else "Fator acumulado indisponível (lacunas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Teste de ida e volta da exportação do histórico (XLSX e Parquet).
+
+Exporta resultados sintéticos (FakeEngine) e relê o arquivo gerado com a
+própria biblioteca do formato, conferindo colunas, descrições e valores.
+Cada formato é pulado quando a biblioteca opcional (openpyxl / pyarrow) não
+está instalada.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Adicionar backend ao path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+
+from services import export
+from services.engine import FakeEngine
+
+ENTRADA = {
+    "município": "Fortaleza",
+    "ajuizamento": "01/03/2010",
+    "citação": "01/06/2010",
+    "início_cálculo": "01/01/1998",
+    "final_cálculo": "31/12/2006",
+    "honorários_s_valor_da_condenação": 10,
+    "honorários_em_valor_fixo": 0,
+    "deságio_a_aplicar_sobre_o_principal": 20,
+    "deságio_em_a_aplicar_em_honorários": 0,
+    "correção_até": "01/06/2025",
+}
+
+
+def _resultados():
+    """Dois resultados: o do FakeEngine e uma tabela com descrições não textuais."""
+    base = FakeEngine(str(ROOT_DIR / "data" / "selic_mapping.json")).executar(ENTRADA).para_tabelas()
+    numerica = {
+        "titulo": "PARCELAS POR ANO",
+        "header": ["Ano", "Valor Corrigido Mensal"],
+        "rows": [[2010, 100.0], [None, 50.0], ["2011", 25.5]],
+        "total": ["TOTAL", 175.5],
+    }
+    return [
+        ("id-1", "2025-06-01T10:00:00", "v1", ENTRADA, {"results_base": base, "results_atualizados": []}),
+        ("id-2", "2025-06-02T10:00:00", None, ENTRADA, {"results_base": [numerica], "results_atualizados": []}),
+    ]
+
+
+def _esperado(resultados, headers):
+    """Linhas que o arquivo deve conter (as mesmas do CSV)."""
+    return [
+        tuple(linha)
+        for linha in export.gerar_linhas(resultados, export.colunas_valores(headers))
+    ]
+
+
+def _gravar(formato, resultados, headers, diretorio):
+    caminho = os.path.join(diretorio, f"export.{export.FORMATOS[formato][1]}")
+    with open(caminho, "wb") as f:
+        for bloco in export.exportar(formato, resultados, headers):
+            f.write(bloco)
+    return caminho
+
+
+def test_descricao_texto():
+    """
+    Descrições numéricas viram texto; ausentes continuam None.
+    """
+    print("🧪 Testando descrição das linhas exportadas...\n")
+    resultados = _resultados()
+    headers = [tabela["header"] for tabela in resultados[1][4]["results_base"]]
+    descricoes = [linha[8] for linha in export.gerar_linhas(resultados[1:], export.colunas_valores(headers))]
+    print(f"   Descrições: {descricoes}")
+    assert descricoes == ["2010", None, "2011", "TOTAL"], f"Erro: descrições inesperadas {descricoes}"
+    print("   ✅ Passou!\n")
+
+
+def test_export_xlsx():
+    """
+    XLSX exportado e relido com openpyxl.
+    """
+    print("🧪 Testando exportação XLSX...\n")
+    if export.openpyxl is None:
+        print("   ⏭️ openpyxl não instalado: pulado\n")
+        return
+
+    resultados = _resultados()
+    headers = [tabela["header"] for _, _, _, _, saida in resultados for tabela in saida["results_base"]]
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = _gravar("xlsx", resultados, headers, diretorio)
+        workbook = export.openpyxl.load_workbook(caminho, read_only=True)
+        linhas = list(workbook.worksheets[0].iter_rows(values_only=True))
+        workbook.close()
+
+    colunas = export.COLUNAS_FIXAS + export.colunas_valores(headers)
+    # Células vazias no fim da linha não são gravadas pelo modo write-only
+    linhas = [tuple(linha) + (None,) * (len(colunas) - len(linha)) for linha in linhas]
+    print(f"   Linhas: {len(linhas) - 1}")
+    assert list(linhas[0]) == colunas, "Erro: cabeçalho diferente"
+    assert linhas[1:] == _esperado(resultados, headers), "Erro: conteúdo diferente do exportado"
+    print("   ✅ Passou!\n")
+
+
+def test_export_parquet():
+    """
+    Parquet exportado e relido com pyarrow (inclusive descrições numéricas).
+    """
+    print("🧪 Testando exportação Parquet...\n")
+    if export.pyarrow is None:
+        print("   ⏭️ pyarrow não instalado: pulado\n")
+        return
+
+    resultados = _resultados()
+    headers = [tabela["header"] for _, _, _, _, saida in resultados for tabela in saida["results_base"]]
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = _gravar("parquet", resultados, headers, diretorio)
+        tabela = export.pyarrow.parquet.read_table(caminho)
+
+    colunas = export.COLUNAS_FIXAS + export.colunas_valores(headers)
+    linhas = [tuple(linha[nome] for nome in colunas) for linha in tabela.to_pylist()]
+    print(f"   Linhas: {len(linhas)}")
+    assert tabela.column_names == colunas, "Erro: colunas diferentes"
+    assert tabela.schema.field("descricao").type == export.pyarrow.string()
+    assert linhas == _esperado(resultados, headers), "Erro: conteúdo diferente do exportado"
+    print("   ✅ Passou!\n")
+
+
+if __name__ == "__main__":
+    test_descricao_texto()
+    test_export_xlsx()
+    test_export_parquet()
+    print("🎉 Testes da exportação passaram com sucesso!")
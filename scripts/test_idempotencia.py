@@ -0,0 +1,128 @@
+"""
+Teste do header Idempotency-Key em /calculate (API com motor falso).
+
+Sobe a API no mesmo processo (TestClient) com CALC_ENGINE=fake, banco e
+cache SELIC temporários e o mock do BCB do teste de carga; nada de Excel
+nem de rede.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from load_test import iniciar_mock_bcb
+
+ENTRADA = {
+    "município": "Fortaleza",
+    "ajuizamento": "01/03/2010",
+    "citação": "01/06/2010",
+    "início_cálculo": "01/01/1998",
+    "final_cálculo": "31/12/2006",
+    "honorários_s_valor_da_condenação": 10,
+    "honorários_em_valor_fixo": 0,
+    "deságio_a_aplicar_sobre_o_principal": 0,
+    "deságio_em_a_aplicar_em_honorários": 0,
+    "correção_até": "01/06/2025",
+}
+OUTRA_ENTRADA = {**ENTRADA, "município": "Sobral"}
+
+
+def _total_resultados(main):
+    return len(main.storage.list_results(limit=1000))
+
+
+def _em_paralelo(cliente, corpos, chave):
+    """Dispara os POSTs ao mesmo tempo (o motor falso segura cada um por 300ms)."""
+    respostas = [None] * len(corpos)
+    largada = threading.Barrier(len(corpos))
+
+    def enviar(indice):
+        largada.wait()
+        respostas[indice] = cliente.post("/calculate", json=corpos[indice], headers={"Idempotency-Key": chave})
+
+    threads = [threading.Thread(target=enviar, args=(i,)) for i in range(len(corpos))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return respostas
+
+
+def test_idempotencia(main):
+    """
+    Mesma chave: replay com o mesmo corpo, 422 com outro corpo e um único
+    cálculo para retentativas simultâneas.
+    """
+    from fastapi.testclient import TestClient
+
+    print("🧪 Testando Idempotency-Key...\n")
+
+    with TestClient(main.app) as cliente:
+        # Teste 1: mesma chave e mesmo corpo → mesmo resultado, sem novo registro
+        print("📝 Teste 1: replay com o mesmo corpo")
+        primeira = cliente.post("/calculate", json=ENTRADA, headers={"Idempotency-Key": "chave-1"})
+        assert primeira.status_code == 200, f"Erro: {primeira.status_code} {primeira.text}"
+        assert "Idempotent-Replayed" not in primeira.headers
+        total = _total_resultados(main)
+
+        replay = cliente.post("/calculate", json=ENTRADA, headers={"Idempotency-Key": "chave-1"})
+        assert replay.status_code == 200, f"Erro: {replay.status_code} {replay.text}"
+        assert replay.headers.get("Idempotent-Replayed") == "true", "Erro: replay sem header"
+        assert replay.json()["id"] == primeira.json()["id"], "Erro: replay com outro ID"
+        assert replay.json() == primeira.json(), "Erro: replay com outro corpo de resposta"
+        assert _total_resultados(main) == total, "Erro: replay gravou novo resultado"
+        print(f"   ID: {replay.json()['id']}")
+        print("   ✅ Passou!\n")
+
+        # Teste 2: mesma chave com outro corpo → 422, nada calculado
+        print("📝 Teste 2: mesma chave com outro corpo")
+        outra = cliente.post("/calculate", json=OUTRA_ENTRADA, headers={"Idempotency-Key": "chave-1"})
+        assert outra.status_code == 422, f"Erro: esperado 422, obteve {outra.status_code}"
+        assert "Idempotency-Key" in outra.json()["detail"]
+        assert _total_resultados(main) == total, "Erro: corpo diferente gravou novo resultado"
+        print(f"   {outra.json()['detail']}")
+        print("   ✅ Passou!\n")
+
+        # Teste 3: retentativas simultâneas com a mesma chave → um único cálculo
+        print("📝 Teste 3: requisições simultâneas com a mesma chave")
+        respostas = _em_paralelo(cliente, [ENTRADA] * 4, "chave-2")
+        assert all(r is not None and r.status_code == 200 for r in respostas), \
+            f"Erro: {[r.status_code if r else None for r in respostas]}"
+        ids = {r.json()["id"] for r in respostas}
+        replays = sum(r.headers.get("Idempotent-Replayed") == "true" for r in respostas)
+        print(f"   IDs: {ids}, replays: {replays}")
+        assert len(ids) == 1, "Erro: mesma chave gerou resultados diferentes"
+        assert replays == 3, f"Erro: esperado 3 replays, obteve {replays}"
+        assert _total_resultados(main) == total + 1, "Erro: mais de um resultado gravado"
+        assert main.storage.get_idempotency_key("chave-2")["result_id"] in ids
+        print("   ✅ Passou!\n")
+
+        # Teste 4: simultâneas com a mesma chave e corpos diferentes → o segundo corpo recebe 422
+        print("📝 Teste 4: simultâneas com a mesma chave e corpos diferentes")
+        respostas = _em_paralelo(cliente, [ENTRADA, OUTRA_ENTRADA], "chave-3")
+        codigos = sorted(r.status_code for r in respostas)
+        print(f"   Status: {codigos}")
+        assert codigos == [200, 422], f"Erro: esperado [200, 422], obteve {codigos}"
+        assert _total_resultados(main) == total + 2, "Erro: corpo recusado gravou resultado"
+        print("   ✅ Passou!\n")
+
+    print("🎉 Testes da Idempotency-Key passaram com sucesso!")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as diretorio:
+        os.environ["CALC_ENGINE"] = "fake"
+        os.environ["FAKE_ENGINE_LATENCIA_MS"] = "300"
+        os.environ["DATABASE_URL"] = str(Path(diretorio) / "results.db")
+        os.environ["SELIC_CACHE_PATH"] = str(Path(diretorio) / "selic_cache.json")
+        os.environ["SELIC_API_URL"] = iniciar_mock_bcb()
+
+        import main
+
+        test_idempotencia(main)
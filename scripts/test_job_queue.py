@@ -0,0 +1,82 @@
+"""
+Teste da fila durável de jobs (SQLiteJobQueue): concessão expirada.
+
+Um worker reivindica um job com concessão curta e "morre"; depois que a
+concessão expira, outro worker retoma o job e o primeiro já não consegue
+concluí-lo nem renová-lo.
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from services.engine import CalculationEngine
+from services.job_queue import JobQueue, SQLiteJobQueue, STATUS_CONCLUIDO, STATUS_EXECUTANDO
+
+
+def test_interfaces():
+    """
+    JobQueue e CalculationEngine são abstratas.
+    """
+    print("🧪 Testando interfaces abstratas...\n")
+    for interface in (JobQueue, CalculationEngine):
+        try:
+            interface()
+            assert False, f"Erro: {interface.__name__} não deveria ser instanciável"
+        except TypeError as e:
+            print(f"   {interface.__name__}: {e}")
+    print("   ✅ Passou!\n")
+
+
+def test_concessao_expirada():
+    """
+    Job retomado por outro worker depois que a concessão expira.
+    """
+    print("🧪 Testando concessão expirada...\n")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        fila = SQLiteJobQueue(str(Path(diretorio) / "jobs.db"), max_tentativas=3)
+        job_id = fila.enfileirar({"município": "Fortaleza"})
+
+        # Teste 1: worker-1 reivindica com concessão curta
+        print("📝 Teste 1: reivindicação com concessão de 0.2s")
+        job = fila.reivindicar("worker-1", lease_segundos=0.2)
+        assert job is not None and job["id"] == job_id, "Erro: job não reivindicado"
+        assert job["tentativas"] == 1
+        assert fila.reivindicar("worker-2", lease_segundos=5) is None, "Erro: concessão vigente foi retomada"
+        print("   ✅ Passou!\n")
+
+        # Teste 2: concessão expira e worker-2 retoma
+        print("📝 Teste 2: worker-2 retoma após a expiração")
+        time.sleep(0.3)
+        retomado = fila.reivindicar("worker-2", lease_segundos=5)
+        assert retomado is not None and retomado["id"] == job_id, "Erro: job expirado não retomado"
+        assert retomado["tentativas"] == 2, f"Erro: esperado 2 tentativas, obteve {retomado['tentativas']}"
+        estado = fila.obter(job_id)
+        assert estado["status"] == STATUS_EXECUTANDO and estado["worker_id"] == "worker-2"
+        print("   ✅ Passou!\n")
+
+        # Teste 3: o worker que perdeu a concessão não conclui nem renova
+        print("📝 Teste 3: worker-1 não conclui o job retomado")
+        assert fila.concluir(job_id, "worker-1", "resultado-1") is False, "Erro: worker-1 concluiu job alheio"
+        assert fila.renovar(job_id, "worker-1", 5) is False, "Erro: worker-1 renovou job alheio"
+        assert fila.obter(job_id)["result_id"] is None
+        print("   ✅ Passou!\n")
+
+        # Teste 4: o novo dono conclui
+        print("📝 Teste 4: worker-2 conclui")
+        assert fila.concluir(job_id, "worker-2", "resultado-2") is True
+        estado = fila.obter(job_id)
+        assert estado["status"] == STATUS_CONCLUIDO and estado["result_id"] == "resultado-2"
+        print("   ✅ Passou!\n")
+
+    print("🎉 Testes da fila de jobs passaram com sucesso!")
+
+
+if __name__ == "__main__":
+    test_interfaces()
+    test_concessao_expirada()
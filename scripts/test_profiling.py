@@ -0,0 +1,58 @@
+"""
+Teste do perfilamento de requisições com o trabalho em outra thread.
+
+O Excel roda nas threads de sessão do ExcelPool enquanto a requisição só
+espera o futuro; o perfil salvo precisa conter o trabalho da sessão. Aqui a
+sessão é simulada por um ThreadPoolExecutor (sem Excel).
+"""
+
+import pstats
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from services.profiling import RequestProfiler, propagar
+
+
+def calculo_na_sessao(n):
+    """Trabalho de CPU identificável no perfil."""
+    return sum(i * i for i in range(n))
+
+
+def test_perfil_da_sessao():
+    """
+    O perfil da requisição inclui a função executada na thread da sessão.
+    """
+    print("🧪 Testando perfil com trabalho em thread de sessão...\n")
+
+    with tempfile.TemporaryDirectory() as diretorio, ThreadPoolExecutor(1, thread_name_prefix="sessao") as sessao:
+        profiler = RequestProfiler(True, diretorio, admin_token="segredo")
+
+        # Teste 1: sem perfilamento, propagar() não embrulha a função
+        print("📝 Teste 1: fora de perfilar()")
+        assert propagar(calculo_na_sessao) is calculo_na_sessao
+        print("   ✅ Passou!\n")
+
+        # Teste 2: a requisição só espera; o trabalho da sessão entra no perfil
+        print("📝 Teste 2: trabalho da sessão no perfil salvo")
+        with profiler.perfilar() as perfil:
+            resultado = sessao.submit(propagar(calculo_na_sessao), 200_000).result()
+        assert resultado == calculo_na_sessao(200_000)
+
+        caminho = profiler.salvar(perfil, "req-1")
+        funcoes = {funcao for _, _, funcao in pstats.Stats(str(caminho)).stats}
+        resumo = (Path(diretorio) / "req-1.txt").read_text(encoding="utf-8")
+        print(f"   Perfis de sessão: {len(perfil.sessoes)}")
+        assert "calculo_na_sessao" in funcoes, "Erro: trabalho da sessão ausente do .prof"
+        assert "calculo_na_sessao" in resumo, "Erro: trabalho da sessão ausente do resumo"
+        print("   ✅ Passou!\n")
+
+    print("🎉 Testes do perfilamento passaram com sucesso!")
+
+
+if __name__ == "__main__":
+    test_perfil_da_sessao()
@@ -0,0 +1,139 @@
+"""
+Teste da recorreção em lote (Recorretor) sem Excel e sem acesso à rede.
+
+Usa o FakeEngine para os results_base, um cache SELIC mensal sintético e um
+banco SQLite temporário. Confere que a recorreção produz os mesmos
+results_atualizados que o caminho do /calculate, que os novos resultados
+apontam para o original (origem_id) e que os casos não elegíveis voltam em
+"ignorados".
+"""
+
+import json
+import sys
+import tempfile
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+# Adicionar backend ao path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+
+from services.engine import FakeEngine
+from services.recorrecao import Recorretor
+from services.selic_updater import SelicUpdater
+from services.storage import Storage
+
+ENTRADA = {
+    "município": "Fortaleza",
+    "ajuizamento": "01/03/2010",
+    "citação": "01/06/2010",
+    "início_cálculo": "01/01/1998",
+    "final_cálculo": "31/12/2006",
+    "honorários_s_valor_da_condenação": 10,
+    "honorários_em_valor_fixo": 0,
+    "deságio_a_aplicar_sobre_o_principal": 20,
+    "deságio_em_a_aplicar_em_honorários": 0,
+    "correção_até": "01/06/2025",
+}
+
+
+def _salvar(storage, correcao_ate, output_data):
+    """Grava um resultado com a data de correção indicada e devolve o id."""
+    result_id = str(uuid.uuid4())
+    storage.save_results_batch([(
+        result_id,
+        datetime.now().isoformat(),
+        {**ENTRADA, "correção_até": correcao_ate},
+        output_data,
+        "v1",
+    )])
+    return result_id
+
+
+def test_recorrecao():
+    """
+    Testa a recorreção contra o caminho do /calculate.
+    """
+    print("🧪 Testando Recorretor...\n")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        # Cache SELIC mensal sintético (sem rede)
+        cache_path = Path(diretorio) / "selic_cache.json"
+        cache = {f"{ano:04d}-{mes:02d}": round(0.9 + mes / 100, 2) for ano in (2025, 2026) for mes in range(1, 13)}
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+
+        updater = SelicUpdater(str(cache_path))
+        storage = Storage(str(Path(diretorio) / "results.db"))
+        recorretor = Recorretor(storage, updater, lote=2)
+
+        resultado = FakeEngine(str(ROOT_DIR / "data" / "selic_mapping.json")).executar(ENTRADA)
+        base = resultado.para_tabelas()
+        output_original = {
+            "results_base": base,
+            "results_atualizados": updater.atualizar_resultados(base, "01/06/2025"),
+            "correcao_ate": "01/06/2025",
+        }
+
+        elegiveis = [_salvar(storage, "01/06/2025", output_original) for _ in range(3)]
+        anterior = _salvar(storage, "01/12/2024", output_original)
+        na_data = _salvar(storage, "01/10/2025", output_original)
+        sem_base = _salvar(storage, "01/06/2025", {"results_base": [], "results_atualizados": []})
+        inexistente = str(uuid.uuid4())
+
+        relatorio = recorretor.recorrigir(
+            "01/10/2025", ids=elegiveis + [anterior, na_data, sem_base, inexistente]
+        )
+
+        # Teste 1: mesmos results_atualizados do /calculate
+        print("📝 Teste 1: results_atualizados iguais aos do /calculate")
+        esperado_calculate = updater.atualizar_result_set(resultado, "01/10/2025").para_tabelas()
+        esperado_lista = updater.atualizar_resultados(base, "01/10/2025")
+        assert esperado_calculate == esperado_lista, "Erro: ResultSet e lista divergem"
+        assert len(relatorio["criados"]) == 3, f"Erro: esperado 3 criados, obteve {relatorio['criados']}"
+        for criado in relatorio["criados"]:
+            novo = storage.get_result(criado["id"])
+            assert novo["output_data"]["results_atualizados"] == esperado_calculate, "Erro: recorreção difere do /calculate"
+            assert novo["output_data"]["results_base"] == base, "Erro: results_base alterado"
+            assert novo["input_data"]["correção_até"] == "01/10/2025"
+        print(f"   Fator: {relatorio['fator']}")
+        print("   ✅ Passou!\n")
+
+        # Teste 2: novos resultados ligados ao original
+        print("📝 Teste 2: origem_id nos novos resultados")
+        for criado in relatorio["criados"]:
+            novo = storage.get_result(criado["id"])
+            assert novo["origem_id"] == criado["origem_id"], "Erro: origem_id não gravado"
+            assert novo["workbook_version"] == "v1", "Erro: workbook_version do original perdida"
+        assert sorted(c["origem_id"] for c in relatorio["criados"]) == sorted(elegiveis)
+        print("   ✅ Passou!\n")
+
+        # Teste 3: não elegíveis em "ignorados"
+        print("📝 Teste 3: ignorados")
+        motivos = {item["id"]: item["motivo"] for item in relatorio["ignorados"]}
+        for result_id, motivo in motivos.items():
+            print(f"   {result_id[:8]}: {motivo}")
+        assert "anterior a 01/01/2025" in motivos[anterior], "Erro: origem anterior a 2025 não ignorada"
+        assert motivos[na_data] == "já corrigido até 01/10/2025", "Erro: origem já na data não ignorada"
+        assert motivos[sem_base] == "sem results_base", "Erro: origem sem results_base não ignorada"
+        assert motivos[inexistente] == "não encontrado"
+        assert len(motivos) == 4
+        print("   ✅ Passou!\n")
+
+        # Teste 4: data não posterior a 01/01/2025 é recusada
+        print("📝 Teste 4: data de correção na data base")
+        try:
+            recorretor.recorrigir("01/01/2025", ids=elegiveis)
+            assert False, "Erro: deveria recusar a data base"
+        except ValueError as e:
+            print(f"   Recusado: {e}")
+        print("   ✅ Passou!\n")
+
+        updater.selic_api.cache.close()
+
+    print("🎉 Testes da recorreção passaram com sucesso!")
+
+
+if __name__ == "__main__":
+    test_recorrecao()
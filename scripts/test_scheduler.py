@@ -0,0 +1,172 @@
+"""
+Teste do Escalonador com carga mista (interativo, lote e pré-cálculo).
+
+Os pedidos entram um de cada vez (cada um só depois de o anterior estar na
+fila) e as vagas são ocupadas/liberadas sob controle do teste, então a ordem
+de atendimento é determinística: a fila justa segue os pesos e o limite por
+cliente segura os pedidos excedentes sem travar os demais clientes.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from services.scheduler import CLASSE_INTERATIVA, CLASSE_LOTE, CLASSE_PRECALCULO, Escalonador
+
+
+class _Calculo(threading.Thread):
+    """Pedido que ocupa a vaga até `soltar` ser sinalizado."""
+
+    def __init__(self, escalonador, nome, classe, cliente=None, atendidos=None, segurar=False):
+        super().__init__(daemon=True)
+        self.escalonador = escalonador
+        self.nome = nome
+        self.classe = classe
+        self.cliente = cliente
+        self.atendidos = atendidos if atendidos is not None else []
+        self.em_execucao = threading.Event()
+        self.soltar = threading.Event()
+        if not segurar:
+            self.soltar.set()
+
+    def run(self):
+        with self.escalonador.vaga(self.classe, self.cliente):
+            self.atendidos.append(self.nome)
+            self.em_execucao.set()
+            self.soltar.wait(5)
+
+
+def _aguardar(condicao, timeout=5.0):
+    limite = time.monotonic() + timeout
+    while not condicao():
+        assert time.monotonic() < limite, "Erro: tempo esgotado aguardando o escalonador"
+        time.sleep(0.001)
+
+
+def _na_fila(escalonador):
+    return sum(classe["na_fila"] for classe in escalonador.estado()["classes"].values())
+
+
+def _enfileirar(escalonador, calculo):
+    """Inicia o pedido e espera ele entrar na fila (ordem de chegada fixa)."""
+    antes = _na_fila(escalonador)
+    calculo.start()
+    _aguardar(lambda: _na_fila(escalonador) == antes + 1)
+    return calculo
+
+
+def test_pesos():
+    """
+    Com todas as classes na fila, as vagas seguem os pesos 8/2/1.
+    """
+    print("🧪 Testando fila justa ponderada...\n")
+
+    escalonador = Escalonador(capacidade=1)
+    atendidos = []
+
+    # Uma vaga ocupada: tudo o que chega depois espera na fila
+    bloqueio = _Calculo(escalonador, "bloqueio", CLASSE_INTERATIVA, atendidos=atendidos, segurar=True)
+    bloqueio.start()
+    assert bloqueio.em_execucao.wait(5)
+
+    pedidos = (
+        [(f"I{i}", CLASSE_INTERATIVA) for i in range(16)]
+        + [(f"L{i}", CLASSE_LOTE) for i in range(4)]
+        + [(f"P{i}", CLASSE_PRECALCULO) for i in range(2)]
+    )
+    calculos = [
+        _enfileirar(escalonador, _Calculo(escalonador, nome, classe, atendidos=atendidos))
+        for nome, classe in pedidos
+    ]
+
+    bloqueio.soltar.set()
+    for calculo in calculos + [bloqueio]:
+        calculo.join(5)
+
+    print(f"   Ordem: {' '.join(atendidos[1:])}")
+
+    # Teste 1: ordem exata pelas etiquetas virtuais (empate: interativo, lote, pré-cálculo)
+    print("📝 Teste 1: ordem de atendimento")
+    esperado = [
+        "L0", "P0", "I0", "I1", "I2", "I3", "L1", "I4", "I5", "I6", "I7",
+        "L2", "P1", "I8", "I9", "I10", "I11", "L3", "I12", "I13", "I14", "I15",
+    ]
+    assert atendidos == ["bloqueio"] + esperado, f"Erro: ordem inesperada {atendidos}"
+    print("   ✅ Passou!\n")
+
+    # Teste 2: a cada 11 vagas, 8 interativas, 2 de lote e 1 de pré-cálculo
+    print("📝 Teste 2: proporção 8/2/1")
+    for inicio in (0, 11):
+        janela = esperado[inicio:inicio + 11]
+        contagem = {prefixo: sum(nome.startswith(prefixo) for nome in janela) for prefixo in "ILP"}
+        print(f"   Vagas {inicio + 1}-{inicio + 11}: {contagem}")
+        assert contagem == {"I": 8, "L": 2, "P": 1}, f"Erro: proporção fora dos pesos {contagem}"
+    print("   ✅ Passou!\n")
+
+    estado = escalonador.estado()
+    assert estado["classes"][CLASSE_INTERATIVA]["atendidos"] == 17
+    assert all(classe["executando"] == 0 and classe["na_fila"] == 0 for classe in estado["classes"].values())
+
+    print("🎉 Testes da fila justa passaram com sucesso!")
+
+
+def test_limite_por_cliente():
+    """
+    Um cliente de lote no limite não ocupa vagas livres nem trava os demais.
+    """
+    print("🧪 Testando limite por cliente...\n")
+
+    escalonador = Escalonador(capacidade=3, max_por_cliente=1)
+    atendidos = []
+
+    def calculo(nome, classe, cliente):
+        return _Calculo(escalonador, nome, classe, cliente, atendidos, segurar=True)
+
+    # Teste 1: só um lote do escritório roda; o interativo de outro cliente passa na frente
+    print("📝 Teste 1: excedentes do cliente esperam")
+    lote_1 = calculo("lote-1", CLASSE_LOTE, "escritorio")
+    lote_1.start()
+    assert lote_1.em_execucao.wait(5)
+    lote_2 = _enfileirar(escalonador, calculo("lote-2", CLASSE_LOTE, "escritorio"))
+    lote_3 = _enfileirar(escalonador, calculo("lote-3", CLASSE_LOTE, "escritorio"))
+    usuario = calculo("usuario-1", CLASSE_INTERATIVA, "usuario")
+    usuario.start()
+    assert usuario.em_execucao.wait(5)
+
+    estado = escalonador.estado()
+    print(f"   Atendidos: {atendidos}, vagas ocupadas: "
+          f"{sum(c['executando'] for c in estado['classes'].values())}/{estado['capacidade']}")
+    assert atendidos == ["lote-1", "usuario-1"], f"Erro: ordem inesperada {atendidos}"
+    assert estado["classes"][CLASSE_LOTE]["executando"] == 1
+    assert estado["classes"][CLASSE_LOTE]["na_fila"] == 2, "Erro: lote excedente ocupou vaga livre"
+    print("   ✅ Passou!\n")
+
+    # Teste 2: ao terminar um lote do escritório, entra o próximo dele (e só ele)
+    print("📝 Teste 2: vaga do cliente liberada ao terminar")
+    lote_1.soltar.set()
+    assert lote_2.em_execucao.wait(5)
+    lote_1.join(5)
+    assert atendidos == ["lote-1", "usuario-1", "lote-2"], f"Erro: ordem inesperada {atendidos}"
+    assert not lote_3.em_execucao.is_set(), "Erro: dois lotes do mesmo cliente simultâneos"
+    print("   ✅ Passou!\n")
+
+    # Teste 3: fim da carga
+    print("📝 Teste 3: fim da carga")
+    for pendente in (usuario, lote_2, lote_3):
+        pendente.soltar.set()
+    for pendente in (usuario, lote_2, lote_3):
+        pendente.join(5)
+    assert atendidos == ["lote-1", "usuario-1", "lote-2", "lote-3"], f"Erro: ordem inesperada {atendidos}"
+    assert escalonador.estado()["clientes_ativos"] == 0
+    print("   ✅ Passou!\n")
+
+    print("🎉 Testes do limite por cliente passaram com sucesso!")
+
+
+if __name__ == "__main__":
+    test_pesos()
+    test_limite_por_cliente()
@@ -0,0 +1,172 @@
+"""
+Teste de gravações simultâneas do cache SELIC (SelicStore / SelicAPI).
+
+Várias threads salvando o mesmo arquivo não colidem no temporário nem
+publicam um arquivo incompleto, requisições simultâneas de um mês novo
+fazem uma única busca na API e uma busca diária lenta não trava as demais
+(a API é substituída por funções locais).
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from services.selic_api import SelicAPI
+from services.selic_store import SelicStore
+
+
+def _em_paralelo(funcao, n):
+    """Executa `funcao(i)` em n threads ao mesmo tempo e devolve os erros."""
+    barreira = threading.Barrier(n)
+    erros = []
+
+    def executar(i):
+        barreira.wait()
+        try:
+            funcao(i)
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=executar, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return erros
+
+
+def test_salvar_simultaneo():
+    """
+    Gravações simultâneas terminam sem erro e deixam uma série inteira.
+    """
+    print("🧪 Testando gravações simultâneas do SelicStore...\n")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        store = SelicStore.abrir(str(Path(diretorio) / "selic_cache.bin"))
+        series = [
+            {f"{ano}-{mes:02d}": round(0.5 + i / 100, 2) for ano in range(2000, 2026) for mes in range(1, 13)}
+            for i in range(8)
+        ]
+
+        erros = []
+        for _ in range(5):
+            erros += _em_paralelo(lambda i: store.salvar(series[i]), len(series))
+
+        print(f"   Erros: {erros}")
+        assert not erros, f"Erro: gravação simultânea falhou: {erros}"
+        assert store.para_dict() in series, "Erro: série publicada incompleta ou misturada"
+        temporarios = [p.name for p in Path(diretorio).iterdir() if p.suffix == ".tmp"]
+        assert not temporarios, f"Erro: temporários esquecidos {temporarios}"
+        store.close()
+        print("   ✅ Passou!\n")
+
+    print("🎉 Testes do SelicStore passaram com sucesso!")
+
+
+def test_busca_mensal_unica():
+    """
+    Requisições simultâneas de um mês ausente fazem uma única busca.
+    """
+    print("🧪 Testando busca simultânea da SELIC mensal...\n")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        api = SelicAPI(str(Path(diretorio) / "selic_cache.json"))
+        chamadas = []
+
+        def fetch_local():
+            chamadas.append(1)
+            time.sleep(0.05)
+            return [{"data": "01/02/2025", "valor": "0.99"}, {"data": "01/03/2025", "valor": "0.96"}]
+
+        api.fetch_selic_data = fetch_local
+        taxas = []
+        erros = _em_paralelo(lambda i: taxas.append(api.ensure_selic("15/03/2025")), 8)
+
+        print(f"   Buscas: {len(chamadas)}, taxas: {set(taxas)}")
+        assert not erros, f"Erro: {erros}"
+        assert len(chamadas) == 1, f"Erro: esperada 1 busca, houve {len(chamadas)}"
+        assert taxas == [0.96] * 8
+        api.cache.close()
+        api.cache_diario.close()
+        print("   ✅ Passou!\n")
+
+    print("🎉 Testes da busca mensal passaram com sucesso!")
+
+
+def test_busca_diaria_fora_do_lock():
+    """
+    Uma busca diária lenta não bloqueia a busca de outro período.
+    """
+    print("🧪 Testando busca diária lenta...\n")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        api = SelicAPI(str(Path(diretorio) / "selic_cache.json"))
+        liberar = threading.Event()
+
+        def fetch_local(inicio, fim):
+            if fim == date(2025, 3, 1):
+                liberar.wait(5)  # BCB lento
+            return [
+                {"data": f"{dia:02d}/{fim.month - 1:02d}/2025", "valor": "0.05"}
+                for dia in range(1, 29)
+            ]
+
+        api.fetch_selic_diaria = fetch_local
+        lenta = threading.Thread(target=api.ensure_selic_diaria, args=(date(2025, 2, 1), date(2025, 3, 1)))
+        lenta.start()
+        time.sleep(0.05)
+
+        inicio = time.monotonic()
+        api.ensure_selic_diaria(date(2025, 1, 1), date(2025, 2, 1))
+        segundos = time.monotonic() - inicio
+        print(f"   Outra busca durante a lenta: {segundos:.3f}s")
+        assert lenta.is_alive(), "Erro: a busca lenta deveria estar em andamento"
+        assert segundos < 1, "Erro: busca bloqueada pela consulta lenta"
+
+        liberar.set()
+        lenta.join(5)
+        assert api.ensure_selic_diaria(date(2025, 2, 1), date(2025, 2, 28)), "Erro: dias da busca lenta não gravados"
+        assert api.ensure_selic_diaria(date(2025, 1, 1), date(2025, 1, 28))
+        api.cache.close()
+        api.cache_diario.close()
+        print("   ✅ Passou!\n")
+
+    print("🎉 Testes da busca diária passaram com sucesso!")
+
+
+def test_conversao_no_primeiro_uso():
+    """
+    Construir o SelicAPI (import do main.py) não grava disco; o cache JSON
+    antigo vira .bin no primeiro uso (fase "selic" do aquecimento).
+    """
+    print("🧪 Testando abertura preguiçosa do cache SELIC...\n")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        json_path = Path(diretorio) / "selic_cache.json"
+        json_path.write_text('{"2025-02": 0.99, "2025-03": 0.96}', encoding="utf-8")
+
+        api = SelicAPI(str(json_path))
+        arquivos = sorted(p.name for p in Path(diretorio).iterdir())
+        print(f"   Após o construtor: {arquivos}")
+        assert arquivos == ["selic_cache.json"], "Erro: construtor gravou em disco"
+
+        assert api.get_selic_for_month("2025-03") == 0.96
+        assert (Path(diretorio) / "selic_cache.bin").exists(), "Erro: cache não convertido no primeiro uso"
+        api.cache.close()
+        api.cache_diario.close()
+        print("   ✅ Passou!\n")
+
+    print("🎉 Testes da abertura do cache passaram com sucesso!")
+
+
+if __name__ == "__main__":
+    test_conversao_no_primeiro_uso()
+    test_salvar_simultaneo()
+    test_busca_mensal_unica()
+    test_busca_diaria_fora_do_lock()
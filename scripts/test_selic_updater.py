@@ -2,16 +2,60 @@
 Teste simples da funcionalidade de atualização SELIC.
 
 Executa teste unitário do SelicUpdater para validar a lógica de atualização.
+Herméticos: cache SELIC em diretório temporário e API do Banco Central
+substituída por funções locais (nenhum acesso à rede). Cada teste roda de
+forma independente:
+
+    python scripts/test_selic_updater.py            # todos
+    python scripts/test_selic_updater.py diaria     # só test_selic_diaria
 """
 
+import json
 import sys
+import tempfile
+import traceback
 from pathlib import Path
 
 # Adicionar backend ao path
 sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
 
 from services.selic_updater import SelicUpdater
-from datetime import datetime
+from datetime import date, datetime
+
+SERIE_DIARIA_OFFLINE = Path(__file__).parent.parent / "data" / "selic_diaria_sintetica.json"
+
+
+def _sem_rede(*args, **kwargs):
+    raise RuntimeError("Acesso à API do Banco Central desativado no teste")
+
+
+def _bcb_diario_local(serie_path):
+    """
+    Substitui SelicAPI.fetch_selic_diaria: devolve os dias da série offline
+    dentro do intervalo pedido (depois do fim da série, nenhum dia publicado).
+    """
+    with open(serie_path, "r", encoding="utf-8") as f:
+        itens = json.load(f)
+
+    def fetch_selic_diaria(inicio, fim):
+        return [
+            item for item in itens
+            if inicio <= datetime.strptime(item["data"], "%d/%m/%Y").date() <= fim
+        ]
+
+    return fetch_selic_diaria
+
+
+def _updater_local(diretorio, cache, precisao="mensal"):
+    """SelicUpdater com cache mensal sintético em `diretorio` e sem rede."""
+    cache_path = Path(diretorio) / "selic_cache.json"
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+
+    updater = SelicUpdater(str(cache_path), precisao=precisao)
+    updater.selic_api.fetch_selic_data = _sem_rede
+    updater.selic_api.fetch_selic_diaria = _bcb_diario_local(SERIE_DIARIA_OFFLINE)
+    return updater
 
 
 def test_selic_updater():
@@ -20,9 +64,17 @@ def test_selic_updater():
     """
     print("🧪 Testando SelicUpdater...\n")
     
-    # Inicializar updater
-    updater = SelicUpdater("./data/selic_cache.json")
-    
+    with tempfile.TemporaryDirectory() as diretorio:
+        updater = _updater_local(diretorio, {"2025-02": 0.99, "2025-03": 0.96})
+        try:
+            _testar_updater(updater)
+        finally:
+            updater.selic_api.cache.close()
+            updater.selic_api.cache_diario.close()
+
+
+def _testar_updater(updater):
+    """Casos do test_selic_updater (cache com 02/2025 = 0.99% e 03/2025 = 0.96%)."""
     # Teste 1: Data que NÃO precisa atualização
     print("📝 Teste 1: Data ≤ 01/01/2025")
     precisa = updater.precisa_atualizacao("01/01/2025")
@@ -108,5 +160,74 @@ def test_selic_updater():
     print("🎉 Todos os testes passaram com sucesso!")
 
 
+def test_selic_diaria():
+    """
+    Testa a correção com precisão diária usando a série offline sintética
+    (data/selic_diaria_sintetica.json: 13% a.a. em 2025, 12% a.a. em 2026).
+    """
+    print("🧪 Testando SELIC diária (série offline)...\n")
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        updater = _updater_local(
+            diretorio, {"2025-02": 0.99, "2025-03": 0.96, "2027-01": 0.90}, precisao="diaria"
+        )
+        dias = updater.selic_api.importar_selic_diaria(str(SERIE_DIARIA_OFFLINE), date(2025, 1, 1))
+        print(f"   Dias importados: {dias}")
+        
+        # Teste 1: dias diferentes do mesmo mês geram fatores diferentes
+        print("📝 Teste 1: 15/03/2025 x 31/03/2025")
+        fator_15 = updater.fator_acumulado("15/03/2025")
+        fator_31 = updater.fator_acumulado("31/03/2025")
+        print(f"   Fatores: {fator_15:.6f} x {fator_31:.6f}")
+        assert 1 < fator_15 < fator_31, "Erro: fator de 31/03 deveria ser maior que o de 15/03"
+        print("   ✅ Passou!\n")
+        
+        # Teste 2: um ano de taxas diárias de 13% a.a. (~252 dias úteis)
+        print("📝 Teste 2: 01/01/2025 → 01/01/2026")
+        fator_ano = updater.fator_acumulado("01/01/2026")
+        print(f"   Fator: {fator_ano:.6f}")
+        assert abs(fator_ano - 1.13) < 0.005, f"Erro: esperado ~1.13, obteve {fator_ano:.6f}"
+        print("   ✅ Passou!\n")
+        
+        # Teste 3: após a última taxa diária, pro rata pela taxa mensal
+        print("📝 Teste 3: pro rata após o fim da série diária (16/01/2027)")
+        fator_pro_rata = updater.fator_acumulado("16/01/2027")
+        esperado = updater.fator_acumulado("01/01/2027") * 1.009 ** (15 / 31)
+        print(f"   Fator: {fator_pro_rata:.6f} (esperado {esperado:.6f})")
+        assert abs(fator_pro_rata - esperado) < 1e-9, "Erro: pro rata incorreto"
+        print("   ✅ Passou!\n")
+        
+        # Teste 4: consulta em lote igual às consultas individuais
+        print("📝 Teste 4: fatores em lote")
+        datas = ["01/01/2025", "15/03/2025", "31/03/2025", "01/01/2026"]
+        lote = updater.fatores_acumulados(datas)
+        individuais = [updater.fator_acumulado(d) for d in datas]
+        print(f"   Lote: {[round(f, 6) for f in lote]}")
+        assert all(abs(a - b) < 1e-12 for a, b in zip(lote, individuais)), "Erro: lote difere das consultas individuais"
+        print("   ✅ Passou!\n")
+        
+        updater.selic_api.cache.close()
+        updater.selic_api.cache_diario.close()
+    
+    print("🎉 Testes da SELIC diária passaram com sucesso!")
+
+
+TESTES = {
+    "updater": test_selic_updater,
+    "diaria": test_selic_diaria,
+}
+
+
 if __name__ == "__main__":
-    test_selic_updater()
+    # Cada teste roda mesmo que outro falhe
+    selecionados = sys.argv[1:] or list(TESTES)
+    falhas = []
+    for nome in selecionados:
+        try:
+            TESTES[nome]()
+        except Exception:
+            traceback.print_exc()
+            falhas.append(nome)
+    if falhas:
+        print(f"❌ Falharam: {', '.join(falhas)}")
+        sys.exit(1)
@@ -0,0 +1,258 @@
+"""
+Testes do Storage (SQLite) sem Excel e sem acesso à rede.
+
+Cada teste usa um banco temporário próprio. O teste de /results/search sobe
+a API no mesmo processo (TestClient, CALC_ENGINE=fake e o mock do BCB do
+teste de carga).
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from load_test import iniciar_mock_bcb
+from services.storage import Storage
+from services.write_behind import WriteBehindStorage
+
+ENTRADA = {
+    "município": "Fortaleza",
+    "ajuizamento": "01/03/2010",
+    "citação": "01/06/2010",
+    "correção_até": "01/06/2025",
+}
+
+
+def _saida(titulo, valor):
+    """Output mínimo com uma tabela."""
+    return {
+        "results_base": [{
+            "titulo": titulo,
+            "header": ["Descrição", "Valor Corrigido Mensal"],
+            "rows": [["Principal", valor]],
+            "total": ["TOTAL", valor],
+        }],
+        "results_atualizados": [],
+    }
+
+
+def _linha(titulo, valor, entrada=None, created_at=None):
+    return (str(uuid.uuid4()), created_at or datetime.now().isoformat(), entrada or ENTRADA, _saida(titulo, valor), "v1")
+
+
+def test_titulos_apos_rollback():
+    """
+    Lote desfeito não deixa IDs de título no cache do Storage.
+    """
+    print("🧪 Testando cache de títulos após rollback...\n")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        storage = Storage(str(Path(diretorio) / "results.db"))
+
+        # Teste 1: falha depois de criar o título → rollback, conexão fechada
+        print("📝 Teste 1: lote que falha no meio da transação")
+
+        def falhar(*args, **kwargs):
+            raise RuntimeError("falha simulada")
+
+        storage._indexar_busca = falhar
+        try:
+            storage.save_results_batch([_linha("TABELA A", 10.0)])
+            assert False, "Erro: a gravação deveria falhar"
+        except RuntimeError:
+            pass
+        del storage._indexar_busca
+        assert "TABELA A" not in storage._titulos, "Erro: título de transação desfeita no cache"
+        assert storage.listar_titulos() == [], "Erro: rollback não desfez o título"
+        print("   ✅ Passou!\n")
+
+        # Teste 2: título novo reaproveita o ID desfeito; o antigo ganha outro
+        print("📝 Teste 2: IDs de título consistentes nas gravações seguintes")
+        linha_b = _linha("TABELA B", 20.0)
+        linha_a = _linha("TABELA A", 10.0)
+        storage.save_results_batch([linha_b])
+        storage.save_results_batch([linha_a])
+
+        titulos = {t["titulo"]: t["id"] for t in storage.listar_titulos()}
+        print(f"   Títulos: {titulos}")
+        assert storage._titulos == titulos, "Erro: cache difere de result_titles"
+        for titulo, valor in (("TABELA A", 10.0), ("TABELA B", 20.0)):
+            total = storage.agregar_valores(1, titulo=titulo, agrupar="municipio")
+            print(f"   {titulo}: {total}")
+            assert total and total[0]["soma"] == valor, f"Erro: valores de {titulo} no título errado"
+        print("   ✅ Passou!\n")
+
+    print("🎉 Testes do cache de títulos passaram com sucesso!")
+
+
+def _linhas_busca():
+    """Três resultados de municípios diferentes (um em Sobral)."""
+    return [
+        _linha("TABELA A", 10.0, {**ENTRADA, "município": municipio})
+        for municipio in ("Fortaleza", "Sobral", "Caucaia")
+    ]
+
+
+def test_busca_textual():
+    """
+    Gravação alimenta o índice FTS e a busca encontra o resultado; com
+    write-behind, resultados ainda na fila também são encontrados.
+    """
+    print("🧪 Testando busca textual...\n")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        db_path = Path(diretorio) / "results.db"
+        storage = Storage(str(db_path))
+        assert storage._busca_fts, "Erro: SQLite sem FTS5"
+
+        # Teste 1: uma linha no índice por resultado gravado
+        print("📝 Teste 1: índice preenchido na gravação")
+        linhas = _linhas_busca()
+        storage.save_results_batch(linhas)
+        conn = sqlite3.connect(db_path)
+        indexados = conn.execute("SELECT COUNT(*) FROM results_fts").fetchone()[0]
+        conn.close()
+        print(f"   Linhas no índice: {indexados}")
+        assert indexados == len(linhas), f"Erro: esperado {len(linhas)} linhas no índice"
+        print("   ✅ Passou!\n")
+
+        # Teste 2: busca por município (prefixo) e por data
+        print("📝 Teste 2: busca encontra o resultado")
+        busca = storage.buscar_resultados("sobr")
+        print(f"   'sobr': {[(r['município'], r['trecho']) for r in busca['resultados']]}")
+        assert busca["total"] == 1, f"Erro: esperado 1 resultado, obteve {busca['total']}"
+        assert busca["resultados"][0]["id"] == linhas[1][0]
+        assert busca["resultados"][0]["município"] == "Sobral"
+        assert storage.buscar_resultados("06/2025")["total"] == len(linhas), "Erro: busca por data"
+        assert storage.buscar_resultados("Recife")["total"] == 0
+        print("   ✅ Passou!\n")
+
+        # Teste 3: write-behind drena a fila antes de buscar
+        print("📝 Teste 3: resultado recém-enfileirado (write-behind)")
+        wb = WriteBehindStorage(storage)
+        result_id = wb.save_result({**ENTRADA, "município": "Iguatu"}, _saida("TABELA A", 5.0))
+        busca = wb.buscar_resultados("Iguatu")
+        assert [r["id"] for r in busca["resultados"]] == [result_id], "Erro: resultado da fila fora da busca"
+        wb.close()
+        print("   ✅ Passou!\n")
+
+    print("🎉 Testes da busca textual passaram com sucesso!")
+
+
+def test_arquivamento():
+    """
+    Resultados arquivados continuam legíveis, idênticos aos originais, e o
+    vacuum incremental não altera os dados.
+    """
+    print("🧪 Testando arquivamento e vacuum incremental...\n")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        storage = Storage(str(Path(diretorio) / "results.db"))
+        linhas = [
+            _linha("TABELA A", 10.0, created_at="2023-01-15T10:00:00"),
+            _linha("TABELA A", 20.0, created_at="2023-02-15T10:00:00"),
+            _linha("TABELA A", 30.0),
+        ]
+        # Outputs de várias páginas: o arquivamento deixa páginas livres para o vacuum
+        for _, _, _, saida, _ in linhas:
+            saida["results_base"][0]["rows"] += [[f"Parcela {i:04d}", i * 1.5] for i in range(400)]
+        storage.save_results_batch(linhas)
+        ids = [linha[0] for linha in linhas]
+
+        def ler():
+            return (
+                [storage.get_result(result_id) for result_id in ids],
+                [storage.get_result_raw(result_id) for result_id in ids],
+                [storage.get_result_etag(result_id) for result_id in ids],
+                list(storage.iterar_resultados()),
+                storage.agregar_valores(1, titulo="TABELA A", agrupar="municipio"),
+            )
+
+        originais = ler()
+        assert originais[0][0]["output_data"] == linhas[0][3]
+
+        # Teste 1: só os resultados anteriores à data vão para as partições (um lote por vez)
+        print("📝 Teste 1: arquivar antes de 2024-01-01")
+        resumo = storage.arquivar_antigos("2024-01-01", lote=1)
+        print(f"   Resumo: {resumo}")
+        assert resumo["arquivados"] == 2 and resumo["particoes"] == 2, "Erro: resultados antigos não arquivados"
+        assert resumo["bytes_comprimidos"] < resumo["bytes_originais"]
+        assert sorted(p.name for p in storage.arquivo_dir.glob("results-*.db")) == [
+            "results-2023-01.db", "results-2023-02.db"
+        ]
+        estatisticas = storage.estatisticas_banco()["resultados"]
+        assert estatisticas == {"total": 3, "ativos": 1, "arquivados": 2}, f"Erro: {estatisticas}"
+        assert storage.arquivar_antigos("2024-01-01")["arquivados"] == 0, "Erro: rearquivou resultados"
+        print("   ✅ Passou!\n")
+
+        # Teste 2: leituras dos arquivados iguais às de antes
+        print("📝 Teste 2: get_result, get_result_raw e iterar_resultados após arquivar")
+        for nome, antes, depois in zip(("get_result", "get_result_raw", "etag", "iterar_resultados", "agregar_valores"), originais, ler()):
+            assert depois == antes, f"Erro: {nome} mudou após o arquivamento"
+        print("   ✅ Passou!\n")
+
+        # Teste 3: vacuum incremental devolve as páginas livres sem mudar os dados
+        print("📝 Teste 3: vacuum incremental")
+        livres = storage.estatisticas_banco()["paginas_livres"]
+        resumo = storage.vacuum_incremental()
+        print(f"   Páginas livres antes: {livres}, resumo: {resumo}")
+        assert resumo["paginas_liberadas"] == livres > 0, "Erro: vacuum não liberou as páginas do arquivamento"
+        assert resumo["bytes_depois"] < resumo["bytes_antes"]
+        assert storage.estatisticas_banco()["paginas_livres"] == 0, "Erro: páginas livres após o vacuum"
+        assert ler() == originais, "Erro: dados mudaram após o vacuum"
+        print("   ✅ Passou!\n")
+
+    print("🎉 Testes do arquivamento passaram com sucesso!")
+
+
+def test_busca_api(main):
+    """
+    GET /results/search devolve o resultado gravado.
+    """
+    from fastapi.testclient import TestClient
+
+    print("🧪 Testando GET /results/search...\n")
+
+    with TestClient(main.app) as cliente:
+        linhas = _linhas_busca()
+        main.storage.save_results_batch(linhas)
+
+        # Teste 1: acerto
+        print("📝 Teste 1: busca com acerto")
+        resposta = cliente.get("/results/search", params={"q": "Sobral"})
+        assert resposta.status_code == 200, f"Erro: {resposta.status_code} {resposta.text}"
+        corpo = resposta.json()
+        print(f"   {corpo['total']} resultado(s), ordem: {corpo['ordem']}")
+        assert corpo["total"] == 1 and corpo["resultados"][0]["id"] == linhas[1][0]
+        print("   ✅ Passou!\n")
+
+        # Teste 2: consulta vazia → 400
+        print("📝 Teste 2: consulta vazia")
+        resposta = cliente.get("/results/search", params={"q": "  "})
+        assert resposta.status_code == 400, f"Erro: esperado 400, obteve {resposta.status_code}"
+        print("   ✅ Passou!\n")
+
+    print("🎉 Testes de /results/search passaram com sucesso!")
+
+
+if __name__ == "__main__":
+    test_titulos_apos_rollback()
+    test_busca_textual()
+    test_arquivamento()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        os.environ["CALC_ENGINE"] = "fake"
+        os.environ["DATABASE_URL"] = str(Path(diretorio) / "results.db")
+        os.environ["SELIC_CACHE_PATH"] = str(Path(diretorio) / "selic_cache.json")
+        os.environ["SELIC_API_URL"] = iniciar_mock_bcb()
+
+        import main
+
+        test_busca_api(main)
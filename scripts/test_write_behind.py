@@ -0,0 +1,137 @@
+"""
+Teste da gravação assíncrona (WriteBehindStorage) com o banco recusando gravações.
+
+Um resultado recusado pelo Storage continua legível pelo ID devolvido ao
+cliente, é regravado quando o banco volta e sobrevive a um reinício via
+arquivo de falhas.
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from services.storage import Storage
+from services.write_behind import WriteBehindStorage
+
+ENTRADA = {"município": "Fortaleza", "correção_até": "01/06/2025"}
+SAIDA = {
+    "results_base": [{
+        "titulo": "TABELA A",
+        "header": ["Descrição", "Valor Corrigido Mensal"],
+        "rows": [["Principal", 10.0]],
+        "total": ["TOTAL", 10.0],
+    }],
+    "results_atualizados": [],
+}
+
+
+class _BancoIndisponivel:
+    """Faz save_results_batch do Storage falhar enquanto `ativo`."""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.original = storage.save_results_batch
+        self.ativo = True
+        self.tentativas = 0
+        storage.save_results_batch = self._save_results_batch
+
+    def _save_results_batch(self, *args, **kwargs):
+        self.tentativas += 1
+        if self.ativo:
+            raise RuntimeError("database is locked (simulado)")
+        return self.original(*args, **kwargs)
+
+
+def _aguardar(condicao, timeout=5.0):
+    limite = time.monotonic() + timeout
+    while not condicao():
+        assert time.monotonic() < limite, "Erro: tempo esgotado"
+        time.sleep(0.01)
+
+
+def test_linha_recusada():
+    """
+    Resultado recusado continua legível e é gravado quando o banco volta.
+    """
+    print("🧪 Testando resultado recusado pelo banco...\n")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        storage = Storage(str(Path(diretorio) / "results.db"))
+        banco = _BancoIndisponivel(storage)
+        wb = WriteBehindStorage(storage, retentativa_inicial=0.05)
+
+        # Teste 1: falha na gravação não perde o resultado
+        print("📝 Teste 1: get_result após a falha")
+        result_id = wb.save_result(ENTRADA, SAIDA)
+        wb.flush()
+        assert banco.tentativas >= 2, "Erro: lote e tentativa individual deveriam ter falhado"
+        resultado = wb.get_result(result_id)
+        assert resultado is not None, "Erro: resultado recusado sumiu"
+        assert resultado["output_data"] == SAIDA
+        assert wb.falhas_pendentes() == 1
+        assert wb.arquivo_falhas.exists(), "Erro: arquivo de falhas não gravado"
+        print(f"   Tentativas: {banco.tentativas}, arquivo: {wb.arquivo_falhas.name}")
+        print("   ✅ Passou!\n")
+
+        # Teste 2: banco de volta → regravado com espera exponencial
+        print("📝 Teste 2: regravação quando o banco volta")
+        banco.ativo = False
+        _aguardar(lambda: wb.falhas_pendentes() == 0)
+        assert storage.get_result(result_id)["output_data"] == SAIDA, "Erro: resultado não gravado no banco"
+        assert wb.get_result(result_id)["output_data"] == SAIDA
+        assert not wb.arquivo_falhas.exists(), "Erro: arquivo de falhas não removido"
+        print("   ✅ Passou!\n")
+
+        wb.close()
+
+    print("🎉 Testes da regravação passaram com sucesso!")
+
+
+def test_falha_sobrevive_reinicio():
+    """
+    Resultado ainda recusado no desligamento volta na próxima inicialização.
+    """
+    print("🧪 Testando arquivo de falhas entre reinícios...\n")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        db_path = str(Path(diretorio) / "results.db")
+
+        storage = Storage(db_path)
+        _BancoIndisponivel(storage)
+        wb = WriteBehindStorage(storage, retentativa_inicial=60)
+        result_id = wb.save_result(ENTRADA, SAIDA)
+        wb.close()
+        assert wb.arquivo_falhas.exists(), "Erro: resultado recusado não ficou no arquivo de falhas"
+
+        # Teste 1: nova execução, banco disponível
+        print("📝 Teste 1: recuperação na inicialização")
+        storage = Storage(db_path)
+        wb = WriteBehindStorage(storage)
+        _aguardar(lambda: storage.get_result(result_id) is not None)
+        assert storage.get_result(result_id)["output_data"] == SAIDA
+        _aguardar(lambda: not wb.arquivo_falhas.exists())
+        print("   ✅ Passou!\n")
+
+        # Teste 2: linha já gravada (queda antes de limpar o arquivo) não trava a fila
+        print("📝 Teste 2: linha do arquivo que já está no banco")
+        wb.close()
+        wb.arquivo_falhas.write_bytes(
+            b'{"id":"' + result_id.encode() + b'","created_at":"2025-06-01T10:00:00",'
+            b'"input_data":{},"output_data":{},"workbook_version":null}\n'
+        )
+        wb = WriteBehindStorage(storage)
+        _aguardar(lambda: not wb.arquivo_falhas.exists())
+        assert wb.falhas_pendentes() == 0
+        wb.close()
+        print("   ✅ Passou!\n")
+
+    print("🎉 Testes do arquivo de falhas passaram com sucesso!")
+
+
+if __name__ == "__main__":
+    test_linha_recusada()
+    test_falha_sobrevive_reinicio()
@@ -0,0 +1,94 @@
+"""
+Worker(s) da fila de cálculos (CALC_DISPATCH=fila na API).
+
+Cada processo carrega a mesma configuração da API (variáveis de ambiente:
+CALC_ENGINE, EXCEL_FILE_PATH, DATABASE_URL, JOBS_DATABASE_URL, ...), aquece
+o motor e processa jobs da tabela `jobs` até receber Ctrl+C / SIGTERM.
+Rode em quantas máquinas quiser, apontando para o mesmo banco de jobs.
+
+Uso:
+    python scripts/worker.py                      # um worker
+    python scripts/worker.py --processos 4        # quatro processos locais
+    python scripts/worker.py --classes interativo # worker reservado ao formulário
+    CALC_ENGINE=fake python scripts/worker.py --processos 3 --lease 10
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+
+
+def rodar_worker(lease: float, max_jobs=None, classes=None) -> None:
+    """Processo de um worker: importa a API (config), aquece e consome a fila."""
+    # O worker calcula localmente e grava de forma síncrona: o job só é
+    # concluído com o resultado já no banco
+    os.environ["CALC_DISPATCH"] = "local"
+    os.environ["STORAGE_WRITE_BEHIND"] = "0"
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    import main
+    from services.job_queue import criar_fila
+    from services.job_worker import JobWorker
+
+    main.warmup.iniciar()
+    if not main.warmup.aguardar():
+        print(f"⚠️ Aquecimento incompleto: {main.warmup.estado()}")
+
+    fila = criar_fila(main.JOBS_DATABASE_URL, main.JOB_MAX_TENTATIVAS, main.SCHED_PESOS, main.SCHED_MAX_POR_CLIENTE)
+    worker = JobWorker(fila, main.executar_job, lease_segundos=lease, metrics=main.metrics, classes=classes)
+    signal.signal(signal.SIGTERM, lambda *_: worker.parar())
+
+    try:
+        worker.executar(max_jobs)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        main.engine.encerrar()
+        print(f"👋 Worker {worker.worker_id} encerrado: {main.metrics.snapshot()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker(s) da fila de cálculos")
+    parser.add_argument("--processos", type=int, default=1, help="Processos worker locais")
+    parser.add_argument("--lease", type=float, default=float(os.getenv("JOB_LEASE_SECONDS", "60")),
+                        help="Duração da concessão de um job, em segundos (renovada a cada lease/3)")
+    parser.add_argument("--max-jobs", type=int, help="Encerrar após N jobs por processo")
+    parser.add_argument("--classes", help="Classes de prioridade atendidas, separadas por vírgula "
+                                          "(interativo, lote, precalculo; padrão: todas)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from services.scheduler import validar_classe
+
+    try:
+        classes = [validar_classe(classe) for classe in args.classes.split(",")] if args.classes else None
+    except ValueError as e:
+        parser.error(str(e))
+    if args.processos <= 1:
+        rodar_worker(args.lease, args.max_jobs, classes)
+        return
+
+    processos = [
+        multiprocessing.Process(target=rodar_worker, args=(args.lease, args.max_jobs, classes), name=f"worker-{i}")
+        for i in range(args.processos)
+    ]
+    for processo in processos:
+        processo.start()
+
+    try:
+        for processo in processos:
+            processo.join()
+    except KeyboardInterrupt:
+        for processo in processos:
+            processo.terminate()
+        for processo in processos:
+            processo.join()
+
+
+if __name__ == "__main__":
+    main()